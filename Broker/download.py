@@ -1,60 +1,199 @@
+import hashlib
 import io
+import json
 import logging
+import os
+import sys
+import threading
+import time
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.instrument_schema import TRADESMART_SCHEMA, apply_schema  # noqa: E402
+from common.snapshot import snapshot_path, write_snapshot  # noqa: E402
 
-def download_and_combine_data():
-    # URLs containing the data
-    urls = [
-        "https://v2api.tradesmartonline.in/NFO_symbols.txt.zip",
-        "https://v2api.tradesmartonline.in/BCD_symbols.txt.zip",
-        "https://v2api.tradesmartonline.in/CDS_symbols.txt.zip",
-        "https://v2api.tradesmartonline.in/NSE_symbols.txt.zip",
-        "https://v2api.tradesmartonline.in/BSE_symbols.txt.zip",
-        "https://v2api.tradesmartonline.in/MCX_symbols.txt.zip",
-        "https://v2api.tradesmartonline.in/BFO_symbols.txt.zip"
-    ]
+BASE_URL = "https://v2api.tradesmartonline.in"
+EXCHANGES = ['NFO', 'BCD', 'CDS', 'NSE', 'BSE', 'MCX', 'BFO']
 
-    all_data = []  # List to store DataFrames from each URL
+# URLs containing the data
+URLS = [f"{BASE_URL}/{exchange}_symbols.txt.zip" for exchange in EXCHANGES]
 
-    for url in urls:
+
+def make_session(pool_size=4, retries=3, backoff=0.5):
+    """Keep-alive session shared by the download workers, retrying transient failures with backoff."""
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET']),
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class RefreshCache:
+    """
+    Per-URL ETag, Last-Modified and content hash, plus the parsed partition
+    of every exchange, kept in ``cache_dir`` between refreshes.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.state_file = os.path.join(cache_dir, "state.json")
+        os.makedirs(cache_dir, exist_ok=True)
         try:
-            logging.info(f"Downloading from {url}")
-            # Download the zip file
-            response = requests.get(url)
-            response.raise_for_status()  # Raise exception for bad status codes
-
-            # Extract the zip file in memory
-            with zipfile.ZipFile(io.BytesIO(response.content)) as z:
-                # Get the txt file (assuming one txt file per zip)
-                txt_file = [f for f in z.namelist() if f.endswith('.txt')][0]
-                
-                # Read the txt file directly into a DataFrame
-                with z.open(txt_file) as f:
-                    df = pd.read_csv(f)
-                    # Add exchange information
-                    exchange = txt_file.split('_')[0]
-                    df['Exchange'] = exchange
-                    all_data.append(df)
-                    logging.info(f"Successfully processed {exchange} data with {len(df)} rows")
+            with open(self.state_file) as f:
+                self.state = json.load(f)
+        except (OSError, ValueError):
+            self.state = {}
+        self._lock = threading.Lock()
+
+    def partition_path(self, exchange):
+        return os.path.join(self.cache_dir, f"{exchange}.pkl")
+
+    def cached(self, url):
+        """Return the state entry for url when its partition is still on disk."""
+        entry = self.state.get(url)
+        if entry and os.path.exists(self.partition_path(entry['exchange'])):
+            return entry
+        return None
+
+    def conditional_headers(self, url):
+        entry = self.cached(url)
+        if not entry:
+            return {}
+        headers = {'If-None-Match': entry.get('etag'), 'If-Modified-Since': entry.get('last_modified')}
+        return {k: v for k, v in headers.items() if v}
+
+    def load(self, url):
+        return pd.read_pickle(self.partition_path(self.state[url]['exchange']))
+
+    def store(self, url, response, digest, exchange, df):
+        df.to_pickle(self.partition_path(exchange))
+        with self._lock:
+            self.state[url] = {
+                'exchange': exchange,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'sha256': digest,
+            }
+
+    def touch(self, url, response):
+        """Refresh validators for a payload whose content hash did not change."""
+        with self._lock:
+            entry = self.state[url]
+            entry['etag'] = response.headers.get('ETag') or entry.get('etag')
+            entry['last_modified'] = response.headers.get('Last-Modified') or entry.get('last_modified')
+
+    def save(self):
+        tmp = self.state_file + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self.state_file)
+
+
+def fetch_exchange(session, url, timeout=30, cache=None):
+    """
+    Download one *_symbols.txt.zip and parse it into a DataFrame tagged with
+    its exchange. With a RefreshCache the request is conditional, and an
+    unchanged payload (304, or same content hash) reuses the cached
+    partition without unzipping or parsing. Returns (df, changed).
+    """
+    start = time.perf_counter()
+    headers = cache.conditional_headers(url) if cache else {}
+    response = session.get(url, timeout=timeout, headers=headers)
+    if response.status_code == 304 and headers:
+        logging.info("Not modified: %s (%.0f ms)", url, (time.perf_counter() - start) * 1e3)
+        return cache.load(url), False
+    response.raise_for_status()  # Raise exception for bad status codes
+    downloaded = time.perf_counter()
+
+    digest = hashlib.sha256(response.content).hexdigest()
+    entry = cache.cached(url) if cache else None
+    if entry and entry.get('sha256') == digest:
+        cache.touch(url, response)
+        logging.info("Unchanged content: %s (%.0f ms)", url, (downloaded - start) * 1e3)
+        return cache.load(url), False
 
+    # Extract the zip file in memory
+    with zipfile.ZipFile(io.BytesIO(response.content)) as z:
+        # Get the txt file (assuming one txt file per zip)
+        txt_file = [f for f in z.namelist() if f.endswith('.txt')][0]
+
+        # Read the txt file directly into a DataFrame
+        with z.open(txt_file) as f:
+            df = pd.read_csv(f)
+
+    # Add exchange information
+    exchange = txt_file.split('_')[0]
+    df['Exchange'] = exchange
+    if cache:
+        cache.store(url, response, digest, exchange, df)
+    logging.info("Processed %s: %s rows, %s bytes, download %.0f ms, parse %.0f ms", exchange, len(df),
+                 len(response.content), (downloaded - start) * 1e3, (time.perf_counter() - downloaded) * 1e3)
+    return df, True
+
+
+def download_and_combine_data(urls=URLS, output_file="combined_instruments.csv", max_workers=4,
+                              retries=3, backoff=0.5, timeout=30, cache_dir=None):
+    """
+    Download every exchange master and write the combined CSV. With
+    ``cache_dir`` set, the refresh is incremental: unchanged exchanges are
+    taken from their cached partitions, and when none changed the existing
+    output file is left as is.
+    """
+    start = time.perf_counter()
+    cache = RefreshCache(cache_dir) if cache_dir else None
+
+    def fetch(url):
+        try:
+            logging.info("Downloading from %s", url)
+            return fetch_exchange(session, url, timeout, cache)
         except Exception as e:
-            logging.error(f"Error processing {url}: {str(e)}")
+            logging.error("Error processing %s: %s", url, e)
+            return None
+
+    with make_session(max_workers, retries, backoff) as session, ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # map keeps the input order, so the combined file is laid out as before
+        results = [result for result in pool.map(fetch, urls) if result is not None]
+    all_data = [df for df, _ in results]
+    changed = sum(1 for _, was_changed in results if was_changed)
+
+    logging.info("Downloaded %s/%s exchanges (%s changed) in %.0f ms",
+                 len(all_data), len(urls), changed, (time.perf_counter() - start) * 1e3)
+
+    if all_data and cache and not changed and len(all_data) == len(urls) and os.path.exists(output_file):
+        logging.info("No exchange changed, keeping %s", output_file)
+        combined_df = pd.concat(all_data, ignore_index=True)
+        if not os.path.exists(snapshot_path(output_file)):
+            write_snapshot(apply_schema(combined_df, TRADESMART_SCHEMA), snapshot_path(output_file))
+        cache.save()
+        return combined_df
 
     if all_data:
         # Combine all DataFrames
         combined_df = pd.concat(all_data, ignore_index=True)
-        
+
         # Save the combined data
-        output_file = "combined_instruments.csv"
         combined_df.to_csv(output_file, index=False)
-        logging.info(f"Combined data saved to {output_file}")
-        logging.info(f"Total rows in combined data: {len(combined_df)}")
-        
+        # The snapshot holds only the columns lookups read, in their schema dtypes
+        write_snapshot(apply_schema(combined_df, TRADESMART_SCHEMA), snapshot_path(output_file))
+        logging.info("Combined data saved to %s and %s", output_file, snapshot_path(output_file))
+        logging.info("Total rows in combined data: %s", len(combined_df))
+        # Validators are saved only once the output they describe is written, so a failed write is retried
+        if cache:
+            cache.save()
+
         return combined_df
     else:
         logging.error("No data was downloaded successfully")
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,143 @@
+# instrument_index.py
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.expiry_calendar import EXPIRY_CODES, resolve_codes  # noqa: E402
+
+FNO_EXCHANGES = ['NFO', 'CDS', 'MCX', 'BFO', 'BCD']
+
+# Instrument class used for every option row; options are matched on
+# strike and CE/PE regardless of OPTIDX/OPTSTK/OPTCUR, as the masking path does.
+OPTION_CLASS = 'OPT'
+# Futures lookups always resolve against FUTIDX, as filter_fno_instruments does.
+FUTURE_CLASS = 'FUTIDX'
+# Expiry code -> its column in FnoIndex's per-key positions
+CODE_INDEX = {code: i for i, code in enumerate(EXPIRY_CODES)}
+
+
+def _strike_column(df: pd.DataFrame) -> pd.Series:
+    """Numeric strike, taken from StrikePrice and falling back to Strike."""
+    strike = pd.to_numeric(df['StrikePrice'], errors='coerce') if 'StrikePrice' in df.columns \
+        else pd.Series(np.nan, index=df.index)
+    if 'Strike' in df.columns:
+        strike = strike.fillna(pd.to_numeric(df['Strike'], errors='coerce'))
+    return strike
+
+
+def _expiry_column(df: pd.DataFrame) -> pd.Series:
+    if 'expiry' in df.columns and pd.api.types.is_datetime64_dtype(df['expiry']):
+        return df['expiry']  # already parsed by the snapshot
+    return pd.to_datetime(df['Expiry'], format='%d-%b-%Y', errors='coerce')
+
+
+def option_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """The F&O option rows in the columns OptionChains (common/option_chain.py) reads."""
+    # On a categorical Instrument the prefix test runs once per category
+    options = df[df['Exchange'].isin(FNO_EXCHANGES) & df['Instrument'].str.startswith('OPT').fillna(False)]
+    return pd.DataFrame({
+        'exchange': options['Exchange'],
+        'underlying': options['Symbol'],
+        'expiry': _expiry_column(options),
+        'strike': _strike_column(options),
+        'put': options['OptionType'] == 'PE',
+        'token': options['Token'],
+        'trading_symbol': options['TradingSymbol'],
+        'lot_size': options['LotSize'],
+    })
+
+
+class FnoIndex:
+    """
+    Composite index over the F&O rows of the TradeSmart instrument master.
+
+    Keys are (exchange, underlying, instrument class, strike, CE/PE). Expiry
+    codes resolve on the calendar of the underlying's whole instrument
+    class, as ICICI's expiry_calendars and OptionChains do: 'W' is the
+    underlying's nearest expiry, and a strike not listed on it does not
+    resolve rather than rolling to a later one. Every key holds the row
+    position for each code, so resolving a leg is a dict hit and an index.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        fno = df[df['Exchange'].isin(FNO_EXCHANGES)]
+        expiry = _expiry_column(fno)
+        instrument = fno['Instrument'].astype(str)
+        is_option = instrument.str.startswith('OPT')
+
+        keys = pd.DataFrame({
+            'exchange': fno['Exchange'].astype(str),
+            'symbol': fno['Symbol'].astype(str).str.upper(),
+            'instrument': instrument.where(~is_option, OPTION_CLASS),
+            'strike': _strike_column(fno).where(is_option, 0.0),
+            'option_type': fno['OptionType'].astype(str).where(is_option, ''),
+            'expiry': expiry,
+        })
+        keys = keys[keys['expiry'].notna() & keys['strike'].notna()]
+
+        key_cols = ['exchange', 'symbol', 'instrument', 'strike', 'option_type']
+        group_id = keys.groupby(key_cols, sort=False).ngroup().to_numpy()
+        expiry_ns = keys['expiry'].to_numpy('datetime64[ns]').astype(np.int64)
+        order = np.lexsort((np.arange(len(keys)), expiry_ns, group_id))
+
+        group_id = group_id[order]
+        expiry_ns = expiry_ns[order]
+        rows = fno.loc[keys.index[order]]
+        self.tokens = rows['Token'].to_numpy()
+        self.trading_symbols = rows['TradingSymbol'].to_numpy()
+        self.lot_sizes = rows['LotSize'].to_numpy()
+
+        n = len(order)
+        if n == 0:
+            self._positions = {}
+            return
+        new_group = np.r_[True, group_id[1:] != group_id[:-1]]
+        group_of_row = np.cumsum(new_group) - 1
+        first_rows = keys.iloc[order[new_group]]
+        group_underlying = first_rows.groupby(key_cols[:3], sort=False).ngroup().to_numpy()
+        row_underlying = group_underlying[group_of_row]
+
+        # The date each code names on each underlying's distinct expiries
+        pair_order = np.lexsort((expiry_ns, row_underlying))
+        underlying, dates = row_underlying[pair_order], expiry_ns[pair_order]
+        distinct = np.r_[True, (underlying[1:] != underlying[:-1]) | (dates[1:] != dates[:-1])]
+        resolved = resolve_codes(underlying[distinct], dates[distinct])
+
+        # Per key and code, the first row on the code's date, which is what filter_by_expiry picks
+        new_run = new_group | np.r_[True, expiry_ns[1:] != expiry_ns[:-1]]
+        positions = np.full((len(first_rows), len(EXPIRY_CODES)), -1)
+        for c in range(len(EXPIRY_CODES)):
+            hits = np.flatnonzero(new_run & (expiry_ns == resolved[row_underlying, c]))
+            positions[group_of_row[hits], c] = hits
+        self._positions = dict(zip(zip(*(first_rows[col].tolist() for col in key_cols)), positions.tolist()))
+
+    def __len__(self):
+        return len(self._positions)
+
+    @staticmethod
+    def make_key(exchange, symbol, strike_price=None, ce_pe=None, instrumenttype=None):
+        if 'FUT' in (instrumenttype or ''):
+            return exchange, symbol.upper(), FUTURE_CLASS, 0.0, ''
+        return exchange, symbol.upper(), OPTION_CLASS, float(strike_price), ce_pe
+
+    def position(self, exchange, symbol, strike_price=None, ce_pe=None, expiry='W', instrumenttype=None):
+        """Return the row position for a leg, or None when it does not resolve."""
+        try:
+            key = self.make_key(exchange, symbol, strike_price, ce_pe, instrumenttype)
+        except (TypeError, ValueError):
+            return None
+        positions = self._positions.get(key)
+        code = CODE_INDEX.get(expiry)
+        if positions is None or code is None or positions[code] < 0:
+            return None
+        return positions[code]
+
+    def lookup(self, exchange, symbol, strike_price=None, ce_pe=None, expiry='W', instrumenttype=None):
+        """Return (token, trading symbol, lot size) for a leg, or (None, None, None)."""
+        pos = self.position(exchange, symbol, strike_price, ce_pe, expiry, instrumenttype)
+        if pos is None:
+            return None, None, None
+        return self.tokens[pos], self.trading_symbols[pos], self.lot_sizes[pos]
@@ -1,7 +1,15 @@
 # login.py
+import os
+import sys
+
 import pyotp  # type: ignore
 from NorenRestApiPy.NorenApi import NorenApi  # type: ignore
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.session_pool import AuthError, daily_expiry  # noqa: E402
+
+BROKER_NAME = "Trade Smart"
+
 
 class TradeSmartLogin(NorenApi):
     def __init__(self):
@@ -9,17 +17,74 @@ class TradeSmartLogin(NorenApi):
             host='https://v2api.tradesmartonline.in/NorenWClientTP/',
             websocket='wss://v2api.tradesmartonline.in/NorenWSTP/'
         )
-       
+
+    def open_session(self, user, pwd, factor2, vc, app_key, imei):
+        """Full TOTP login; returns the session token."""
+        login_data = self.login(
+            userid=user,
+            password=pwd,
+            twoFA=pyotp.TOTP(factor2).now(),
+            vendor_code=vc,
+            api_secret=app_key,
+            imei=imei
+        )
+        if not login_data or not login_data.get('susertoken'):
+            raise AuthError(f"Trade Smart login failed for {user}")
+        return login_data['susertoken']
+
+    @staticmethod
+    def is_session_error(result):
+        return isinstance(result, dict) and result.get('stat') == 'Not_Ok' and \
+            'session' in str(result.get('emsg', '')).lower()
+
+    @classmethod
+    def auth_failed(cls, result, client):
+        """
+        is_auth_failure for SessionPool.call. Most NorenApi calls return None
+        on any error, so a None is only blamed on the session when a
+        get_limits probe reports it expired.
+        """
+        if cls.is_session_error(result):
+            return True
+        return result is None and cls.is_session_error(client.get_limits())
+
+    @classmethod
+    def session_factories(cls, user, pwd, factor2, vc, app_key, imei):
+        """login / restore callables for SessionPool: restoring only sets the persisted token."""
+        def login():
+            client = cls()
+            token = client.open_session(user, pwd, factor2, vc, app_key, imei)
+            return client, token, daily_expiry()
+
+        def restore(token):
+            client = cls()
+            client.set_session(user, pwd, token)
+            return client
+
+        return login, restore
+
+    @classmethod
+    def pooled(cls, pool, user, pwd, factor2, vc, app_key, imei):
+        """A logged-in client from pool, logging in only when no live or persisted session exists."""
+        return pool.session(user, BROKER_NAME, *cls.session_factories(user, pwd, factor2, vc, app_key, imei))
+
+    @classmethod
+    def pooled_call(cls, pool, creds, fn):
+        """fn(client) on the pooled session of creds, re-logging in once if the session has expired."""
+        login, restore = cls.session_factories(**creds)
+        return pool.call(creds['user'], BROKER_NAME, login, restore, fn, cls.auth_failed)
+
     def login_to_broker(self, user, pwd, factor2, vc, app_key, imei):
-        UserBrokerDetails.getUserBrokerDetailsByUserIdAndBroker(
+        user_broker_details = UserBrokerDetails.getUserBrokerDetailsByUserIdAndBroker(
             user_id, "Trade Smart"
         )
 
-          if not all([
+        if not all([
             user_broker_details.get('password'),
             user_broker_details.get('factor2'),
             user_broker_details.get('client_id')
         ]):
+            raise BrokerError("Missing required Trade Smart credentials")
 
         totp = pyotp.TOTP(factor2)
         otp = totp.now()
@@ -1,66 +1,133 @@
+import numpy as np
 import pandas as pd
 
+INPUT_FILE = r"C:\Users\aayus\OneDrive\Desktop\finance-browser\combined_instruments.csv"
+OUTPUT_FILE = r"C:\Users\aayus\OneDrive\Desktop\finance-browser\normalized_instruments.csv"
 
-def create_normalized_symbols():
+
+def generate_normalized_symbol(row):
+    """Row-at-a-time reference for normalize_symbols; expects an expiry_date column."""
+    try:
+        symbol = str(row['Symbol'])
+
+        # For equity instruments
+        if row['Instrument'] == 'EQ':
+            return symbol
+
+        # Handle expiry formatting
+        if pd.notna(row['expiry_date']):
+            # Check if weekly by adding 7 days and seeing if month changes
+            next_week = row['expiry_date'] + pd.Timedelta(days=7)
+            is_weekly = next_week.month == row['expiry_date'].month
+
+            if 'FUT' in str(row['Instrument']):
+                # For futures: DDMMMYY format
+                expiry = row['expiry_date'].strftime('%d%b%y').upper()
+            elif is_weekly:  # Weekly options
+                # For weekly options: YYMMDD format
+                expiry = (row['expiry_date'].strftime('%y') +
+                        str(int(row['expiry_date'].strftime('%m'))) +
+                        row['expiry_date'].strftime('%d'))
+            else:  # Monthly options
+                # For monthly options: YYMM format
+                expiry = row['expiry_date'].strftime('%y%b').upper()
+        else:
+            expiry = ''
+
+        # Handle strike price: skip for FUT instruments
+        if pd.notna(row['StrikePrice']) and 'FUT' not in str(row['Instrument']):
+            strike_price = str(int(float(row['StrikePrice'])))
+        else:
+            strike_price = ''
+
+        # Handle option type
+        if 'OPT' in str(row['Instrument']):
+            option_type = str(row['OptionType'])
+        else:
+            option_type = 'FUT'
+
+        return symbol + expiry + strike_price + option_type
+
+    except Exception as e:
+        print(f"Error processing row: {row}")
+        return row['TradingSymbol']
+
+
+def _str_values(series: pd.Series) -> np.ndarray:
+    """str() of every value, computed once per distinct value."""
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    return np.array([str(u) for u in uniques] + [''], dtype=object)[codes]
+
+
+def _strike_values(series: pd.Series):
+    """str(int(float(strike))) per distinct strike, plus a mask of values that fail to convert."""
+    codes, uniques = pd.factorize(series)
+    labels, failed = [], []
+    for value in uniques:
+        try:
+            labels.append(str(int(float(value))))
+            failed.append(False)
+        except (TypeError, ValueError, OverflowError):
+            labels.append('')
+            failed.append(True)
+    labels, failed = np.array(labels + [''], dtype=object), np.array(failed + [False])
+    return labels[codes], failed[codes]
+
+
+def _expiry_values(expiry_date: pd.Series):
+    """Futures, weekly and monthly expiry codes per distinct expiry date."""
+    codes, uniques = pd.factorize(expiry_date)
+    futures = [d.strftime('%d%b%y').upper() for d in uniques]
+    weekly = [d.strftime('%y') + str(int(d.strftime('%m'))) + d.strftime('%d') for d in uniques]
+    monthly = [d.strftime('%y%b').upper() for d in uniques]
+    is_weekly = [(d + pd.Timedelta(days=7)).month == d.month for d in uniques]
+    take = lambda values, fill: np.array(list(values) + [fill], dtype=object)[codes]  # noqa: E731
+    return take(futures, ''), take(weekly, ''), take(monthly, ''), take(is_weekly, False).astype(bool)
+
+
+def normalize_symbols(df: pd.DataFrame) -> pd.Series:
+    """
+    Columnar version of generate_normalized_symbol. Formatting is done once
+    per distinct expiry, strike, symbol and instrument value and then
+    broadcast, so the output matches the row-wise path exactly.
+    """
+    expiry_date = df['expiry_date'] if 'expiry_date' in df.columns \
+        else pd.to_datetime(df['Expiry'], format='%d-%b-%Y', errors='coerce')
+
+    symbol = _str_values(df['Symbol'])
+    instrument = _str_values(df['Instrument'])
+    is_eq = (df['Instrument'] == 'EQ').to_numpy()
+    is_fut = np.array(['FUT' in i for i in instrument], dtype=bool)
+    is_opt = np.array(['OPT' in i for i in instrument], dtype=bool)
+
+    futures, weekly, monthly, is_weekly = _expiry_values(expiry_date)
+    expiry = np.where(is_fut, futures, np.where(is_weekly, weekly, monthly))
+
+    strike, strike_failed = _strike_values(df['StrikePrice'])
+    strike = np.where(is_fut, '', strike)
+    failed = strike_failed & ~is_fut & ~is_eq
+
+    option_type = np.where(is_opt, _str_values(df['OptionType']), 'FUT')
+
+    normalized = symbol + expiry + strike + option_type
+    normalized = np.where(is_eq, symbol, normalized)
+    normalized = np.where(failed, df['TradingSymbol'].to_numpy(dtype=object), normalized)
+    return pd.Series(normalized, index=df.index, dtype=object)
+
+
+def create_normalized_symbols(input_file=INPUT_FILE, output_file=OUTPUT_FILE):
     # Load the data
-    df = pd.read_csv(r"C:\Users\aayus\OneDrive\Desktop\finance-browser\combined_instruments.csv")
-    
+    df = pd.read_csv(input_file)
+
     # Convert expiry to datetime
     df['expiry_date'] = pd.to_datetime(df['Expiry'], format='%d-%b-%Y', errors='coerce')
-    
-    def generate_normalized_symbol(row):
-        try:
-            symbol = str(row['Symbol'])
-            
-            # For equity instruments
-            if row['Instrument'] == 'EQ':
-                return symbol
-
-            # Handle expiry formatting
-            if pd.notna(row['expiry_date']):
-                # Check if weekly by adding 7 days and seeing if month changes
-                next_week = row['expiry_date'] + pd.Timedelta(days=7)
-                is_weekly = next_week.month == row['expiry_date'].month
-
-                if 'FUT' in str(row['Instrument']):
-                    # For futures: DDMMMYY format
-                    expiry = row['expiry_date'].strftime('%d%b%y').upper()
-                elif is_weekly:  # Weekly options
-                    # For weekly options: YYMMDD format
-                    expiry = (row['expiry_date'].strftime('%y') + 
-                            str(int(row['expiry_date'].strftime('%m'))) + 
-                            row['expiry_date'].strftime('%d'))
-                else:  # Monthly options
-                    # For monthly options: YYMM format
-                    expiry = row['expiry_date'].strftime('%y%b').upper()
-            else:
-                expiry = ''
-            
-            # Handle strike price: skip for FUT instruments
-            if pd.notna(row['StrikePrice']) and 'FUT' not in str(row['Instrument']):
-                strike_price = str(int(float(row['StrikePrice'])))
-            else:
-                strike_price = ''
-
-            # Handle option type
-            if 'OPT' in str(row['Instrument']):
-                option_type = str(row['OptionType'])
-            else:
-                option_type = 'FUT'
-
-            return symbol + expiry + strike_price + option_type
-            
-        except Exception as e:
-            print(f"Error processing row: {row}")
-            return row['TradingSymbol']
 
     # Create new column
-    df['NormalizedSymbol'] = df.apply(generate_normalized_symbol, axis=1)
-    
+    df['NormalizedSymbol'] = normalize_symbols(df)
+
     # Save to new file
-    output_path = r"C:\Users\aayus\OneDrive\Desktop\finance-browser\normalized_instruments.csv"
-    df.to_csv(output_path, index=False)
-    
+    df.to_csv(output_file, index=False)
+
     # Print some examples to verify
     print("\nSample of normalized symbols with expiry type:")
     sample = df[['TradingSymbol', 'NormalizedSymbol', 'Expiry']].head(10)
@@ -72,6 +139,7 @@ def create_normalized_symbols():
         print(f"Normalized: {row['NormalizedSymbol']}")
         print(f"Type: {'Weekly' if is_weekly else 'Monthly'}")
         print("---")
+    return df
 
 if __name__ == "__main__":
-    create_normalized_symbols()
\ No newline at end of file
+    create_normalized_symbols()
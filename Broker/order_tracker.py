@@ -0,0 +1,177 @@
+# order_tracker.py
+"""
+Completion tracking for Noren orders.
+
+Order updates ('om' messages on the websocket) resolve a per-order Future as
+soon as the order reaches a terminal status. Orders the stream has not
+settled are polled over REST (single_order_history) by one shared thread,
+with a delay that doubles from min_delay up to max_delay; while the stream
+is connected the first poll waits stream_grace seconds, so REST is only the
+fallback. Each poll first calls throttle(), when given; TradeSmart passes
+its rate limiter's wait for a status slot. A failed poll, or an error
+answer such as {'stat': 'Not_Ok', 'emsg': 'Session Expired'}, counts as
+not yet terminal and the order is polled again.
+
+A terminal update for an order nobody is waiting on is kept for
+early_ttl seconds (at most max_early of them), in case place_order has
+not returned its number yet; updates for the last settled_size orders
+already settled or forgotten, such as the stream's copy of a fill REST
+saw first, are dropped.
+"""
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+TERMINAL_STATUSES = ('COMPLETE', 'REJECTED', 'CANCELED')
+
+
+class OrderTracker:
+    def __init__(self, api, stream_grace=1.0, min_delay=0.05, max_delay=1.0, throttle=None, early_ttl=60.0,
+                 max_early=1024, settled_size=4096):
+        self.api = api
+        self.throttle = throttle
+        self.stream_grace = stream_grace
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.early_ttl = early_ttl
+        self.max_early = max_early
+        self.settled_size = settled_size
+        self.streaming = threading.Event()
+        self.stats = {'stream': 0, 'rest': 0, 'polls': 0, 'late': 0, 'errors': 0}
+        self._futures = {}
+        # orderno -> (arrival, update) for terminal updates that came before track(), oldest first
+        self._updates = OrderedDict()
+        # Recently settled or forgotten order numbers, oldest first
+        self._settled = OrderedDict()
+        self._schedule = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._poller = None
+
+    # Websocket callbacks
+
+    def on_open(self):
+        self.api.subscribe_orders()
+        self.streaming.set()
+
+    def on_close(self):
+        self.streaming.clear()
+
+    def on_order_update(self, update):
+        self._settle(str(update.get('norenordno')), update, 'stream')
+
+    # Waiting
+
+    def track(self, orderno) -> Future:
+        """
+        Future resolving to the terminal order update (a dict with at least
+        'status') of orderno. Updates that arrived before the call count.
+        """
+        orderno = str(orderno)
+        with self._cond:
+            future = self._futures.get(orderno)
+            if future is not None:
+                return future
+            future = self._futures[orderno] = Future()
+            self._expire_updates()
+            early = self._updates.pop(orderno, None)
+            if early is not None:
+                del self._futures[orderno]
+                self._mark_settled(orderno)
+                future.set_result(early[1])
+                return future
+            first = self.stream_grace if self.streaming.is_set() else self.min_delay
+            heapq.heappush(self._schedule, (time.monotonic() + first, next(self._seq), orderno, self.min_delay))
+            if self._poller is None or not self._poller.is_alive():
+                self._poller = threading.Thread(target=self._poll_loop, name='order-poller', daemon=True)
+                self._poller.start()
+            self._cond.notify()
+        return future
+
+    def wait_async(self, orderno):
+        """Awaitable form of track() for the running event loop."""
+        return asyncio.wrap_future(self.track(orderno))
+
+    def forget(self, orderno):
+        """Stop tracking orderno, e.g. after the caller gave up waiting."""
+        with self._cond:
+            self._futures.pop(str(orderno), None)
+            self._updates.pop(str(orderno), None)
+            self._mark_settled(str(orderno))
+
+    # Internals
+
+    def _settle(self, orderno, update, source):
+        with self._cond:
+            if update.get('status') not in TERMINAL_STATUSES:
+                return
+            future = self._futures.get(orderno)
+            if future is None:
+                if orderno in self._settled:
+                    self.stats['late'] += 1
+                    return
+                # Fills can arrive before place_order returns the order number.
+                self._updates[orderno] = (time.monotonic(), update)
+                self._updates.move_to_end(orderno)
+                self._expire_updates()
+                return
+            del self._futures[orderno]
+            self._mark_settled(orderno)
+            self.stats[source] += 1
+        if not future.done():
+            future.set_result(update)
+
+    def _mark_settled(self, orderno):
+        self._settled[orderno] = None
+        self._settled.move_to_end(orderno)
+        while len(self._settled) > self.settled_size:
+            self._settled.popitem(last=False)
+
+    def _expire_updates(self):
+        """Drop early updates past early_ttl, and the oldest beyond max_early (orders this session never tracks)."""
+        cutoff = time.monotonic() - self.early_ttl
+        while self._updates and (len(self._updates) > self.max_early or next(iter(self._updates.values()))[0] < cutoff):
+            self._updates.popitem(last=False)
+
+    @staticmethod
+    def _terminal(history):
+        """The terminal entry of a single_order_history answer; None for an open order or an error dict."""
+        if not isinstance(history, list):
+            return None
+        return next((h for h in history if isinstance(h, dict) and h.get('status') in TERMINAL_STATUSES), None)
+
+    def _poll_loop(self):
+        while True:
+            with self._cond:
+                while not self._schedule:
+                    self._cond.wait()
+                due, _, orderno, delay = self._schedule[0]
+                wait = due - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                heapq.heappop(self._schedule)
+                if orderno not in self._futures:
+                    continue
+            try:
+                if self.throttle is not None:
+                    self.throttle()
+                history = self.api.single_order_history(orderno)
+                error = history is not None and not isinstance(history, list)
+                terminal = self._terminal(history)
+            except Exception:
+                error, terminal = True, None
+            with self._cond:
+                self.stats['polls'] += 1
+                self.stats['errors'] += error
+            if terminal is not None:
+                self._settle(orderno, terminal, 'rest')
+                continue
+            delay = min(delay * 2, self.max_delay)
+            with self._cond:
+                if orderno in self._futures:
+                    heapq.heappush(self._schedule, (time.monotonic() + delay, next(self._seq), orderno, delay))
@@ -2,133 +2,405 @@
 import io
 import logging
 import os
-import time
-import uuid
+import sys
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import partial
 
 import pandas as pd
 import requests
+from instrument_index import FNO_EXCHANGES, FUTURE_CLASS, FnoIndex, option_rows
 from login import TradeSmartLogin
+from order_tracker import OrderTracker
+from tick_feed import TickFeed
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.expiry_calendar import ExpiryCalendar  # noqa: E402
+from common.basket import TRADESMART_ORDER_FIELDS, order_kwargs, run_basket  # noqa: E402
+from common.instrumentation import configure_logging, span, timed  # noqa: E402
+from common.instrument_schema import TRADESMART_SCHEMA, apply_schema, read_csv, source_columns  # noqa: E402
+from common.instrument_store import InstrumentStore  # noqa: E402
+from common.legs import describe_leg, leg_kwargs  # noqa: E402
+from common.option_chain import OptionChains  # noqa: E402
+from common.paper_engine import MARKET_TYPES, PaperEngine  # noqa: E402
+from common.quote_cache import QuoteCache  # noqa: E402
+from common.rate_limiter import ORDER, QUOTE, STATUS, RateLimiter  # noqa: E402
+from common.snapshot import is_fresh, read_snapshot, snapshot_path  # noqa: E402
+from common.symbol_index import SymbolIndex  # noqa: E402
 
 DATA_FOLDER = r"C:\Users\aayus\OneDrive\Desktop\finance-browser\Broker\files"
+INSTRUMENTS_FILE = r"C:\Users\aayus\OneDrive\Desktop\finance-browser\combined_instruments.csv"
 COMBINED_FILE = os.path.join(DATA_FOLDER, "combined_instruments_2.csv")
 
-logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
-
 # Ensure data folder exists
 os.makedirs(DATA_FOLDER, exist_ok=True)
 
 def load_combined_instruments(file_path: str) -> pd.DataFrame:
     """
-    Load the combined_instruments.csv file into a DataFrame.
+    Load the combined_instruments.csv file into a DataFrame with the
+    columns and dtypes of TRADESMART_SCHEMA.
+
+    The typed snapshot written alongside it by download_and_combine_data is
+    used when present and up to date; the CSV is only parsed as a fallback.
     """
+    if is_fresh(file_path):
+        df = read_snapshot(snapshot_path(file_path), categorical=True, columns=source_columns(TRADESMART_SCHEMA))
+        return apply_schema(df, TRADESMART_SCHEMA)
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"File not found: {file_path}")
-
-    df = pd.read_csv(file_path)
-    
-    df = df.loc[:, ~df.columns.str.contains('^unnamed')]
-    return df
+    return read_csv(file_path, TRADESMART_SCHEMA)
 
 class TradeSmart(TradeSmartLogin):
     exchange_data: pd.DataFrame = None
+    # Set when exchange_data is attached to the shared snapshot rather than loaded privately
+    instrument_store: InstrumentStore = None
+    fno_index: FnoIndex = None
+    symbol_tokens: dict = None
+    # Ranked partial TradingSymbol search per exchange, for when there is no exact match
+    symbol_index: SymbolIndex = None
+    # Strike ladders per (exchange, underlying, expiry), rebuilt with the other indexes
+    option_chains: OptionChains = None
+    quote_cache = QuoteCache(ttl=1.0)
+    quote_workers = 8
+    tick_feed: TickFeed = None
+    order_tracker: OrderTracker = None
+    order_timeout = 3.0
+    # Most legs of one place_basket call in flight at once
+    basket_workers = 8
+    paper_engine: PaperEngine = None
+    # Seconds a price the paper engine was given stays usable once the tick feed and quote cache have none
+    paper_max_age = 5.0
+    # Thread pool size of the AsyncBroker lane (common/async_broker.py)
+    async_workers = 16
+    # Client-side limits for limiter(): Noren endpoint (or '*' for every call) -> (calls per second, burst).
+    # Noren does not publish its limits, so the default None only counts calls and waits, e.g.
+    # {'*': (10, 10), 'GetQuotes': (5, 5)} to throttle once a limit is documented or measured.
+    rate_limits: dict = None
+    rate_limiter: RateLimiter = None
+
+    def initialize_data(self, file_path=INSTRUMENTS_FILE):
+        """
+        Attach to the snapshot published by download_and_combine_data when
+        it is up to date: every worker process then maps the same copy of
+        the master. Without one, load the CSV privately.
+        """
+        if is_fresh(file_path):
+            TradeSmart.instrument_store = InstrumentStore(snapshot_path(file_path), schema=TRADESMART_SCHEMA)
+            TradeSmart.exchange_data = TradeSmart.instrument_store.attach()
+        else:
+            TradeSmart.instrument_store = None
+            TradeSmart.exchange_data = load_combined_instruments(file_path)
+        TradeSmart.build_indexes()
+
+        logging.info("Instrument data loaded successfully")
 
-    def initialize_data(self):
-        # exchange_data: pd.DataFrame = None
-        TradeSmart.exchange_data = load_combined_instruments(r"C:\Users\aayus\OneDrive\Desktop\finance-browser\combined_instruments.csv")
-        
-        print("Instrument data loaded successfully")
+    @classmethod
+    def build_indexes(cls):
+        cls.fno_index = FnoIndex(cls.exchange_data)
+        cls.symbol_tokens = cls.build_symbol_tokens(cls.exchange_data)
+        cls.symbol_index = SymbolIndex(cls.exchange_data['TradingSymbol'], cls.exchange_data['Exchange'])
+        cls.option_chains = OptionChains(option_rows(cls.exchange_data))
+
+    @classmethod
+    def refresh_instruments(cls):
+        """Switch to a master republished since initialize_data; True when it changed."""
+        if cls.instrument_store is None or not cls.instrument_store.refresh():
+            return False
+        cls.exchange_data = cls.instrument_store.frame
+        cls.build_indexes()
+        return True
+
+    def start_streams(self, instruments=(), track_orders=True):
+        """
+        Open the Noren websocket. Touchline ticks for instruments go into
+        TradeSmart.tick_feed: get_ltp serves prices from it while connected
+        and subscribes tokens it misses, so later reads skip the REST quote.
+        With track_orders, order updates on the same socket settle the
+        futures place_order_on_broker waits on.
+        """
+        TradeSmart.tick_feed = feed = TickFeed(self, TradeSmart.exchange_data)
+        feed.subscribe(instruments)
+        tracker = self.tracker() if track_orders else None
+
+        def on_open():
+            feed.on_open()
+            if tracker is not None:
+                tracker.on_open()
+
+        def on_close():
+            feed.on_close()
+            if tracker is not None:
+                tracker.on_close()
+
+        self.start_websocket(subscribe_callback=feed.on_tick,
+                             order_update_callback=tracker.on_order_update if tracker else None,
+                             socket_open_callback=on_open,
+                             socket_close_callback=on_close)
+        return feed
+
+    def stop_streams(self):
+        self.close_websocket()
+        if self.tick_feed is not None:
+            self.tick_feed.on_close()
+        if self.order_tracker is not None:
+            self.order_tracker.on_close()
+
+    def tracker(self):
+        """This session's OrderTracker; without start_streams it settles orders by REST polling alone."""
+        if self.order_tracker is None:
+            self.order_tracker = OrderTracker(self, throttle=partial(self.limiter().acquire, 'SingleOrdHist', STATUS))
+        return self.order_tracker
+
+    def limiter(self):
+        """
+        This session's RateLimiter: orders and cancels go ahead of order
+        status polls, and those ahead of quotes and limits.
+        """
+        if self.rate_limiter is None:
+            self.rate_limiter = RateLimiter(self.rate_limits, name='tradesmart')
+        return self.rate_limiter
+
+    def paper(self):
+        """This session's PaperEngine, priced from the tick feed and the quote cache."""
+        if self.paper_engine is None:
+            self.paper_engine = PaperEngine(self.paper_price, max_age=self.paper_max_age)
+        return self.paper_engine
+
+    def paper_price(self, exchange, token):
+        """Local price for a paper fill: the tick feed table, then a fresh quote_cache entry; never the network."""
+        price = self.tick_feed.ltp(exchange, token) if self.tick_feed is not None else None
+        if price is None:
+            quote = self.quote_cache.get(exchange, token)
+            price = float(quote.get('lp', 0)) if quote is not None else None
+        return price
+
+    def place_paper_order(self, symbol, qty, exchange, buy_sell, order_type, price):
+        """
+        Match a paper order on paper(); returns (order_id, status, price, error).
+        A market order for a token with no local price is quoted once over
+        REST, and the engine reuses that price for paper_max_age seconds.
+        """
+        token, _ = self.resolve_ltp_token(exchange, symbol)
+        if token is None:
+            return None, None, None, f"No instrument found for {exchange}:{symbol}"
+        engine = self.paper()
+        if str(order_type).upper() in MARKET_TYPES and engine.price(exchange, token) is None:
+            with span('tradesmart.ltp_fallback'):
+                ltp = self.quote_ltp(exchange, token)
+            if ltp:
+                engine.on_price(exchange, token, ltp)
+        order_id, status, fill_price, error = engine.place(exchange, token, buy_sell, qty, order_type, price)
+        return order_id, status, fill_price if fill_price is not None else price, error
+
+    def stream_ltp(self, exchange, token):
+        """Price from the tick feed, or None; a miss subscribes the token for next time."""
+        feed = self.tick_feed
+        if feed is None:
+            return None
+        price = feed.ltp(exchange, token)
+        if price is None and feed.connected.is_set():
+            feed.subscribe([(exchange, token)])
+        return price
 
     def get_funds_available(self):
-        funds = self.get_limits()
+        with self.limiter().slot('Limits', QUOTE), span('tradesmart.api.get_limits'):
+            funds = self.get_limits()
         return funds if funds and funds.get("stat") == "Ok" else "Failed to fetch funds"
-    def get_ltp(self, exchange, searchtext):
-        try:
-            df = self.exchange_data[self.exchange_data['Exchange'] == exchange]
 
-            if df is None or df.empty:
-                print(f"No data available for exchange {exchange}")
-                return 0
+    @staticmethod
+    def build_symbol_tokens(df):
+        """(Exchange, TradingSymbol) -> (token, trading_symbol) for exact get_ltp matches; first row wins."""
+        # Categorical columns hand back their category strings without a per-row conversion
+        exchanges = df['Exchange'].to_numpy(dtype=object)[::-1]
+        symbols = df['TradingSymbol'].to_numpy(dtype=object)[::-1]
+        tokens = list(map(str, df['Token'].tolist()))[::-1]
+        # Built from the last row backwards so the first occurrence is the one kept.
+        return dict(zip(zip(exchanges, symbols), zip(tokens, symbols)))
 
-            searchtext = searchtext.upper()
-            print(f"Searching for {searchtext} in {exchange}")
-
-            # First try exact match
-            result = df[df['TradingSymbol'] == searchtext]
-            if result.empty:
-                # If no exact match, try partial match
-                result = df[df['TradingSymbol'].str.contains(searchtext, case=False, na=False)]
-
-            print("Found matches:", result['TradingSymbol'].tolist() if not result.empty else "None")
-
-            if not result.empty:
-                # Get token directly from the DataFrame
-                token = str(result['Token'].iloc[0])
-                trading_symbol = result['TradingSymbol'].iloc[0]
-                print(f"Using token {token} for {trading_symbol}")
-
-                get_ltp = self.get_quotes(exchange, token)
-                if get_ltp and 'lp' in get_ltp:
-                    ltp = float(get_ltp.get('lp', 0))
-                    print(f"LTP found: {ltp}")
-                    return ltp
-                else:
-                    print("No LTP found in quotes response")
-                    return 0
-
-            print(f"No matches found for '{searchtext}' in {exchange}")
+    @classmethod
+    def search_symbols(cls, exchange, text, limit=10):
+        """
+        Up to limit (token, trading_symbol, lot_size) candidates for a
+        partial or mistyped symbol in exchange, best first: exact match,
+        then symbols starting with text, then symbols containing it.
+        """
+        df = cls.exchange_data
+        return [(df['Token'].iat[position], trading_symbol, df['LotSize'].iat[position])
+                for trading_symbol, position in cls.symbol_index.search(exchange, text, limit)]
+
+    @classmethod
+    @timed('tradesmart.resolve_ltp_token')
+    def resolve_ltp_token(cls, exchange, searchtext):
+        """Token and trading symbol get_ltp quotes for searchtext: exact match first, then the best partial one."""
+        searchtext = searchtext.upper()
+        if cls.symbol_tokens is not None:
+            hit = cls.symbol_tokens.get((exchange, searchtext))
+            if hit is not None:
+                return hit
+
+        if cls.symbol_index is not None:
+            hits = cls.search_symbols(exchange, searchtext, limit=1)
+            if not hits:
+                logging.warning("No matches found for '%s' in %s", searchtext, exchange)
+                return None, None
+            return str(hits[0][0]), hits[0][1]
+
+        df = cls.exchange_data[cls.exchange_data['Exchange'] == exchange]
+        if df is None or df.empty:
+            logging.warning("No data available for exchange %s", exchange)
+            return None, None
+
+        result = df[df['TradingSymbol'] == searchtext]
+        if result.empty:
+            result = df[df['TradingSymbol'].str.contains(searchtext, case=False, na=False)]
+        if result.empty:
+            logging.warning("No matches found for '%s' in %s", searchtext, exchange)
+            return None, None
+        return str(result['Token'].iloc[0]), result['TradingSymbol'].iloc[0]
+
+    def fetch_ltp(self, exchange, token):
+        """Quote one token over REST and cache the response; 0 when it has no 'lp'."""
+        with self.limiter().slot('GetQuotes', QUOTE), span('tradesmart.api.get_quotes'):
+            quote = self.get_quotes(exchange, token)
+        if not quote or 'lp' not in quote:
+            logging.warning("No LTP found in quotes response for %s:%s", exchange, token)
             return 0
+        self.quote_cache.put(exchange, token, quote)
+        return float(quote.get('lp', 0))
+
+    def quote_ltp(self, exchange, token):
+        """LTP for one token, served from quote_cache while fresh."""
+        quote = self.quote_cache.get(exchange, token)
+        if quote is not None:
+            return float(quote.get('lp', 0))
+        return self.fetch_ltp(exchange, token)
+
+    @timed('tradesmart.get_ltp')
+    def get_ltp(self, exchange, searchtext):
+        try:
+            token, trading_symbol = self.resolve_ltp_token(exchange, searchtext)
+            if token is None:
+                return 0
+            logging.debug("Using token %s for %s", token, trading_symbol)
+            price = self.stream_ltp(exchange, token)
+            return price if price is not None else self.quote_ltp(exchange, token)
 
         except Exception as e:
-            print(f"Error in get_ltp: {str(e)}")
+            logging.error("Error in get_ltp: %s", e)
             return 0
 
+    def get_ltp_many(self, items):
+        """
+        LTPs for several (exchange, searchtext) pairs, in input order, with 0
+        for any that cannot be resolved or quoted. Tokens are resolved up
+        front, repeated tokens are quoted once, tick_feed prices and fresh
+        quote_cache entries are reused, and the remaining quotes are fetched
+        concurrently on at most quote_workers threads.
+        """
+        tokens = []
+        for exchange, searchtext in items:
+            try:
+                token, _ = self.resolve_ltp_token(exchange, searchtext)
+            except Exception as e:
+                logging.error("Error in get_ltp_many for %s:%s: %s", exchange, searchtext, e)
+                token = None
+            tokens.append((exchange, token) if token is not None else None)
+
+        prices, misses = {}, []
+        for key in dict.fromkeys(key for key in tokens if key is not None):
+            price = self.stream_ltp(*key)
+            if price is not None:
+                prices[key] = price
+                continue
+            quote = self.quote_cache.get(*key)
+            if quote is not None:
+                prices[key] = float(quote.get('lp', 0))
+            else:
+                misses.append(key)
+
+        def fetch(key):
+            try:
+                return self.fetch_ltp(*key)
+            except Exception as e:
+                logging.error("Error in get_ltp_many for %s:%s: %s", key[0], key[1], e)
+                return 0
+
+        workers = min(self.quote_workers, len(misses))
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                prices.update(zip(misses, pool.map(fetch, misses)))
+        else:
+            prices.update((key, fetch(key)) for key in misses)
+        return [prices[key] if key is not None else 0 for key in tokens]
+
     def cancel_order_on_broker(self, order_id):
-        response = self.cancel_order(orderno=order_id)
+        with self.limiter().slot('CancelOrder', ORDER), span('tradesmart.api.cancel_order'):
+            response = self.cancel_order(orderno=order_id)
         return f"Order {order_id} cancelled successfully" if response and response.get("stat") == "Ok" else f"Failed to cancel order {order_id}"
 
+    @staticmethod
+    def expiry_dates(df):
+        # The snapshot carries 'expiry' already parsed; the frame is never written to.
+        if 'expiry' in df.columns and pd.api.types.is_datetime64_dtype(df['expiry']):
+            return df['expiry'].to_numpy()
+        return pd.to_datetime(df['Expiry'], format='%d-%b-%Y', errors='coerce').to_numpy()
+
     @classmethod
-    def filter_by_expiry(cls, df, expiry='W'):
-        df['expiry'] = pd.to_datetime(df['Expiry'], format='%d-%b-%Y', errors='coerce')
-        df = df.dropna(subset=['expiry']).sort_values('expiry')
-        monthly = df.groupby(df['expiry'].dt.to_period('M'))['expiry'].idxmax()
-        monthly_df = df.loc[monthly].sort_values('expiry')
-
-        if expiry == 'W': return df.iloc[0] if len(df) > 0 else None
-        elif expiry == 'NW': return df.iloc[1] if len(df) > 1 else None
-        elif expiry == 'M': return monthly_df.iloc[0] if len(monthly_df) > 0 else None
-        elif expiry == 'NM': return monthly_df.iloc[1] if len(monthly_df) > 1 else None
-        elif expiry == 'NNM': return monthly_df.iloc[2] if len(monthly_df) > 2 else None
+    def underlying_calendar(cls, df, exchange, symbol, instrumenttype=None):
+        """
+        ExpiryCalendar of all of symbol's options (or index futures) on
+        exchange: the dates the expiry codes name, as in fno_index.
+        """
+        rows = df[(df['Symbol'] == symbol) & (df['Exchange'] == exchange)]
+        instrument = rows['Instrument'].astype(str)
+        is_class = instrument == FUTURE_CLASS if 'FUT' in (instrumenttype or '') else instrument.str.startswith('OPT')
+        return ExpiryCalendar(cls.expiry_dates(rows[is_class]))
+
+    @classmethod
+    def filter_by_expiry(cls, df, expiry='W', calendar=None):
+        expiry_dates = cls.expiry_dates(df)
+        calendar = calendar or ExpiryCalendar(expiry_dates)
+
+        expiry_date = calendar.resolve(expiry)
+        if expiry_date is None:
+            return None
+        matches = df[expiry_dates == expiry_date]
+        return matches.iloc[0] if len(matches) > 0 else None
 
     @classmethod
     def filter_fno_instruments(cls, df, exchange, symbol, strike_price=None, ce_pe=None, instrumenttype=None):
         if 'FUT' in (instrumenttype or ''):
-            return df[
-                (df['Exchange'] == exchange) &
-                (df['TradingSymbol'].str.contains(symbol, case=False, na=False)) &
-                (df['Instrument'] == 'FUTIDX')
-            ]
+            df = df[(df['Exchange'] == exchange) & (df['Instrument'] == 'FUTIDX')]
         else:
-            return df[
+            # StrikePrice and Strike are float64 from load time (TRADESMART_SCHEMA)
+            strike = float(strike_price)
+            df = df[
                 (df['Exchange'] == exchange) &
-                (df['TradingSymbol'].str.contains(symbol, case=False, na=False)) &
-                (
-                    (pd.to_numeric(df['StrikePrice'], errors='coerce') == float(strike_price)) |
-                    (pd.to_numeric(df['Strike'], errors='coerce') == float(strike_price))
-                ) &
+                ((df['StrikePrice'] == strike) | (df['Strike'] == strike)) &
                 (df['OptionType'] == ce_pe)
             ]
+        # The substring search runs last, over the few rows the equality masks left
+        return df[df['TradingSymbol'].str.contains(symbol, case=False, na=False)]
 
     @classmethod
+    @timed('tradesmart.resolve_token')
     def get_token_details(cls, exch_seg, symbol, strike_price=None, is_pe=None, expiry='W', instrumenttype=None):
         symbol = symbol.upper()
         ce_pe = "PE" if is_pe == "1" else "CE"
+        if exch_seg in FNO_EXCHANGES and cls.fno_index is not None:
+            return cls.fno_index.lookup(exch_seg, symbol, strike_price, ce_pe, expiry, instrumenttype)
+        if exch_seg not in FNO_EXCHANGES and cls.symbol_index is not None:
+            hits = cls.search_symbols(exch_seg, symbol, limit=1)
+            return hits[0] if hits else (None, None, None)
+
         df = cls.exchange_data[cls.exchange_data['Exchange'] == exch_seg]
 
-        if exch_seg in ['NFO', 'CDS', 'MCX', 'BFO', 'BCD']:
+        if exch_seg in FNO_EXCHANGES:
             df_filtered = cls.filter_fno_instruments(df, exch_seg, symbol, strike_price, ce_pe, instrumenttype)
             if df_filtered is None or df_filtered.empty: return None, None, None
-            token_info = cls.filter_by_expiry(df_filtered, expiry)
+            calendar = cls.underlying_calendar(df, exch_seg, symbol, instrumenttype)
+            token_info = cls.filter_by_expiry(df_filtered, expiry, calendar)
             if token_info is not None:
                 return token_info['Token'], token_info['TradingSymbol'], token_info['LotSize']
         else:
@@ -137,138 +409,227 @@ class TradeSmart(TradeSmartLogin):
             token_info = df_filtered.iloc[0]
             return token_info['Token'], token_info['TradingSymbol'], token_info['LotSize']
 
+    @classmethod
+    def option_chain(cls, exchange, symbol, expiry='W'):
+        """
+        OptionChain (common/option_chain.py) of symbol's options expiring on
+        the expiry code, or None; chain.window(spot, n) gives ATM +/- n strikes.
+        """
+        if cls.option_chains is None:
+            cls.option_chains = OptionChains(option_rows(cls.exchange_data))
+        return cls.option_chains.chain(exchange, symbol, expiry)
+
+    @classmethod
+    def get_token_details_many(cls, legs):
+        """
+        Resolve several legs at once. Each leg is a dict of get_token_details
+        keyword arguments or a tuple in its positional order. Returns one
+        (token, trading_symbol, lot_size, error) tuple per leg, in input
+        order; error is None when the leg resolved.
+
+        F&O legs are dict hits on fno_index and equity legs are searched
+        on symbol_index, so no frame is scanned for either.
+        """
+        results = []
+        for leg in legs:
+            try:
+                kwargs = leg_kwargs(leg)
+                token, trading_symbol, lot_size = cls.get_token_details(**kwargs) or (None, None, None)
+            except Exception as e:
+                results.append((None, None, None, f"Invalid leg {leg!r}: {e}"))
+                continue
+            if token is None:
+                results.append((None, None, None, f"No instrument found for {describe_leg(kwargs)}"))
+            else:
+                results.append((token, trading_symbol, lot_size, None))
+        return results
+
+    @staticmethod
+    def order_params(symbol, qty, exchange, buy_sell, order_type, price, is_overnight=False):
+        product = 'I'
+        if exchange in ['NFO', 'CDS', 'MCX', 'BFO', 'BCD'] and is_overnight:
+            product = 'M'
+        elif is_overnight:
+            product = "C"
+
+        # Define order parameters
+        return {
+            "tradingsymbol": symbol,
+            "exch": exchange,
+            "transaction_type": buy_sell,
+            "quantity": qty,
+            "order_type": order_type,
+            "price": price if order_type == "LIMIT" else 0,
+            "product": product,
+            "validity": "DAY"
+        }
+
+    @timed('tradesmart.place_order')
     def place_order_on_broker(self, symbol, qty, exchange, buy_sell, order_type, price, is_paper=False, is_overnight=False):
         try:
-            product = 'I'
-            if exchange in ['NFO', 'CDS', 'MCX', 'BFO', 'BCD'] and is_overnight:
-                product = 'M'
-            elif is_overnight:
-                product = "C"
-
-            # Define order parameters
-            order_params = {
-                "tradingsymbol": symbol,
-                "exch": exchange,
-                "transaction_type": buy_sell,
-                "quantity": qty,
-                "order_type": order_type,
-                "price": price if order_type == "LIMIT" else 0,
-                "product": product,
-                "validity": "DAY"
-            }
-            average_price = 0
-            order_id = None
+            order_params = self.order_params(symbol, qty, exchange, buy_sell, order_type, price, is_overnight)
 
             if not is_paper:
-                # Place order using the correct API method
-                ret = self.place_order(
-                    buy_or_sell=buy_sell,
-                    product_type=product,
-                    exchange=exchange,
-                    tradingsymbol=symbol,
-                    quantity=qty,
-                    discloseqty=0,
-                    price_type='MKT',
-                    price=price,
-                    trigger_price=0,
-                    retention='DAY',
-                    remarks='TUSTA'
-                )
-
-                if ret is None:
-                    print("Order placement failed: API returned None")
-                    return None, None, "Order placement failed: API returned None"
-
-                if ret.get('stat') != 'Ok':
-                    print(f"Order placement failed: {ret.get('emsg', 'Unknown error')}")
-                    return None, None, f"Order placement failed: {ret.get('emsg', 'Unknown error')}"
-
-                orderno = ret.get('norenordno')
-                if not orderno:
-                    print("Order placement failed: No order number received")
-                    return None, None, "Order placement failed: No order number received"
-
-                
-
-                t=0
-                while t <3:
-                    time.sleep(0.5)
-                    order_status = self.single_order_history(orderno)
-                    if order_status:
-                        break
-                    else:
-                        t+=1
-
-                if order_status is None:
-                    return None, None, "Failed to fetch order status during polling"
-                latest_status = order_status[-1]
-                
-
-               
-
-                
-                print("Latest Order Status:", latest_status.get("status"))
-
-                status = latest_status.get("status")
-                print("Order Status:", status)
-                
-
-                if status == "COMPLETE":
-                    holdings = self.get_holdings()
-                    if holdings:
-                        average_price = holdings[-1].get("upldprc", 0)
-                        print(f"Average price: {average_price}")
-                elif status == "REJECTED":
-                    rejection_reason = order_status[-1].get('rejreason', 'Unknown reason')
-                    print(f"Order rejected: {rejection_reason}")
-                    if "Insufficient balance" in rejection_reason:
-                        return None, None, "Order placement failed due to insufficient funds."
-                    else:
-                        return None, None, f"Order placement failed: {rejection_reason}"
-                else:
-                 
-                    # Poll for order status
-                    t=0
-                while t <3:
-                    time.sleep(0.5)
-                    order_status = self.single_order_history(orderno)
-                    if order_status:
-                        break
-                    else:
-                        t+=1
-                   
-                    if status == 'COMPLETE':
-                        average_price = order_status[-1].get('upldprc', 0)
-                    else:
-                       
-                        
-                        # Cancel the order if it is still open
-                        cancel_result = self.cancel_order(orderno)
-                        
-                        return None, None, "Order was canceled due to timeout."
+                order_id, error = self.submit_order(symbol, qty, exchange, buy_sell, price, order_params['product'])
+                if error:
+                    return None, None, error
+                average_price, error = self.settle_order(order_id)
+                if error:
+                    return None, None, error
 
             else:
-                order_id = 'Paper' + str(uuid.uuid4())
-                print(f"Paper trade created with ID: {order_id}")
-            # Get the last traded price if needed
-            if 'average_price' not in locals() or average_price == 0:
-                ltp_data = self.get_ltp(exchange, symbol)
-                average_price = ltp_data
-            print("average_price", ltp_data)
-            order_params['ltp'] = str(average_price)
-            # todo: format order_params
-            order_params['transaction_type'] = buy_sell
-            order_params['tradingsymbol'] = str(symbol)
-
-
-            return order_id, order_params, None
+                order_id, status, average_price, error = self.place_paper_order(symbol, qty, exchange, buy_sell,
+                                                                                order_type, price)
+                if error:
+                    logging.warning("Paper order refused: %s", error)
+                    return None, None, error
+                order_params['status'] = status
+                logging.info("Paper trade created with ID: %s (%s)", order_id, status)
+            return self.finish_order(order_id, order_params, average_price)
 
         except Exception as e:
-            print(f"Order placement failed: {str(e)}")
+            logging.error("Order placement failed: %s", e)
             return None, None, str(e)
 
+    def submit_order(self, symbol, qty, exchange, buy_sell, price, product):
+        """Send one order without waiting on it: (norenordno, None), or (None, error) when it was refused."""
+        logging.debug("Order params: %s %s %s %s %s %s", symbol, qty, exchange, buy_sell, price, product)
+        # Place order using the correct API method
+        with self.limiter().slot('PlaceOrder', ORDER), span('tradesmart.api.place_order'):
+            ret = self.place_order(
+                buy_or_sell=buy_sell,
+                product_type=product,
+                exchange=exchange,
+                tradingsymbol=symbol,
+                quantity=qty,
+                discloseqty=0,
+                price_type='MKT',
+                price=price,
+                trigger_price=0,
+                retention='DAY',
+                remarks='TUSTA'
+            )
+        logging.debug("Place order response: %s", ret)
+
+        if ret is None:
+            logging.warning("Order placement failed: API returned None")
+            return None, "Order placement failed: API returned None"
+
+        if ret.get('stat') != 'Ok':
+            logging.warning("Order placement failed: %s", ret.get('emsg', 'Unknown error'))
+            return None, f"Order placement failed: {ret.get('emsg', 'Unknown error')}"
+
+        orderno = ret.get('norenordno')
+        if not orderno:
+            logging.warning("Order placement failed: No order number received")
+            return None, "Order placement failed: No order number received"
+        return orderno, None
+
+    def order_future(self, orderno):
+        """Future resolving to the terminal update of orderno, from the order stream or REST polling."""
+        return self.tracker().track(orderno)
+
+    def settle_order(self, orderno):
+        """
+        Wait up to order_timeout for orderno to finish, cancelling it if it
+        is still open then: (average_price, None), or (None, error).
+        """
+        # Settled by the order-update stream when start_streams is running, else by REST polling
+        try:
+            with span('tradesmart.order_status'):
+                latest_status = self.order_future(orderno).result(timeout=self.order_timeout)
+        except FutureTimeoutError:
+            latest_status = None
+        return self.order_outcome(orderno, latest_status)
+
+    def order_outcome(self, orderno, latest_status):
+        """
+        settle_order's (average_price, error) for the terminal update of
+        orderno; None means order_timeout passed, and the order is cancelled.
+        """
+        if latest_status is None:
+            self.tracker().forget(orderno)
+            # Cancel the order if it is still open
+            with self.limiter().slot('CancelOrder', ORDER), span('tradesmart.api.cancel_order'):
+                self.cancel_order(orderno)
+            logging.warning("Order %s cancelled after %s s without a fill", orderno, self.order_timeout)
+            return None, "Order was canceled due to timeout."
+
+        status = latest_status.get("status")
+        logging.info("Order %s status: %s", orderno, status)
+
+        if status == "COMPLETE":
+            average_price = float(latest_status.get("avgprc") or latest_status.get("flprc") or 0)
+            logging.debug("Average price: %s", average_price)
+            return average_price, None
+        elif status == "REJECTED":
+            rejection_reason = latest_status.get('rejreason', 'Unknown reason')
+            logging.warning("Order %s rejected: %s", orderno, rejection_reason)
+            if "Insufficient balance" in rejection_reason:
+                return None, "Order placement failed due to insufficient funds."
+            else:
+                return None, f"Order placement failed: {rejection_reason}"
+        else:
+            return None, f"Order {orderno} was {status.lower()}"
+
+    def finish_order(self, order_id, order_params, average_price):
+        """place_order_on_broker's result for a filled order, with the LTP when there is no fill price."""
+        # Get the last traded price if needed; get_ltp reads the tick feed first
+        if not average_price:
+            with span('tradesmart.ltp_fallback'):
+                average_price = self.get_ltp(order_params['exch'], order_params['tradingsymbol'])
+        logging.debug("average_price %s", average_price)
+        order_params['ltp'] = str(average_price)
+        # todo: format order_params
+        order_params['tradingsymbol'] = str(order_params['tradingsymbol'])
+        return order_id, order_params, None
+
+    def begin_order(self, symbol, qty, exchange, buy_sell, order_type, price, is_overnight=False):
+        """Send a live order without waiting on it: (norenordno, context for end_order, error)."""
+        params = self.order_params(symbol, qty, exchange, buy_sell, order_type, price, is_overnight)
+        order_id, error = self.submit_order(symbol, qty, exchange, buy_sell, price, params['product'])
+        return order_id, params, error
+
+    def end_order(self, order_id, context, latest_status):
+        """place_order_on_broker's result for an order begun with begin_order, given its terminal update or None."""
+        average_price, error = self.order_outcome(order_id, latest_status)
+        if error:
+            return None, None, error
+        return self.finish_order(order_id, context, average_price)
+
+    def place_basket(self, legs, all_or_none=False, is_paper=False):
+        """
+        Place several orders concurrently (common/basket.py) and wait for
+        all of them. Each leg is a dict of place_order_on_broker keyword
+        arguments or a tuple in its positional order (without is_paper,
+        which applies to the whole basket). Returns one (order_id,
+        order_params, error) tuple per leg, in leg order.
+
+        With all_or_none, the first refused or rejected leg cancels the
+        legs still working and stops those not yet sent.
+        """
+        def submit(leg):
+            kwargs = order_kwargs(leg, TRADESMART_ORDER_FIELDS)
+            if is_paper:
+                result = self.place_order_on_broker(**kwargs, is_paper=True)
+                return result[0], result, result[2]
+            return self.begin_order(**kwargs)
+
+        def settle(order_id, context):
+            if is_paper:
+                return context
+            average_price, error = self.settle_order(order_id)
+            if error:
+                return None, None, error
+            return self.finish_order(order_id, context, average_price)
+
+        cancel = self.paper().cancel if is_paper else self.cancel_order_on_broker
+        with span('tradesmart.basket'):
+            return run_basket(legs, submit, settle, cancel, all_or_none, workers=self.basket_workers)
+
 # ---- Test usage ---- #
 if __name__ == "__main__":
+    configure_logging(logging.INFO)
     creds = {
         "user": "",
         "pwd": "",
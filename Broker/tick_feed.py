@@ -0,0 +1,81 @@
+# tick_feed.py
+"""
+Last-traded-price table fed by the Noren touchline websocket.
+
+Every (exchange, token) in the instrument master gets a fixed slot in a
+float64 price array when the feed is built, so a tick is one dict hit and
+one array store, and a read never touches the network. Slots are NaN until
+the first tick for that token arrives.
+"""
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+
+class TickFeed:
+    """
+    Callbacks for NorenApi.start_websocket: on_tick for subscribe_callback,
+    on_open / on_close for the socket callbacks.
+    """
+
+    def __init__(self, api, df: pd.DataFrame):
+        self.api = api
+        keys = pd.DataFrame({'e': df['Exchange'].astype(str), 'tk': df['Token'].astype(str)}).drop_duplicates()
+        self.slots = dict(zip(zip(keys['e'].to_numpy(), keys['tk'].to_numpy()), range(len(keys))))
+        self.prices = np.full(len(self.slots), np.nan)
+        self.updated = np.zeros(len(self.slots))
+        self.subscribed = set()
+        self.ticks = 0
+        self.connected = threading.Event()
+        self._lock = threading.Lock()
+
+    def wait_connected(self, timeout=None) -> bool:
+        return self.connected.wait(timeout)
+
+    def on_open(self):
+        # Noren does not resubscribe after a reconnect, so the full set is sent every time.
+        self.connected.set()
+        with self._lock:
+            instruments = [f"{exchange}|{token}" for exchange, token in self.subscribed]
+        if instruments:
+            self.api.subscribe(instruments)
+
+    def on_close(self):
+        self.connected.clear()
+
+    def on_tick(self, tick):
+        slot = self.slots.get((tick.get('e'), tick.get('tk')))
+        if slot is None or 'lp' not in tick:
+            return
+        self.prices[slot] = float(tick['lp'])
+        self.updated[slot] = time.monotonic()
+        self.ticks += 1
+
+    def subscribe(self, instruments):
+        """Add (exchange, token) pairs to the subscription; only new ones are sent."""
+        with self._lock:
+            new = [(exchange, str(token)) for exchange, token in instruments
+                   if (exchange, str(token)) not in self.subscribed]
+            self.subscribed.update(new)
+        if new and self.connected.is_set():
+            self.api.subscribe([f"{exchange}|{token}" for exchange, token in new])
+
+    def ltp(self, exchange, token, max_age=None):
+        """
+        Last traded price for (exchange, token), or None when the feed is
+        down, the token has not ticked yet, or its last tick is older than
+        max_age seconds.
+        """
+        if not self.connected.is_set():
+            return None
+        slot = self.slots.get((exchange, str(token)))
+        if slot is None:
+            return None
+        price = self.prices[slot]
+        if np.isnan(price):
+            return None
+        if max_age is not None and time.monotonic() - self.updated[slot] > max_age:
+            return None
+        return float(price)
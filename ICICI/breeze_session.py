@@ -0,0 +1,54 @@
+# breeze_session.py
+"""
+Restoring a persisted Breeze session without generate_session.
+
+BreezeConnect has no public way to adopt a saved session key.
+generate_session fetches the user id over REST (api_util), downloads the
+SecurityMaster (get_stock_script_list) and finally builds the REST helper
+with api_handler = ApificationBreeze(client). restore_breeze_session sets
+the same attributes directly: user_id, session_key, secret_key and
+api_handler.
+
+This is a known fragility. Those attributes and ApificationBreeze are SDK
+internals, not API, and a release can rename or restructure them without
+notice. The restore therefore only runs on the releases listed in
+BREEZE_RESTORE_VERSIONS. tests/test_breeze_session.py reads the installed
+SDK's source and fails when the attributes or the ApificationBreeze
+constructor it relies on change. Update both together when moving to a
+new release.
+"""
+from importlib import metadata
+
+# breeze_connect releases whose generate_session ends by setting user_id, session_key and secret_key and
+# then api_handler = ApificationBreeze(client), which restore_breeze_session repeats without the handshake
+BREEZE_RESTORE_VERSIONS = ('1.0.',)
+# What restore_breeze_session sets on the client, as generate_session (and its api_util) would
+RESTORED_ATTRIBUTES = ('user_id', 'session_key', 'secret_key', 'api_handler')
+
+
+def breeze_version():
+    """The installed breeze_connect release, or None."""
+    try:
+        return metadata.version('breeze_connect')
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def restore_breeze_session(breeze, user_id, session_key, api_secret) -> bool:
+    """
+    Give a new BreezeConnect client a saved session the way generate_session
+    would, without its network round trips. False on a release outside
+    BREEZE_RESTORE_VERSIONS: the caller has to log in instead.
+    """
+    version = breeze_version()
+    if version is None or not version.startswith(BREEZE_RESTORE_VERSIONS):
+        return False
+    try:
+        from breeze_connect.breeze_connect import ApificationBreeze  # type: ignore
+    except ImportError:
+        return False
+    breeze.user_id = user_id
+    breeze.session_key = session_key
+    breeze.secret_key = api_secret
+    breeze.api_handler = ApificationBreeze(breeze)
+    return True
@@ -1,69 +1,218 @@
+import csv
+import hashlib
 import io
+import json
 import logging
 import os
+import sys
+import warnings
 import zipfile
+from concurrent.futures import ProcessPoolExecutor
 
 import pandas as pd
 import requests
 
-logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.instrument_schema import ICICI_SCHEMA, apply_schema  # noqa: E402
+from common.instrumentation import configure_logging  # noqa: E402
+from common.snapshot import snapshot_path, write_snapshot  # noqa: E402
+
+# Parse dtypes of the kept SecurityMaster columns; anything not listed is read as text.
+# A file with a blank token or lot size fails these and is re-parsed with inferred types.
+MEMBER_DTYPES = {'Token': 'int64', 'StrikePrice': 'float64', 'LotSize': 'int64'}
+
+
+def parse_member(archive: zipfile.ZipFile, name: str, columns) -> pd.DataFrame:
+    """
+    Parse one TXT member straight out of the archive, reading only the
+    wanted columns that exist in it, with MEMBER_DTYPES. Header names are
+    quoted and padded in the SecurityMaster files, so they are matched
+    stripped and renamed.
+    """
+    with archive.open(name) as f:
+        header = next(csv.reader([f.readline().decode('utf-8', errors='replace')]))
+    raw = {column.strip(' "\r\n'): column for column in header}
+    present = [column for column in columns if column in raw]
+    usecols = [raw[column] for column in present]
+    dtype = {raw[column]: MEMBER_DTYPES.get(column, str) for column in present}
+    with archive.open(name) as f:
+        try:
+            df = pd.read_csv(f, usecols=usecols, dtype=dtype)
+        except (ValueError, TypeError):
+            # A value that does not fit its dtype: fall back to inferring this file's types
+            logging.warning("Unexpected values in %s, parsing it without explicit dtypes", name)
+            f.seek(0)
+            df = pd.read_csv(f, usecols=usecols)
+    df.columns = [column.strip(' "\r\n') for column in df.columns]
+    return df[present]
+
+
+# The archive of the process-pool workers, opened once per worker
+_archive = None
+
+
+def _open_archive(zip_bytes):
+    global _archive
+    _archive = zipfile.ZipFile(io.BytesIO(zip_bytes))
+
+
+def _parse_pooled(name, columns):
+    return parse_member(_archive, name, columns)
+
 
 class ICICIDataProcessor:
     def __init__(self):
         self.zip_url = "https://directlink.icicidirect.com/NewSecurityMaster/SecurityMaster.zip"
+        # Refresh state and parsed partitions; the archive itself is never extracted
         self.extract_dir = "icici_instrument_data"
         self.combined_csv_file = "combined_instrument_data.csv"
+        # ETag / Last-Modified / content hash and per-file CRCs of the last download
+        self.state_file = os.path.join(self.extract_dir, "refresh_state.json")
+        self.partition_dir = os.path.join(self.extract_dir, "partitions")
+        self.combined_partition = os.path.join(self.partition_dir, "combined.pkl")
+        # The downloaded SecurityMaster.zip, kept in memory, and its TXT members
+        self.zip_bytes = None
+        self.txt_files = []
+        # None means every TXT file is (re)parsed; otherwise only these are
+        self.changed_files = None
+        # Refresh state of this download, saved once its output is written
+        self.pending_state = None
+        # Processes parsing TXT members; None uses one per CPU, 1 parses in this process
+        self.max_workers = None
         self.columns_to_keep = [
             'Token', 'ShortName', 'Series',
             'ExchangeCode', 'ExpiryDate', 'StrikePrice',
             'OptionType', 'ExAllowed', 'LotSize', 'Name',
         ]
 
-    def download_and_extract_zip(self):
-        """Download and extract the ZIP file containing instrument data."""
+    def load_state(self):
+        try:
+            with open(self.state_file) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_state(self, state):
+        os.makedirs(self.extract_dir, exist_ok=True)
+        tmp = self.state_file + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp, self.state_file)
+
+    def commit_state(self):
+        """Save the refresh state of the last download now that its partitions and output are on disk."""
+        if self.pending_state is not None:
+            self.save_state(self.pending_state)
+            self.pending_state = None
+
+    def download_zip(self):
+        """
+        Download SecurityMaster.zip into memory.
+
+        The request is conditional on the last ETag / Last-Modified. On a 304
+        or an identical content hash changed_files is left empty; otherwise
+        changed_files lists the TXT members whose CRC changed or whose parsed
+        partition is missing. The new validators are only saved by
+        process_txt_files, after the output is written, so a failed parse
+        is retried on the next run.
+        """
         try:
             logging.info("Downloading instrument data...")
-            response = requests.get(self.zip_url)
-            
+            state = self.load_state()
+            have_output = os.path.exists(self.combined_csv_file) and os.path.exists(self.combined_partition) \
+                and bool(state)
+            headers = {}
+            if have_output:
+                headers = {k: v for k, v in (('If-None-Match', state.get('etag')),
+                                             ('If-Modified-Since', state.get('last_modified'))) if v}
+            response = requests.get(self.zip_url, headers=headers)
+
+            if response.status_code == 304 and headers:
+                logging.info("Instrument data not modified since last download")
+                self.changed_files = []
+                return True
+
             if response.status_code != 200:
                 raise Exception(f"Failed to download. Status code: {response.status_code}")
 
-            # Create BytesIO object and extract ZIP contents
-            zip_data = io.BytesIO(response.content)
-            os.makedirs(self.extract_dir, exist_ok=True)
-            
-            with zipfile.ZipFile(zip_data, 'r') as zip_ref:
-                zip_ref.extractall(self.extract_dir)
-                
-            logging.info(f"Data extracted to '{self.extract_dir}'")
+            digest = hashlib.sha256(response.content).hexdigest()
+            state.update(etag=response.headers.get('ETag'), last_modified=response.headers.get('Last-Modified'))
+            if have_output and state.get('sha256') == digest:
+                logging.info("Instrument data unchanged (same content hash)")
+                self.changed_files = []
+                self.pending_state = state
+                return True
+
+            self.zip_bytes = response.content
+            with zipfile.ZipFile(io.BytesIO(self.zip_bytes), 'r') as zip_ref:
+                members = {info.filename: info.CRC for info in zip_ref.infolist()}
+            previous = state.get('members', {}) if have_output else {}
+            self.txt_files = [name for name in members if name.endswith('.txt')]
+            self.changed_files = [name for name in self.txt_files
+                                  if previous.get(name) != members[name]
+                                  or not os.path.exists(self.partition_path(name))]
+            state.update(sha256=digest, members=members)
+            self.pending_state = state
+            logging.info("Downloaded %.1f MB (%s/%s files changed)",
+                         len(self.zip_bytes) / 2**20, len(self.changed_files), len(self.txt_files))
             return True
-            
+
         except Exception as e:
-            logging.error(f"Error in download_and_extract_zip: {str(e)}")
+            logging.error("Error in download_zip: %s", e)
             return False
 
+    def download_and_extract_zip(self):
+        """Deprecated name of download_zip; nothing is extracted to disk any more."""
+        warnings.warn("download_and_extract_zip is deprecated, use download_zip", DeprecationWarning, stacklevel=2)
+        return self.download_zip()
+
+    def partition_path(self, txt_file):
+        return os.path.join(self.partition_dir, txt_file + ".pkl")
+
+    def parse_members(self, names) -> dict:
+        """
+        Parse TXT members of the downloaded archive, in parallel across a
+        process pool when there is more than one to parse and more than one
+        CPU. Returns {name: DataFrame}.
+        """
+        workers = min(self.max_workers or os.cpu_count() or 1, len(names))
+        if workers <= 1:
+            with zipfile.ZipFile(io.BytesIO(self.zip_bytes)) as archive:
+                return {name: parse_member(archive, name, self.columns_to_keep) for name in names}
+        # Largest members first so the pool is not left waiting on one big file at the end
+        with zipfile.ZipFile(io.BytesIO(self.zip_bytes)) as archive:
+            sizes = {name: archive.getinfo(name).file_size for name in names}
+        ordered = sorted(names, key=sizes.get, reverse=True)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_open_archive,
+                                 initargs=(self.zip_bytes,)) as pool:
+            return dict(zip(ordered, pool.map(_parse_pooled, ordered, [self.columns_to_keep] * len(ordered))))
+
     def process_txt_files(self):
-        """Process extracted TXT files and combine into single CSV."""
+        """Parse the TXT members of the downloaded archive and combine them into a single CSV."""
         try:
-            # List all TXT files in the directory
-            txt_files = [f for f in os.listdir(self.extract_dir) if f.endswith('.txt')]
-            if not txt_files:
-                raise Exception("No TXT files found in extract directory")
-
-            dfs = []
-            for txt_file in txt_files:
-                file_path = os.path.join(self.extract_dir, txt_file)
-                
-                # Read and process each TXT file
-                df = pd.read_csv(file_path, delimiter=',')
-                df.columns = [column_name.strip(' "') for column_name in df.columns]
-                
-                # Keep only required columns that exist in the file
-                available_columns = [col for col in self.columns_to_keep if col in df.columns]
-                df = df[available_columns]
-                dfs.append(df)
-
-            logging.info(f"Processed {len(dfs)} files")
+            if self.changed_files == [] and os.path.exists(self.combined_partition):
+                logging.info("No file changed, keeping '%s'", self.combined_csv_file)
+                combined_df = pd.read_pickle(self.combined_partition)
+                if not os.path.exists(snapshot_path(self.combined_csv_file)):
+                    write_snapshot(apply_schema(combined_df, ICICI_SCHEMA), snapshot_path(self.combined_csv_file))
+                self.commit_state()
+                return combined_df
+
+            if self.zip_bytes is None or not self.txt_files:
+                raise Exception("No TXT files found in the downloaded archive")
+
+            os.makedirs(self.partition_dir, exist_ok=True)
+            to_parse = [name for name in self.txt_files
+                        if self.changed_files is None or name in self.changed_files
+                        or not os.path.exists(self.partition_path(name))]
+            parsed = self.parse_members(to_parse)
+            for name, df in parsed.items():
+                df.to_pickle(self.partition_path(name))
+            # Archive order, whichever worker finished first
+            dfs = [parsed[name] if name in parsed else pd.read_pickle(self.partition_path(name))
+                   for name in self.txt_files]
+
+            logging.info("Processed %s files (%s parsed, %s from cache)", len(dfs), len(parsed), len(dfs) - len(parsed))
 
             # Combine all DataFrames
             combined_df = pd.concat(dfs, ignore_index=True)
@@ -75,17 +224,21 @@ class ICICIDataProcessor:
             
             # Save to CSV
             combined_df.to_csv(self.combined_csv_file, index=False)
-            logging.info(f"Data saved to '{self.combined_csv_file}'")
-            
+            combined_df.to_pickle(self.combined_partition)
+            # Typed snapshot in the ICICI_SCHEMA dtypes, loaded by ICICI_Broker.initialize_data
+            write_snapshot(apply_schema(combined_df, ICICI_SCHEMA), snapshot_path(self.combined_csv_file))
+            logging.info("Data saved to '%s' and '%s'", self.combined_csv_file, snapshot_path(self.combined_csv_file))
+            self.commit_state()
+
             return combined_df
             
         except Exception as e:
-            logging.error(f"Error in process_txt_files: {str(e)}")
+            logging.error("Error in process_txt_files: %s", e)
             return None
 
     def run(self):
         """Execute the complete data processing pipeline."""
-        if self.download_and_extract_zip():
+        if self.download_zip():
             return self.process_txt_files()
         return None
 
@@ -94,9 +247,10 @@ def main():
     result_df = processor.run()
     
     if result_df is not None:
-        logging.info(f"Successfully processed {len(result_df)} rows of data")
+        logging.info("Successfully processed %s rows of data", len(result_df))
     else:
         logging.error("Failed to process instrument data")
 
 if __name__ == "__main__":
+    configure_logging(logging.INFO)
     main() 
\ No newline at end of file
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+
+def classify_rights(df: pd.DataFrame) -> np.ndarray:
+    """
+    Vectorised version of the Series/OptionType branching in
+    ICICI_Broker.filter_csv_by_token: 'cash', 'call', 'put' or 'others'.
+    """
+    series = df['Series']
+    option_type = df['OptionType']
+    is_option = (series == 'OPTION').to_numpy()
+    rights = np.full(len(df), 'others', dtype=object)
+    rights[series.isna().to_numpy()] = 'cash'
+    rights[is_option & (option_type == 'CE').to_numpy()] = 'call'
+    rights[is_option & (option_type == 'PE').to_numpy()] = 'put'
+    return rights
+
+
+def option_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """The OPTION rows in the columns OptionChains (common/option_chain.py) reads."""
+    options = df[df['Series'] == 'OPTION']
+    expiry = options['ExpiryDate']
+    return pd.DataFrame({
+        'exchange': options['ExAllowed'],
+        'underlying': options['ShortName'],
+        'expiry': expiry if pd.api.types.is_datetime64_dtype(expiry) else pd.to_datetime(expiry, errors='coerce'),
+        'strike': pd.to_numeric(options['StrikePrice'], errors='coerce'),
+        'put': options['OptionType'] == 'PE',
+        'token': options['Token'],
+        'trading_symbol': options['ShortName'],
+        'lot_size': options['LotSize'],
+    })
+
+
+class TokenIndex:
+    """Token -> row lookup over the ICICI instrument master, built once at load."""
+
+    def __init__(self, df: pd.DataFrame):
+        tokens = df['Token'].astype(str).tolist()
+        self.columns = list(df.columns)
+        # Token is handed back as str, like the row from the re-cast copy.
+        self._arrays = [np.array(tokens, dtype=object) if col == 'Token' else df[col].to_numpy()
+                        for col in self.columns]
+        self._rights = classify_rights(df)
+        # Iterate backwards so the first row for a duplicated token wins,
+        # matching filtered_df.iloc[0].
+        self._positions = {token: pos for pos, token in zip(range(len(tokens) - 1, -1, -1), reversed(tokens))}
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, token):
+        return str(token) in self._positions
+
+    def row(self, pos: int) -> dict:
+        return {col: values[pos] for col, values in zip(self.columns, self._arrays)}
+
+    def get(self, token):
+        """Return (right, row) for a token, or None when it is not in the master."""
+        pos = self._positions.get(str(token))
+        if pos is None:
+            return None
+        return self._rights[pos], self.row(pos)
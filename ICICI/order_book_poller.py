@@ -0,0 +1,158 @@
+# order_book_poller.py
+"""
+One order-book poller per Breeze session.
+
+Instead of every in-flight order downloading get_order_list() on its own,
+a single thread refreshes the book at most once per interval while anyone
+is waiting, indexes it by order_id and resolves the futures of the orders
+whose status reached one of the awaited states. The thread idles when
+nothing is being watched. fetch() downloads the book; ICICI_Broker's
+goes through its current Breeze client, so a re-login is picked up. Each download first calls throttle(), when
+given; ICICI_Broker passes its rate limiter's wait for a status slot.
+
+A watch can give up after a number of reads rather than seconds: with
+reads=3 its future resolves to None once three downloads that started
+after the watch have not found the order final, however long the
+throttle held them back.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+FINAL_STATUSES = ('Completed', 'Rejected', 'Cancelled')
+
+
+class OrderBookPoller:
+    def __init__(self, fetch, interval=0.5, throttle=None):
+        self.fetch = fetch
+        self.throttle = throttle
+        self.interval = interval
+        self.orders = {}
+        self.stats = {'refreshes': 0, 'errors': 0}
+        # order_id -> [(statuses, future, last read or None)]
+        self._watchers = {}
+        # Downloads started so far
+        self._reads = 0
+        self._last_refresh = float('-inf')
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def watch(self, order_id, statuses=FINAL_STATUSES, reads=None) -> Future:
+        """
+        Future resolving to the order-book row of order_id once its
+        order_status is in statuses, or to None after reads downloads that
+        did not find it there.
+        """
+        with self._cond:
+            row = self.orders.get(order_id)
+            future = Future()
+            if row is not None and row.get('order_status', '') in statuses:
+                future.set_result(row)
+                return future
+            last = None if reads is None else self._reads + reads
+            self._watchers.setdefault(order_id, []).append((statuses, future, last))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='icici-order-book', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return future
+
+    def wait(self, order_id, timeout=None, statuses=FINAL_STATUSES, reads=None):
+        """Block until order_id reaches one of statuses; None on timeout or after reads downloads."""
+        future = self.watch(order_id, statuses, reads)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            self.unwatch(order_id, future)
+            return None
+
+    def unwatch(self, order_id, future):
+        with self._cond:
+            watchers = [w for w in self._watchers.get(order_id, []) if w[1] is not future]
+            if watchers:
+                self._watchers[order_id] = watchers
+            else:
+                self._watchers.pop(order_id, None)
+
+    def refresh(self):
+        """
+        Download the order book once, wake the watchers of every order that
+        changed and give up on those out of reads.
+        """
+        with self._cond:
+            self._reads += 1
+            read = self._reads
+        try:
+            if self.throttle is not None:
+                self.throttle()
+            response = self.fetch()
+        except Exception as e:
+            logging.error("Error fetching order book: %s", e)
+            response = None
+        settled = []
+        with self._cond:
+            if isinstance(response, dict) and isinstance(response.get('Success'), list):
+                book = {order.get('order_id'): order for order in response['Success'] if isinstance(order, dict)}
+                self.stats['refreshes'] += 1
+                changed = [order_id for order_id, order in book.items()
+                           if order_id in self._watchers and
+                           order.get('order_status') != self.orders.get(order_id, {}).get('order_status')]
+                self.orders = book
+                for order_id in changed:
+                    row = book[order_id]
+                    pending = []
+                    for statuses, future, last in self._watchers.pop(order_id):
+                        if row.get('order_status', '') in statuses:
+                            settled.append((future, row))
+                        else:
+                            pending.append((statuses, future, last))
+                    if pending:
+                        self._watchers[order_id] = pending
+            else:
+                self.stats['errors'] += 1
+            settled.extend(self._expire(read))
+        for future, row in settled:
+            if not future.done():
+                future.set_result(row)
+
+    def _expire(self, read):
+        """Take out the watchers whose last read was read or earlier; (future, None) for each."""
+        expired = []
+        for order_id in [order_id for order_id, watchers in self._watchers.items()
+                         if any(last is not None and last <= read for _, _, last in watchers)]:
+            watchers = []
+            for statuses, future, last in self._watchers[order_id]:
+                if last is not None and last <= read:
+                    expired.append((future, None))
+                else:
+                    watchers.append((statuses, future, last))
+            if watchers:
+                self._watchers[order_id] = watchers
+            else:
+                del self._watchers[order_id]
+        return expired
+
+    def _drop_abandoned(self):
+        """Forget watchers whose future was cancelled, e.g. by an asyncio wait that timed out."""
+        for order_id in [order_id for order_id, watchers in self._watchers.items()
+                         if any(future.done() for _, future, _ in watchers)]:
+            watchers = [w for w in self._watchers[order_id] if not w[1].done()]
+            if watchers:
+                self._watchers[order_id] = watchers
+            else:
+                del self._watchers[order_id]
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._drop_abandoned()
+                while not self._watchers:
+                    self._cond.wait()
+                wait = self._last_refresh + self.interval - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                self._last_refresh = time.monotonic()
+            self.refresh()
@@ -1,61 +1,233 @@
 import logging
 import os
-import time
-import uuid
+import sys
+from functools import partial
 
+import numpy as np
 import pandas as pd
 import pyotp  # type: ignore
 from breeze_connect import BreezeConnect  # type: ignore
+from breeze_session import breeze_version, restore_breeze_session
+from icici_instrument_index import TokenIndex, option_rows
+from order_book_poller import OrderBookPoller
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.basket import ICICI_ORDER_FIELDS, order_kwargs, run_basket  # noqa: E402
+from common.expiry_calendar import ExpiryCalendar, build_calendars  # noqa: E402
+from common.instrumentation import configure_logging, span, timed  # noqa: E402
+from common.instrument_schema import ICICI_SCHEMA, apply_schema, read_csv, source_columns  # noqa: E402
+from common.instrument_store import InstrumentStore  # noqa: E402
+from common.legs import describe_leg, leg_kwargs  # noqa: E402
+from common.option_chain import OptionChains  # noqa: E402
+from common.paper_engine import MARKET_TYPES, PaperEngine  # noqa: E402
+from common.rate_limiter import ORDER, QUOTE, STATUS, RateLimiter  # noqa: E402
+from common.session_pool import AuthError, daily_expiry  # noqa: E402
+from common.snapshot import is_fresh, read_snapshot, snapshot_path  # noqa: E402
+from common.symbol_index import SymbolIndex  # noqa: E402
+
+BROKER_NAME = "ICICI"
+INSTRUMENTS_FILE = r"C:\Users\aayus\OneDrive\Desktop\fyers\combined_instrument_data.csv"
+FNO_EXCHANGES = ['NFO', 'CDS', 'MCX', 'BFO', 'BCD']
+SYMBOL_MAP = {'NIFTY': 'NIFTY', 'BANKNIFTY': 'CNXBAN', 'FINNIFTY': "NIFFIN"}
 
-logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
 def load_combined_instruments(file_path: str) -> pd.DataFrame:
+    # Prefer the typed snapshot written by ICICIDataProcessor; parse the CSV only without one.
+    # Either way only the ICICI_SCHEMA columns are loaded, with ExpiryDate parsed once here.
+    if is_fresh(file_path):
+        df = read_snapshot(snapshot_path(file_path), categorical=True, columns=source_columns(ICICI_SCHEMA))
+        return apply_schema(df, ICICI_SCHEMA)
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"File not found: {file_path}")
-
-    df = pd.read_csv(file_path)
-    df = df.loc[:, ~df.columns.str.contains('^Unnamed', case=False)]
-    return df
+    return read_csv(file_path, ICICI_SCHEMA)
 
 class ICICI_Broker:
     instrument_df: pd.DataFrame = None
-
-    def __init__(self, api_key: str, api_secret: str, api_session: str):
+    # Set when instrument_df is attached to the shared snapshot rather than loaded privately
+    instrument_store: InstrumentStore = None
+    token_index: TokenIndex = None
+    # (ExAllowed, ShortName, Series) -> ExpiryCalendar
+    expiry_calendars: dict = None
+    # Ranked partial ShortName search per ExAllowed, to suggest symbols for a lookup that missed
+    symbol_index: SymbolIndex = None
+    # Strike ladders per (ExAllowed, ShortName, expiry), rebuilt with the other indexes
+    option_chains: OptionChains = None
+    order_poller: OrderBookPoller = None
+    # Order-book reads that must find an order still open before it is cancelled (fetch_order_status's
+    # retries). Counted in reads rather than seconds, so a poll the rate limiter holds back does not
+    # shorten the wait and cancel an order that may already have filled.
+    order_reads = 3
+    # No wall-clock limit for AsyncBroker: order_future gives up after order_reads reads
+    order_timeout = None
+    # Most legs of one place_basket call in flight at once
+    basket_workers = 8
+    paper_engine: PaperEngine = None
+    # Seconds a price the paper engine was given stays usable before a market order re-quotes it
+    paper_max_age = 5.0
+    # Thread pool size of the AsyncBroker lane (common/async_broker.py)
+    async_workers = 8
+    # Client-side limits for limiter(): Breeze method (or '*' for every call) -> (calls per second, burst).
+    # Breeze allows 100 calls a minute per API key; None only counts calls and waits.
+    rate_limits: dict = {'*': (100 / 60, 10)}
+    # Tokens order-book polls and quotes leave in a bucket (common/rate_limiter.py), so polling at
+    # more than the refill rate does not make the next order or cancel wait for a token
+    rate_reserve: dict = {STATUS: 2, QUOTE: 4}
+    rate_limiter: RateLimiter = None
+    # SessionPool the Breeze client came from, if any
+    pool = None
+
+    def __init__(self, api_key: str, api_secret: str, api_session: str, pool=None, user_id=None):
+        """
+        With a SessionPool the Breeze client comes from the pool, so a new
+        instance for a user with a live or persisted session makes no
+        generate_session round trip.
+        """
         self.api_key = api_key
         self.api_secret = api_secret
         self.api_session = api_session
-        self.obj = BreezeConnect(api_key=self.api_key)
-        self.obj.generate_session(api_secret=self.api_secret, session_token=self.api_session)
+        self.pool = pool
+        self.user_id = user_id or api_key
+        if pool is None:
+            self.obj = self.breeze_login()[0]
+        else:
+            self.obj = pool.session(self.user_id, BROKER_NAME, self.breeze_login, self.breeze_restore)
 
-    def initialize_data(self):
-        ICICI_Broker.instrument_df = load_combined_instruments(
-            r"C:\Users\aayus\OneDrive\Desktop\fyers\combined_instrument_data.csv"
-        )
+    def breeze_login(self):
+        """Full generate_session; returns (client, token, expires_at) for SessionPool."""
+        breeze = BreezeConnect(api_key=self.api_key)
+        try:
+            breeze.generate_session(api_secret=self.api_secret, session_token=self.api_session)
+        except Exception as e:
+            raise AuthError(f"ICICI login failed: {e}") from e
+        return breeze, {'user_id': breeze.user_id, 'session_key': breeze.session_key}, daily_expiry()
+
+    def breeze_restore(self, token):
+        """
+        A Breeze client from a persisted session key, skipping generate_session.
+        On an SDK release restore_breeze_session does not know this raises
+        AuthError, and SessionPool falls back to a full login, which it
+        throttles and persists.
+        """
+        breeze = BreezeConnect(api_key=self.api_key)
+        if not restore_breeze_session(breeze, token['user_id'], token['session_key'], self.api_secret):
+            raise AuthError(f"breeze_connect {breeze_version()} is not known to restore sessions")
+        return breeze
+
+    @staticmethod
+    def auth_failed(response, client=None):
+        """is_auth_failure for SessionPool.call: Breeze answers 401 or a session error."""
+        if not isinstance(response, dict) or response.get('Status') in (None, 200):
+            return False
+        return response.get('Status') == 401 or 'session' in str(response.get('Error', '')).lower()
+
+    def pooled_call(self, fn):
+        """
+        fn(breeze) on this user's pooled session; on an expired session the
+        session is re-created once and self.obj follows it.
+        """
+        if self.pool is None:
+            return fn(self.obj)
+
+        def run(breeze):
+            self.obj = breeze
+            return fn(breeze)
+
+        return self.pool.call(self.user_id, BROKER_NAME, self.breeze_login, self.breeze_restore, run,
+                              self.auth_failed)
+
+    def initialize_data(self, file_path=INSTRUMENTS_FILE):
+        # Workers share the snapshot ICICIDataProcessor publishes; the CSV is a private fallback.
+        if is_fresh(file_path):
+            ICICI_Broker.instrument_store = InstrumentStore(snapshot_path(file_path), schema=ICICI_SCHEMA)
+            ICICI_Broker.instrument_df = ICICI_Broker.instrument_store.attach()
+        else:
+            ICICI_Broker.instrument_store = None
+            ICICI_Broker.instrument_df = load_combined_instruments(file_path)
+        ICICI_Broker.build_indexes()
         logging.info("Instrument data loaded successfully.")
 
+    @classmethod
+    def build_indexes(cls):
+        cls.token_index = TokenIndex(cls.instrument_df)
+        cls.expiry_calendars = build_calendars(cls.instrument_df, ['ExAllowed', 'ShortName', 'Series'], 'ExpiryDate')
+        cls.symbol_index = SymbolIndex(cls.instrument_df['ShortName'], cls.instrument_df['ExAllowed'])
+        cls.option_chains = OptionChains(option_rows(cls.instrument_df))
+
+    @classmethod
+    def refresh_instruments(cls):
+        """Switch to a master republished since initialize_data; True when it changed."""
+        if cls.instrument_store is None or not cls.instrument_store.refresh():
+            return False
+        cls.instrument_df = cls.instrument_store.frame
+        cls.build_indexes()
+        return True
+
     def get_broker_obj(self):
         return self.obj
 
+    def poller(self):
+        """The order-book poller shared by every order waiting on this session."""
+        if self.order_poller is None:
+            throttle = partial(self.limiter().acquire, 'get_order_list', STATUS)
+            # Through pooled_call, so the poller follows self.obj across a re-login
+            self.order_poller = OrderBookPoller(lambda: self.pooled_call(lambda breeze: breeze.get_order_list()),
+                                                throttle=throttle)
+        return self.order_poller
+
+    def limiter(self):
+        """
+        This session's RateLimiter: orders and cancels go ahead of order-book
+        polls, and those ahead of quotes and funds.
+        """
+        if self.rate_limiter is None:
+            self.rate_limiter = RateLimiter(self.rate_limits, name='icici', reserve=self.rate_reserve)
+        return self.rate_limiter
+
+    def paper(self):
+        """
+        This session's PaperEngine. It prices from what it is given: ticks
+        pushed through paper().on_price / replay, or the one get_ltp a
+        market order makes when it has no price younger than paper_max_age.
+        """
+        if self.paper_engine is None:
+            self.paper_engine = PaperEngine(max_age=self.paper_max_age)
+        return self.paper_engine
+
+    def place_paper_order(self, symbol_token, qty, exchange_code, buy_sell, order_type, price):
+        """Match a paper order on paper(); returns (order_id, status, price, error)."""
+        engine = self.paper()
+        if str(order_type).upper() in MARKET_TYPES and engine.price(exchange_code, symbol_token) is None:
+            with span('icici.ltp_fallback'):
+                ltp = self.get_ltp(exchange_code, symbol_token)
+            if ltp:
+                engine.on_price(exchange_code, symbol_token, float(ltp))
+        order_id, status, fill_price, error = engine.place(exchange_code, symbol_token, buy_sell, qty, order_type,
+                                                           price)
+        return order_id, status, fill_price if fill_price is not None else price, error
+
     def get_funds(self):
         try:
-            response = self.obj.get_funds()
+            with self.limiter().slot('get_funds', QUOTE), span('icici.api.get_funds'):
+                response = self.pooled_call(lambda breeze: breeze.get_funds())
             bank_balance = response.get('Success', {}).get('total_bank_balance', 0)
             return bank_balance
         except Exception as e:
-            print(f"Failed to fetch funds: {e}")
+            logging.error("Failed to fetch funds: %s", e)
             return 0
 
+    @timed('icici.get_ltp')
     def get_ltp(self, exchange_code, token):
-        right, row= self.filter_csv_by_token(token)
-        print(right, row.get('Series').lower())
-        if row.get('Series').lower() == "option":
+        right, row = self.filter_csv_by_token(token)
+        if row is None:
+            return 0
+        series = str(row.get('Series')).lower()
+        if series == "option":
             product_type = "options"
-        elif row.get('Series').lower() == "future":
+        elif series == "future":
             product_type = "futures"
         else:
             product_type = "cash"
     
-        print(product_type)
         if exchange_code in ["BSESEN", "BANKEX"]:
           exchange_code = "BFO"
         elif exchange_code == "NSE":
@@ -65,7 +237,6 @@ class ICICI_Broker:
         else:
             exchange_code = "NFO"
 
-        print(exchange_code)
         expiry_raw = row.get("ExpiryDate")
         expiry_date = ""
 
@@ -73,72 +244,64 @@ class ICICI_Broker:
             expiry_dt = pd.to_datetime(expiry_raw, errors='coerce')
             if pd.notnull(expiry_dt):
                 expiry_date = expiry_dt.strftime('%Y-%m-%dT06:00:00.000Z')
-        print(expiry_date)
         strike_price = row.get("StrikePrice")
         if pd.isna(strike_price):
             strike_price = "0"
         else:
             strike_price = str(int(float(strike_price))) if float(strike_price).is_integer() else str(strike_price)
 
-        print("DEBUG PARAMS -->",
-      row.get("ShortName"),
-      exchange_code,
-      expiry_date,
-      product_type,
-      right,
-      strike_price)
+        logging.debug("LTP params: %s %s %s %s %s %s", row.get("ShortName"), exchange_code, expiry_date,
+                      product_type, right, strike_price)
 
         try:
-            response = self.obj.get_quotes(
-            stock_code=row.get("ShortName"),
-            exchange_code=exchange_code,
-            expiry_date=expiry_date,
-            product_type=product_type,
-            right=right,
-            strike_price=strike_price
-        )
-
-
-            print(response)
+            with self.limiter().slot('get_quotes', QUOTE), span('icici.api.get_quotes'):
+                response = self.obj.get_quotes(
+                    stock_code=row.get("ShortName"),
+                    exchange_code=exchange_code,
+                    expiry_date=expiry_date,
+                    product_type=product_type,
+                    right=right,
+                    strike_price=strike_price
+                )
+            logging.debug("Quotes response: %s", response)
 
-            
             success_list = response.get("Success", [])
             for item in success_list:
                 if item.get("exchange_code") == exchange_code:
                     return item.get("ltp", 0)
         except Exception as e:
-            logging.error(f"Error fetching LTP: {e}")
+            logging.error("Error fetching LTP: %s", e)
             return 0
 
     def fetch_instruments(self, exch_seg):
         return self.obj.instruments(exch_seg)
 
     def cancel_order_on_broker(self, order_id):
-        response = self.obj.cancel_order(order_id)
+        with self.limiter().slot('cancel_order', ORDER), span('icici.api.cancel_order'):
+            response = self.pooled_call(lambda breeze: breeze.cancel_order(order_id))
         if response.get('Success'):
-            logging.info(f"Order {order_id} cancelled successfully.")
+            logging.info("Order %s cancelled successfully.", order_id)
         else:
-            logging.warning(f"Failed to cancel order {order_id}: {response.get('message')}")
+            logging.warning("Failed to cancel order %s: %s", order_id, response.get('message'))
 
     @classmethod
-    def filter_by_expiry(cls, df, expiry='W'):
-        df = df.copy()
-        df['ExpiryDate'] = pd.to_datetime(df['ExpiryDate'], errors='coerce')
-        df = df.dropna(subset=['ExpiryDate'])
-
-        monthly_df = df.loc[df.groupby(df['ExpiryDate'].dt.to_period('M'))['ExpiryDate'].idxmax()]
-
-        if expiry == 'W':
-            return df.iloc[0] if len(df) > 0 else None
-        elif expiry == 'NW':
-            return df.iloc[1] if len(df) > 1 else None
-        elif expiry == 'M':
-            return monthly_df.iloc[0] if len(monthly_df) > 0 else None
-        elif expiry == 'NM':
-            return monthly_df.iloc[1] if len(monthly_df) > 1 else None
-        elif expiry == 'NNM':
-            return monthly_df.iloc[2] if len(monthly_df) > 2 else None
-        return None
+    def filter_by_expiry(cls, df, expiry='W', calendar=None):
+        """
+        Pick the row for an expiry code. With the underlying's calendar the
+        code resolves to a date without any parsing; without one a calendar
+        is built from the expiries in df.
+        """
+        expiry_dates = df['ExpiryDate']
+        if not pd.api.types.is_datetime64_dtype(expiry_dates):
+            expiry_dates = pd.to_datetime(expiry_dates, errors='coerce')
+        expiry_dates = expiry_dates.to_numpy()
+        calendar = calendar or ExpiryCalendar(expiry_dates)
+
+        expiry_date = calendar.resolve(expiry)
+        if expiry_date is None:
+            return None
+        matches = df[expiry_dates == expiry_date]
+        return matches.iloc[0] if len(matches) > 0 else None
 
     @classmethod
     def filter_fno_instruments(cls, df, exch_seg, symbol, strike_price=None, ce_pe=None, instrumenttype=None):
@@ -153,7 +316,7 @@ class ICICI_Broker:
                 ce_pe = "PE"
             else:
                 ce_pe = "CE"
-            print(symbol, exch_seg, strike_price, ce_pe)
+            logging.debug("Option filter: %s %s %s %s", symbol, exch_seg, strike_price, ce_pe)
             if symbol == "SENSEX":
                 symbol = "BSESEN"
             return df[
@@ -166,27 +329,54 @@ class ICICI_Broker:
             
 
     @classmethod
+    def search_symbols(cls, exch_seg, text, limit=10):
+        """
+        Up to limit ShortNames in exch_seg matching a partial or mistyped
+        symbol, best first: exact match, then names starting with text,
+        then names containing it.
+        """
+        if cls.symbol_index is None:
+            return []
+        return [short_name for short_name, _ in cls.symbol_index.search(exch_seg, text, limit)]
+
+    @classmethod
+    def option_chain(cls, exch_seg, symbol, expiry='W'):
+        """
+        OptionChain (common/option_chain.py) of symbol's options expiring on
+        the expiry code, or None; chain.window(spot, n) gives ATM +/- n strikes.
+        """
+        if cls.option_chains is None:
+            cls.option_chains = OptionChains(option_rows(cls.instrument_df))
+        symbol = symbol.upper()
+        short_name = "BSESEN" if symbol == "SENSEX" else SYMBOL_MAP.get(symbol, symbol)
+        return cls.option_chains.chain(exch_seg, short_name, expiry)
+
+    @classmethod
+    @timed('icici.resolve_token')
     def get_icici_token_details(cls, exch_seg, symbol, strike_price=None, is_pe=None, expiry='W', instrumenttype=None):
         ce_pe = "put" if is_pe else "call"
         symbol = symbol.upper()
-        df = cls.instrument_df.copy()
-        symbol_map = {'NIFTY': 'NIFTY', 'BANKNIFTY': 'CNXBAN', 'FINNIFTY': "NIFFIN"}
+        df = cls.instrument_df
 
-        if exch_seg in ['NFO', 'CDS', 'MCX', 'BFO', 'BCD']:
-            print("token inputs:",exch_seg, symbol_map.get(symbol, symbol), strike_price, ce_pe, instrumenttype)
+        if exch_seg in FNO_EXCHANGES:
+            logging.debug("Token inputs: %s %s %s %s %s", exch_seg, SYMBOL_MAP.get(symbol, symbol), strike_price, ce_pe,
+                          instrumenttype)
             df_filtered = cls.filter_fno_instruments(
-                df, exch_seg, symbol_map.get(symbol, symbol), strike_price, ce_pe, instrumenttype
+                df, exch_seg, SYMBOL_MAP.get(symbol, symbol), strike_price, ce_pe, instrumenttype
             )
-            print(df_filtered)
+            logging.debug("Token candidates:\n%s", df_filtered)
             if df_filtered is None or df_filtered.empty:
-                logging.warning(f"No token found for {symbol} {strike_price}{ce_pe} in {exch_seg}")
+                logging.warning("No token found for %s %s%s in %s", symbol, strike_price, ce_pe, exch_seg)
                 return None, None, None
-            token_info = cls.filter_by_expiry(df_filtered, expiry)
+            calendar_key = tuple(df_filtered[col].iat[0] for col in ('ExAllowed', 'ShortName', 'Series'))
+            calendar = (cls.expiry_calendars or {}).get(calendar_key)
+            token_info = cls.filter_by_expiry(df_filtered, expiry, calendar)
         else:
             df_filtered = df[(df['Series'] == 'EQ') &
                            (df['ShortName'] == symbol)    ]
             if df_filtered.empty:
-                logging.warning(f"No token found for {symbol} in {exch_seg}")
+                logging.warning("No token found for %s in %s; closest symbols: %s", symbol, exch_seg,
+                                cls.search_symbols(exch_seg, symbol, limit=5))
                 return None, None, None
             token_info = df_filtered.iloc[0]
         
@@ -195,7 +385,89 @@ class ICICI_Broker:
         else:
             return None, None, None
 
+    @classmethod
+    def get_icici_token_details_many(cls, legs):
+        """
+        Resolve several legs in one pass over instrument_df. Each leg is a
+        dict of get_icici_token_details keyword arguments or a tuple in its
+        positional order. Returns one (token, short_name, lot_size, error)
+        tuple per leg, in input order; error is None when the leg resolved.
+
+        Expiry codes resolve through expiry_calendars, then all legs are
+        joined against the rows of their underlyings at once.
+        """
+        results = [None] * len(legs)
+        specs = []
+        for i, leg in enumerate(legs):
+            try:
+                kwargs = leg_kwargs(leg)
+                symbol = kwargs['symbol'].upper()
+                short_name = SYMBOL_MAP.get(symbol, symbol)
+                spec = {'leg': i, 'ExAllowed': kwargs['exch_seg'], 'ShortName': symbol}
+                if kwargs['exch_seg'] in FNO_EXCHANGES:
+                    spec['ShortName'] = short_name
+                    if kwargs['instrumenttype'] == 'FUTIDX':
+                        spec.update(Series='FUTURE', kind='future')
+                    else:
+                        if short_name == "SENSEX":
+                            spec['ShortName'] = short_name = "BSESEN"
+                        spec.update(Series='OPTION', kind='option', StrikePrice=float(kwargs['strike_price']),
+                                    OptionType="PE" if kwargs['is_pe'] else "CE")
+                    calendar = (cls.expiry_calendars or {}).get((kwargs['exch_seg'], short_name, spec['Series']))
+                    expiry_date = calendar.resolve(kwargs['expiry']) if calendar else None
+                    if expiry_date is None:
+                        results[i] = (None, None, None, f"No {kwargs['expiry']} expiry for {describe_leg(kwargs)}")
+                        continue
+                    spec['ExpiryDate'] = expiry_date
+                else:
+                    spec.update(Series='EQ', kind='equity')
+            except Exception as e:
+                results[i] = (None, None, None, f"Invalid leg {leg!r}: {e}")
+                continue
+            specs.append((spec, kwargs))
+
+        if specs:
+            legs_df = pd.DataFrame([spec for spec, _ in specs])
+            df = cls.instrument_df
+            candidates = df[df['ShortName'].isin(legs_df['ShortName'].unique())]
+            candidates = candidates.assign(_row=np.arange(len(candidates)))
+            join_keys = {
+                'option': ['ExAllowed', 'ShortName', 'Series', 'StrikePrice', 'OptionType', 'ExpiryDate'],
+                'future': ['ExAllowed', 'ShortName', 'Series', 'ExpiryDate'],
+                # Equity rows are matched on ShortName alone, as in get_icici_token_details
+                'equity': ['ShortName', 'Series'],
+            }
+            matched = []
+            for kind, group in legs_df.groupby('kind'):
+                keys = join_keys[kind]
+                group = group[['leg'] + keys]
+                if 'ExpiryDate' in keys:
+                    group = group.astype({'ExpiryDate': candidates['ExpiryDate'].dtype})
+                matched.append(group.merge(candidates[keys + ['_row', 'Token', 'LotSize']], on=keys))
+            matched = pd.concat(matched).sort_values(['leg', '_row']).drop_duplicates('leg')
+            found = dict(zip(matched['leg'], zip(matched['Token'], matched['LotSize'])))
+
+            for spec, kwargs in specs:
+                hit = found.get(spec['leg'])
+                if hit is None:
+                    results[spec['leg']] = (None, None, None, f"No instrument found for {describe_leg(kwargs)}")
+                else:
+                    results[spec['leg']] = (hit[0], spec['ShortName'], hit[1], None)
+        return results
+
+    @timed('icici.resolve_token_row')
     def filter_csv_by_token(self, token):
+        """
+        (right, row) for a token, right being 'cash', 'call', 'put' or
+        'others'; ('others', None) when the token is not in the master.
+        """
+        if self.token_index is not None:
+            hit = self.token_index.get(token)
+            if hit is None:
+                logging.warning("No data found for token %s", token)
+                return 'others', None
+            return hit
+
         try:
             # Convert token to string and create a copy of the dataframe
             token = str(token)
@@ -206,8 +478,8 @@ class ICICI_Broker:
             filtered_df = df[df['Token'] == token]
             
             if filtered_df.empty:
-                logging.warning(f"No data found for token {token}")
-                return 'others'
+                logging.warning("No data found for token %s", token)
+                return 'others', None
             
             # Get the first row that matches
             row = filtered_df.iloc[0]
@@ -233,164 +505,229 @@ class ICICI_Broker:
                 elif option_type == 'PE':
                     return 'put', row
                     
-            elif series == 'EQ':
-                return 'others', row
-                
-            
-            
+            # EQ, and options without a CE/PE type
+            return 'others', row
         except Exception as e:
-            logging.error(f"Error in filter_csv_by_token: {str(e)}")
-            return 'others'
-
+            logging.error("Error in filter_csv_by_token: %s", e)
+            return 'others', None
+
+    @staticmethod
+    def order_params(symbol, qty, exchange_code, buy_sell, order_type, price, is_overnight=False):
+        product = 'I'  # Intraday default
+        if exchange_code in FNO_EXCHANGES and is_overnight:
+            product = 'M'  # Margin for derivatives
+        elif is_overnight:
+            product = 'cash'  # Carryforward for cash
+
+        return {
+            "tradingsymbol": symbol,
+            "exch": exchange_code,
+            "transaction_type": buy_sell,
+            "quantity": qty,
+            "order_type": order_type,
+            "price": price if order_type == "LIMIT" else 0,
+            "product": product,
+            "validity": "DAY"
+        }
+
+    @timed('icici.place_order')
     def place_order_on_broker(self, symbol_token, symbol, qty, exchange_code, buy_sell, order_type, price,  is_paper=False,
                             is_overnight=False):
         try:
-            product = 'I'  # Intraday default
-            right = ''
-            if exchange_code in ['NFO', 'CDS', 'MCX', 'BFO', 'BCD'] and is_overnight:
-                product = 'M'  # Margin for derivatives
-            elif is_overnight:
-                product = 'cash'  # Carryforward for cash
-                
-            order_params = {
-                "tradingsymbol": symbol,
-                "exch": exchange_code,
-                "transaction_type": buy_sell,
-                "quantity": qty,
-                "order_type": order_type,
-                "price": price if order_type == "LIMIT" else 0,
-                "product": product,
-                "validity": "DAY"
-            }
-
-            order_id = None
-            average_price = 0
-            right, row = self.filter_csv_by_token(symbol_token)
-            if right == 'others' and exchange_code in ['NFO', 'CDS', 'MCX', 'BFO', 'BCD']:
-                product = "futures"
-            elif right == 'call' or right == 'put':
-                product = "options"
-            else:
-                product = "cash"
-            # Expiry and strike for derivatives, else empty
-            expiry_date = (row.get("ExpiryDate") + "T06:00:00.000Z") if product in ["futures", "options"] else ""
-            strike_price_raw = row.get("StrikePrice", 0)
-            strike_price = str(int(float(strike_price_raw))) if product == "options" else "0"
-            symbol_map = {'NIFTY': 'NIFTY', 'BANKNIFTY': 'CNXBAN', 'FINNIFTY': "NIFFIN"}
-            symbol = symbol_map.get(symbol, symbol)
-            
-            print("DEBUG ORDER PARAMS:",
-      f"stock_code={symbol}",
-      f"exchange_code={exchange_code}",
-      f"product={product}",
-      f"expiry_date={expiry_date}",
-      f"strike_price={strike_price}({type(strike_price)})",
-      f"right={right}")
-
-            
+            order_params = self.order_params(symbol, qty, exchange_code, buy_sell, order_type, price, is_overnight)
 
-            # Prepare order params
             if not is_paper:
-                print("Order Params:", {
-    "stock_code": symbol,
-    "exchange_code": exchange_code,
-    "product": product,
-    "action": buy_sell.lower(),
-    "order_type": order_type.lower(),
-    "stoploss": "0",
-    "quantity": str(qty),
-    "price": str(price) if order_type.lower() == "limit" else "0",
-    "validity": "day",
-    "validity_date": "",
-    "disclosed_quantity": "0",
-    "expiry_date": expiry_date or "",
-    "right": right,
-    "strike_price": strike_price or "0",
-})
-
-                response=self.obj.place_order(
-                    stock_code= symbol,
-                    exchange_code= exchange_code,
-                    product=product,
-                    action=buy_sell.lower(),
-                    order_type= order_type.lower(),
-                    stoploss="0",
-                    quantity= str(qty),
-                    price=str(price) if order_type.lower() == "limit" else "0",
-                    validity= "day",
-                    validity_date="",
-                    disclosed_quantity ="0",
-                    expiry_date=expiry_date or "",
-                    right= right,
-                    strike_price= strike_price or "0",
-                    # "user_remark": f"{symbol} {product}"
-                )
-                print(response)
-                  
-                if not response or response.get('Success') == 'None':
-                            error = response.get('emsg', 'Order placement failed')
-                            print(f"Order placement failed: {error}")
-                            return None, None, f"Order placement failed: {response.get('emsg', 'Unknown error')}"
-
-                order_id = response.get('order_id')
-                if not order_id and response.get('Error') == 'Insufficient limit  :Allocate funds to increase your limit. Available Limits :0.00':
-                            return None, None, "Order placement failed: Insufficient balance"
-                else:
-                    
-
-                    # Poll status
-                    average_price, status, error_message = self.handle_order_status(order_id)
-                
-                    if not average_price:
-                        return None, None, "Order placement failed: No order number received"
- 
+                order_id, error = self.submit_order(symbol_token, symbol, qty, exchange_code, buy_sell, order_type,
+                                                    price)
+                if error:
+                    return None, None, error
+                average_price, error = self.settle_order(order_id)
+                if error:
+                    return None, None, error
 
             else:
                 # Paper trading logic
-                order_id = 'Paper' + str(uuid.uuid4())
-                print(f"Paper trade created with ID: {order_id}")
-
-            # Fallback to LTP if no avg price available
-            if average_price == 0 or 'average_price' not in locals():
-                average_price = self.get_ltp( exchange_code,symbol_token)
-            order_params['ltp'] = str(average_price)
-            order_params['transaction_type'] = buy_sell
-            order_params['tradingsymbol'] = str(symbol)
-            return order_id, order_params, None
+                order_id, status, average_price, error = self.place_paper_order(symbol_token, qty, exchange_code,
+                                                                                buy_sell, order_type, price)
+                if error:
+                    logging.warning("Paper order refused: %s", error)
+                    return None, None, error
+                order_params['status'] = status
+                logging.info("Paper trade created with ID: %s (%s)", order_id, status)
+            return self.finish_order(order_id, order_params, average_price, symbol_token)
 
         except Exception as e:
-            print(f"Order placement failed: {str(e)}")
+            logging.error("Order placement failed: %s", e)
             return None, 0
 
-    def fetch_order_status(self, order_id, retries=3, delay=0.5):
-        """Attempts to fetch the order status with retries for ICICI."""
+    def submit_order(self, symbol_token, symbol, qty, exchange_code, buy_sell, order_type, price):
+        """Send one order without waiting on it: (order_id, None), or (None, error) when it was refused."""
+        right, row = self.filter_csv_by_token(symbol_token)
+        if row is None:
+            return None, f"No instrument found for token {symbol_token}"
+        if right == 'others' and exchange_code in FNO_EXCHANGES:
+            product = "futures"
+        elif right == 'call' or right == 'put':
+            product = "options"
+        else:
+            product = "cash"
+        # Expiry and strike for derivatives, else empty
+        # ExpiryDate is a string from the CSV and a datetime64 from the snapshot
+        expiry_date = (pd.Timestamp(row.get("ExpiryDate")).strftime('%Y-%m-%d') + "T06:00:00.000Z") \
+            if product in ["futures", "options"] else ""
+        strike_price_raw = row.get("StrikePrice", 0)
+        strike_price = str(int(float(strike_price_raw))) if product == "options" else "0"
+        symbol = SYMBOL_MAP.get(symbol, symbol)
+
+        breeze_params = {
+            "stock_code": symbol,
+            "exchange_code": exchange_code,
+            "product": product,
+            "action": buy_sell.lower(),
+            "order_type": order_type.lower(),
+            "stoploss": "0",
+            "quantity": str(qty),
+            "price": str(price) if order_type.lower() == "limit" else "0",
+            "validity": "day",
+            "validity_date": "",
+            "disclosed_quantity": "0",
+            "expiry_date": expiry_date or "",
+            "right": right,
+            "strike_price": strike_price or "0",
+            # "user_remark": f"{symbol} {product}"
+        }
+        logging.debug("Order params: %s", breeze_params)
+
+        with self.limiter().slot('place_order', ORDER), span('icici.api.place_order'):
+            response = self.obj.place_order(**breeze_params)
+        logging.debug("Place order response: %s", response)
+
+        if not response or response.get('Success') == 'None':
+            error = response.get('emsg', 'Order placement failed')
+            logging.warning("Order placement failed: %s", error)
+            return None, f"Order placement failed: {response.get('emsg', 'Unknown error')}"
+
+        # Breeze answers {'Success': {'order_id': ...}, 'Status': ..., 'Error': ...}
+        success = response.get('Success')
+        order_id = success.get('order_id') if isinstance(success, dict) else response.get('order_id')
+        if not order_id and response.get('Error') == 'Insufficient limit  :Allocate funds to increase your limit. Available Limits :0.00':
+            return None, "Order placement failed: Insufficient balance"
+        elif not order_id:
+            # Nothing was placed, so there is no order to wait for or cancel
+            return None, f"Order placement failed: {response.get('Error') or 'No order number received'}"
+        return order_id, None
+
+    def settle_order(self, order_id):
+        """
+        Poll order_id until it completes, cancelling it if it is still open
+        after the wait: (average_price, None), or (None, error).
+        """
+        with span('icici.order_status'):
+            latest_order = self.fetch_order_status(order_id)
+        return self.order_outcome(order_id, latest_order)
+
+    def order_future(self, order_id):
+        """
+        Future resolving to the order-book row of order_id once it is final,
+        from the shared poller, or to None after order_reads reads.
+        """
+        return self.poller().watch(order_id, reads=self.order_reads)
+
+    def order_outcome(self, order_id, latest_order):
+        """
+        settle_order's (average_price, error) for the final order-book row
+        of order_id; None means the wait ran out, and the order is cancelled.
+        """
+        average_price, status, error_message = self.order_status_result(order_id, latest_order)
+        if not average_price:
+            return None, error_message or "Order placement failed: No order number received"
+        return average_price, None
+
+    def finish_order(self, order_id, order_params, average_price, symbol_token):
+        """place_order_on_broker's result for a filled order, with the LTP when there is no fill price."""
+        # Fallback to LTP if no avg price available
+        if not average_price:
+            with span('icici.ltp_fallback'):
+                average_price = self.get_ltp(order_params['exch'], symbol_token)
+        order_params['ltp'] = str(average_price)
+        symbol = order_params['tradingsymbol']
+        order_params['tradingsymbol'] = str(SYMBOL_MAP.get(symbol, symbol))
+        return order_id, order_params, None
+
+    def begin_order(self, symbol_token, symbol, qty, exchange_code, buy_sell, order_type, price, is_overnight=False):
+        """Send a live order without waiting on it: (order_id, context for end_order, error)."""
+        params = self.order_params(symbol, qty, exchange_code, buy_sell, order_type, price, is_overnight)
+        order_id, error = self.submit_order(symbol_token, symbol, qty, exchange_code, buy_sell, order_type, price)
+        return order_id, (params, symbol_token), error
+
+    def end_order(self, order_id, context, latest_order):
+        """place_order_on_broker's result for an order begun with begin_order, given its final row or None."""
+        average_price, error = self.order_outcome(order_id, latest_order)
+        if error:
+            return None, None, error
+        params, symbol_token = context
+        return self.finish_order(order_id, params, average_price, symbol_token)
+
+    def place_basket(self, legs, all_or_none=False, is_paper=False):
+        """
+        Place several orders concurrently (common/basket.py) and wait for
+        all of them. Each leg is a dict of place_order_on_broker keyword
+        arguments or a tuple in its positional order (without is_paper,
+        which applies to the whole basket). Returns one (order_id,
+        order_params, error) tuple per leg, in leg order.
+
+        With all_or_none, the first refused or rejected leg cancels the
+        legs still working and stops those not yet sent.
+        """
+        def submit(leg):
+            kwargs = order_kwargs(leg, ICICI_ORDER_FIELDS)
+            if is_paper:
+                result = self.place_order_on_broker(**kwargs, is_paper=True)
+                return result[0], result, result[2]
+            return self.begin_order(**kwargs)
+
+        def settle(order_id, context):
+            if is_paper:
+                return context
+            average_price, error = self.settle_order(order_id)
+            if error:
+                return None, None, error
+            params, token = context
+            return self.finish_order(order_id, params, average_price, token)
+
+        cancel = self.paper().cancel if is_paper else self.cancel_order_on_broker
+        with span('icici.basket'):
+            return run_basket(legs, submit, settle, cancel, all_or_none, workers=self.basket_workers)
+
+    def fetch_order_status(self, order_id, retries=None, delay=0.5):
+        """
+        Wait for the order to be final, for at most retries (order_reads by
+        default) order-book reads. The order book is read by the session's
+        shared poller, at most once per delay however many orders are
+        waiting, and less often while the rate limiter holds the reads back.
+        """
         try:
-            for _ in range(retries):
-                time.sleep(delay)
-                # Get order history from ICICI API
-                orders = self.obj.get_order_list()
-                if not orders or 'Success' not in orders:
-                    continue
-                    
-                # Find the specific order
-                for order in orders['Success']:
-                    if order.get('order_id') == order_id:
-                        status = order.get('order_status', '')
-                        print(f"Order Status: {status}")
-                        # ICICI status mapping: COMPLETE -> 'Completed', REJECTED -> 'Rejected'
-                        if status in ('Completed', 'Rejected'):
-                            return order
-            return None
+            poller = self.poller()
+            poller.interval = delay
+            order = poller.wait(order_id, reads=retries or self.order_reads)
+            if order is not None:
+                logging.info("Order %s status: %s", order_id, order.get('order_status', ''))
+            return order
         except Exception as e:
-            logging.error(f"Error fetching order status: {e}")
+            logging.error("Error fetching order status: %s", e)
             return None
 
     def handle_order_status(self, order_id):
         """Handles order status checking and response for ICICI."""
-        try:
+        with span('icici.order_status'):
             latest_order = self.fetch_order_status(order_id)
+        return self.order_status_result(order_id, latest_order)
+
+    def order_status_result(self, order_id, latest_order):
+        """handle_order_status's (average_price, status, error) for a fetched order-book row, or None."""
+        try:
             if not latest_order:
-                self.obj.cancel_order(order_id)
+                self.cancel_order_on_broker(order_id)
                 return None, None, "Failed to fetch order status during polling"
 
             status = latest_order.get('order_status', '')
@@ -398,12 +735,14 @@ class ICICI_Broker:
                 return latest_order.get('average_price', 0), status, None
             if status == 'Rejected':
                 return self.handle_rejection(latest_order)
+            if status == 'Cancelled':
+                return None, None, f"Order {order_id} was cancelled"
 
             # Cancel order if still open
-            self.obj.cancel_order(order_id)
+            self.cancel_order_on_broker(order_id)
             return None, None, "Order was canceled due to timeout."
         except Exception as e:
-            logging.error(f"Error handling order status: {e}")
+            logging.error("Error handling order status: %s", e)
             return None, None, f"Error handling order status: {str(e)}"
 
     def handle_rejection(self, order):
@@ -411,18 +750,19 @@ class ICICI_Broker:
         try:
             # ICICI specific rejection reason field
             rejection_reason = order.get('rejection_reason', 'Unknown reason')
-            print(f"Order rejected: {rejection_reason}")
+            logging.warning("Order rejected: %s", rejection_reason)
             
             error_message = ("Order placement failed due to insufficient funds."
                             if "insufficient" in rejection_reason.lower()
                             else f"Order placement failed: {rejection_reason}")
             return None, None, error_message
         except Exception as e:
-            logging.error(f"Error handling rejection: {e}")
+            logging.error("Error handling rejection: %s", e)
             return None, None, "Error handling order rejection"
 
 # Optional test usage
 if __name__ == "__main__":
+    configure_logging(logging.INFO)
     creds = {
         "api_key": "677(02S7Re9a3&67k7N5#dI94!O494^0",
         "api_secret": "060C002y9Q3p2Y37243860734k2X2H32",
@@ -0,0 +1,223 @@
+# bench_async.py
+"""
+Serve N concurrent user requests (get_ltp, funds, cancel) from one event
+loop, calling the sync broker methods directly in coroutines against going
+through AsyncBroker. TradeSmart talks to a local Noren REST stand-in,
+ICICI_Broker to an in-process Breeze stand-in; both add --latency per call.
+Event-loop lag is sampled by a 10 ms heartbeat. Then --orders concurrent
+live orders filling after --fill-delay: the whole blocking
+place_order_on_broker on a lane worker against AsyncBroker, which awaits
+the fills on the event loop.
+
+    python benchmarks/bench_async.py --users 200 --latency 0.03 --orders 200 --fill-delay 0.5
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+from bench_batch_legs import load_script  # noqa: E402
+from common.async_broker import AsyncBroker  # noqa: E402
+from NorenRestApiPy.NorenApi import NorenApi  # noqa: E402
+from standins import BreezeOrders, NorenFeedServer, NorenRestServer, OrderSim, noren_handlers  # noqa: E402
+from synthetic import icici_master, tradesmart_master  # noqa: E402
+
+
+class BreezeStandIn:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def get_funds(self):
+        time.sleep(self.latency)
+        return {'Success': {'total_bank_balance': 100000.0}}
+
+    def get_quotes(self, exchange_code, **kwargs):
+        time.sleep(self.latency)
+        return {'Success': [{'exchange_code': exchange_code, 'ltp': 101.25}]}
+
+    def cancel_order(self, order_id):
+        time.sleep(self.latency)
+        return {'Success': {'order_id': order_id}, 'Status': 200}
+
+
+async def heartbeat(lags, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - start - 0.01)
+
+
+async def serve(users, request):
+    lags, stop = [], asyncio.Event()
+    beat = asyncio.create_task(heartbeat(lags, stop))
+    latencies = []
+
+    async def user(i):
+        start = time.perf_counter()
+        await request(i)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user(i) for i in range(users)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+    return elapsed, np.array(latencies), max(lags or [0.0])
+
+
+def report(label, users, result):
+    elapsed, latencies, lag = result
+    p50, p99 = np.percentile(latencies * 1e3, [50, 99])
+    print(f"  {label:<16} {users / elapsed:8.1f} req/s  p50 {p50:7.0f} ms  p99 {p99:7.0f} ms  "
+          f"max loop lag {lag * 1e3:7.1f} ms")
+    return elapsed
+
+
+def compare(label, users, blocking, facade):
+    print(label)
+    with contextlib.redirect_stdout(io.StringIO()):
+        sync = asyncio.run(serve(users, blocking))
+        aio = asyncio.run(serve(users, facade))
+    t_sync = report('blocking calls', users, sync)
+    t_aio = report('AsyncBroker', users, aio)
+    print(f"  speedup {t_sync / t_aio:5.1f}x")
+
+
+def bench_tradesmart(users, latency):
+    TradeSmart = load_script('Broker').TradeSmart
+    df = tradesmart_master(20_000)
+    TradeSmart.exchange_data = df
+    TradeSmart.symbol_tokens = TradeSmart.build_symbol_tokens(df)
+    TradeSmart.quote_cache.ttl = 0
+    symbols = list(zip(df['Exchange'], df['TradingSymbol']))
+    handlers = {'GetQuotes': lambda v: {'stat': 'Ok', 'lp': '101.25'},
+                'Limits': lambda v: {'stat': 'Ok', 'cash': '100000.00'},
+                'CancelOrder': lambda v: {'stat': 'Ok', 'result': v['norenordno']}}
+    with NorenRestServer(handlers, latency=latency) as server:
+        client = TradeSmart.__new__(TradeSmart)
+        NorenApi.__init__(client, host=server.url, websocket='ws://127.0.0.1:1/')
+        client.set_session('BENCH', 'x', 'token')
+        facade = AsyncBroker(client)
+
+        async def blocking(i):
+            client.get_ltp(*symbols[i % len(symbols)])
+            client.get_funds_available()
+            client.cancel_order_on_broker(f"ORD{i}")
+
+        async def via_facade(i):
+            await facade.get_ltp(*symbols[i % len(symbols)])
+            await facade.get_funds()
+            await facade.cancel_order_on_broker(f"ORD{i}")
+
+        compare(f"TradeSmart: {users} users x 3 calls, {TradeSmart.async_workers} workers",
+                users, blocking, via_facade)
+
+
+def bench_icici(users, latency):
+    module = load_script('ICICI')
+    ICICI_Broker = module.ICICI_Broker
+    df = icici_master(20_000)
+    ICICI_Broker.instrument_df = df
+    ICICI_Broker.token_index = module.TokenIndex(df)
+    client = ICICI_Broker.__new__(ICICI_Broker)
+    # The stand-in has no call limit; measure without the broker's default throttle
+    client.rate_limits = None
+    client.obj = BreezeStandIn(latency)
+    tokens = df['Token'].astype(str).tolist()
+    facade = AsyncBroker(client)
+
+    async def blocking(i):
+        client.get_ltp('NSE', tokens[i % len(tokens)])
+        client.get_funds()
+        client.cancel_order_on_broker(f"ORD{i}")
+
+    async def via_facade(i):
+        await facade.get_ltp('NSE', tokens[i % len(tokens)])
+        await facade.get_funds()
+        await facade.cancel_order_on_broker(f"ORD{i}")
+
+    compare(f"ICICI: {users} users x 3 calls, {ICICI_Broker.async_workers} workers", users, blocking, via_facade)
+
+
+def compare_orders(label, orders, facade, order):
+    async def whole(i):
+        result = await facade.call('place_order_on_broker', *order(i))
+        assert result[2] is None, result
+
+    async def split(i):
+        result = await facade.place_order_on_broker(*order(i))
+        assert result[2] is None, result
+
+    async def both():
+        # One loop for both runs: the lane's admission semaphore belongs to the first loop that uses it
+        return await serve(orders, whole), await serve(orders, split)
+
+    print(label)
+    with contextlib.redirect_stdout(io.StringIO()):
+        blocking, settling = asyncio.run(both())
+    t_blocking = report('fill on worker', orders, blocking)
+    t_settling = report('fill awaited', orders, settling)
+    print(f"  speedup {t_blocking / t_settling:5.1f}x, peak orders awaiting a fill "
+          f"{facade.lane.stats['max_settling']}")
+
+
+def bench_tradesmart_orders(orders, latency, fill_delay):
+    TradeSmart = load_script('Broker').TradeSmart
+    TradeSmart.exchange_data = df = tradesmart_master(20_000)
+    symbols = df[df['Exchange'] == 'NFO']['TradingSymbol'].tolist()
+    sim = OrderSim(latency=latency, fill_delay=fill_delay)
+    with NorenFeedServer([]) as feed, NorenRestServer(noren_handlers(sim, feed)) as rest:
+        client = TradeSmart.__new__(TradeSmart)
+        NorenApi.__init__(client, host=rest.url, websocket=feed.url)
+        client.set_session('BENCH', 'x', 'token')
+        with contextlib.redirect_stdout(io.StringIO()):
+            client.start_streams()
+        if not client.tick_feed.wait_connected(10) or not client.order_tracker.streaming.wait(10):
+            raise SystemExit("order stream stand-in did not connect")
+        try:
+            compare_orders(f"TradeSmart: {orders} orders, fill after {fill_delay * 1e3:.0f} ms, "
+                           f"{TradeSmart.async_workers} workers", orders, AsyncBroker(client),
+                           lambda i: (symbols[i % len(symbols)], 50, 'NFO', 'B', 'MARKET', 0))
+        finally:
+            client.stop_streams()
+
+
+def bench_icici_orders(orders, latency, fill_delay):
+    ICICI_Broker = load_script('ICICI').ICICI_Broker
+    ICICI_Broker.instrument_df = df = icici_master(20_000)
+    ICICI_Broker.build_indexes()
+    client = ICICI_Broker.__new__(ICICI_Broker)
+    client.rate_limits = None
+    client.obj = BreezeOrders(OrderSim(latency=latency, fill_delay=fill_delay))
+    options = df[df['Series'] == 'OPTION']
+    legs = list(zip(options['Token'].tolist(), options['ShortName'].tolist(), options['ExAllowed'].tolist()))
+    compare_orders(f"ICICI: {orders} orders, fill after {fill_delay * 1e3:.0f} ms, "
+                   f"{ICICI_Broker.async_workers} workers", orders, AsyncBroker(client),
+                   lambda i: (*legs[i % len(legs)][:2], 25, legs[i % len(legs)][2], 'BUY', 'MARKET', 0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.03)
+    parser.add_argument('--orders', type=int, default=200)
+    parser.add_argument('--fill-delay', type=float, default=0.5, help="seconds from placement to fill")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    bench_tradesmart(args.users, args.latency)
+    bench_icici(args.users, args.latency)
+    bench_tradesmart_orders(args.orders, args.latency, args.fill_delay)
+    bench_icici_orders(args.orders, args.latency, args.fill_delay)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# bench_basket.py
+"""
+Basket completion time: the legs of each basket placed one after another
+with place_order_on_broker against one place_basket call, for TradeSmart
+(Noren REST and order-stream stand-ins) and ICICI_Broker (Breeze client
+stand-in), with a fixed per-call latency and fill delay. Also reports the
+spread between the first and last leg's fill, and an all-or-none run
+with rejected legs: baskets aborted and legs cancelled before filling.
+
+    python benchmarks/bench_basket.py --baskets 20 --legs 4 --latency 0.02 --fill-delay 0.1
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+from bench_batch_legs import load_script  # noqa: E402
+from NorenRestApiPy.NorenApi import NorenApi  # noqa: E402
+from standins import BreezeOrders, NorenFeedServer, NorenRestServer, OrderSim, noren_handlers  # noqa: E402
+from synthetic import icici_master, tradesmart_master  # noqa: E402
+
+
+def tradesmart_broker(sim, exit_stack):
+    TradeSmart = load_script('Broker').TradeSmart
+    TradeSmart.exchange_data = df = tradesmart_master(1_000)
+    feed = exit_stack.enter_context(NorenFeedServer([]))
+    rest = exit_stack.enter_context(NorenRestServer(noren_handlers(sim, feed)))
+    client = TradeSmart.__new__(TradeSmart)
+    NorenApi.__init__(client, host=rest.url, websocket=feed.url)
+    client.set_session('BASKET', 'x', 'token')
+    with contextlib.redirect_stdout(io.StringIO()):
+        client.start_streams()
+    if not client.tick_feed.wait_connected(10) or not client.order_tracker.streaming.wait(10):
+        raise SystemExit("order stream stand-in did not connect")
+    exit_stack.callback(client.stop_streams)
+    symbols = df[df['Exchange'] == 'NFO']['TradingSymbol'].tolist()
+    return client, lambda i: (symbols[i % len(symbols)], 50, 'NFO', 'B', 'MARKET', 0)
+
+
+def icici_broker(sim, exit_stack):
+    ICICI_Broker = load_script('ICICI').ICICI_Broker
+    ICICI_Broker.instrument_df = icici_master(20_000)
+    ICICI_Broker.build_indexes()
+    # Skip __init__: it opens a Breeze session; the stand-in takes the client's place.
+    broker = ICICI_Broker.__new__(ICICI_Broker)
+    # The stand-in has no call limit; measure without the broker's default throttle
+    broker.rate_limits = None
+    broker.obj = BreezeOrders(sim)
+    options = ICICI_Broker.instrument_df[ICICI_Broker.instrument_df['Series'] == 'OPTION']
+    legs = list(zip(options['Token'].tolist(), options['ShortName'].tolist(), options['ExAllowed'].tolist()))
+    return broker, lambda i: (legs[i % len(legs)][0], legs[i % len(legs)][1], 25, legs[i % len(legs)][2], 'BUY',
+                              'MARKET', 0)
+
+
+def fill_spread(sim, results):
+    """Seconds between the first and last fill of a basket's filled legs."""
+    fills = [sim.orders[order_id][1] for order_id, _, error in results if order_id and error is None]
+    return max(fills) - min(fills) if len(fills) > 1 else 0.0
+
+
+def run(broker, leg, sim, baskets, legs, concurrent, all_or_none=False):
+    times, spreads, results = [], [], []
+    # NorenApi prints every cancel request and reply
+    with contextlib.redirect_stdout(io.StringIO()):
+        for b in range(baskets):
+            basket = [leg(b * legs + i) for i in range(legs)]
+            start = time.perf_counter()
+            if concurrent:
+                placed = broker.place_basket(basket, all_or_none=all_or_none)
+            else:
+                placed = [broker.place_order_on_broker(*order) for order in basket]
+            times.append(time.perf_counter() - start)
+            spreads.append(fill_spread(sim, placed))
+            results.append(placed)
+    return np.array(times), np.array(spreads), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--broker', choices=('tradesmart', 'icici', 'both'), default='both')
+    parser.add_argument('--baskets', type=int, default=20)
+    parser.add_argument('--legs', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.02, help="stand-in seconds per call")
+    parser.add_argument('--fill-delay', type=float, default=0.1, help="seconds from placement to fill")
+    parser.add_argument('--reject-rate', type=float, default=0.1, help="share of legs rejected in the all-or-none run")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    builds = {'tradesmart': tradesmart_broker, 'icici': icici_broker}
+    for name in builds if args.broker == 'both' else [args.broker]:
+        print(f"{name}: {args.baskets} baskets of {args.legs} legs, {args.latency * 1e3:.0f} ms per call, "
+              f"fill after {args.fill_delay * 1e3:.0f} ms")
+        for label, concurrent in (('sequential', False), ('place_basket', True)):
+            sim = OrderSim(latency=args.latency, fill_delay=args.fill_delay)
+            with contextlib.ExitStack() as exit_stack:
+                broker, leg = builds[name](sim, exit_stack)
+                times, spreads, _ = run(broker, leg, sim, args.baskets, args.legs, concurrent)
+            print(f"  {label:<14} basket p50 {np.median(times) * 1e3:8.1f} ms  p95 "
+                  f"{np.percentile(times, 95) * 1e3:8.1f} ms   leg fill spread p50 {np.median(spreads) * 1e3:7.1f} ms")
+
+        sim = OrderSim(latency=args.latency, fill_delay=args.fill_delay, reject_rate=args.reject_rate, seed=1)
+        with contextlib.ExitStack() as exit_stack:
+            broker, leg = builds[name](sim, exit_stack)
+            times, _, results = run(broker, leg, sim, args.baskets, args.legs, True, all_or_none=True)
+        legs = [r for basket in results for r in basket]
+        aborted = sum(any(error for _, _, error in basket) for basket in results)
+        filled = sum(1 for order_id, _, error in legs if order_id and error is None)
+        partial = sum(any(order_id and error is None for order_id, _, error in basket) for basket in results
+                      if any(error for _, _, error in basket))
+        print(f"  all-or-none, {args.reject_rate:.0%} rejected: {aborted}/{args.baskets} baskets aborted "
+              f"({partial} with a leg filled before its cancel), legs filled {filled}/{len(legs)}, "
+              f"cancelled {sim.calls.get('CancelOrder', 0) + sim.calls.get('cancel_order', 0)}, "
+              f"basket p50 {np.median(times) * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# bench_batch_legs.py
+"""
+Compare N single token lookups against one batch call for both brokers:
+TradeSmart.get_token_details vs get_token_details_many, and
+ICICI_Broker.get_icici_token_details vs get_icici_token_details_many.
+
+    python benchmarks/bench_batch_legs.py --rows 200000 --structures 20
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+from synthetic import icici_master, tradesmart_master  # noqa: E402
+
+EXPIRY_CODES = ['W', 'NW', 'M', 'NM', 'NNM']
+
+
+def load_script(folder):
+    """Import <folder>/script.py under its own name; both brokers call their module script.py."""
+    path = os.path.join(HERE, '..', folder)
+    sys.path.insert(0, path)
+    try:
+        spec = importlib.util.spec_from_file_location(f"{folder.lower()}_script", os.path.join(path, 'script.py'))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.remove(path)
+        for name in ('script', 'login'):
+            sys.modules.pop(name, None)
+    return module
+
+
+def iron_condors(options, n, seed, to_leg):
+    """n four-leg structures on random underlyings: two CE and two PE strikes."""
+    rng = np.random.default_rng(seed)
+    structures = []
+    for i in rng.integers(0, len(options), n):
+        row = options.iloc[i]
+        code = EXPIRY_CODES[i % len(EXPIRY_CODES)]
+        structures.append([to_leg(row, row['StrikePrice'] + offset, pe, code)
+                           for offset, pe in ((0, False), (100, False), (0, True), (-100, True))])
+    return structures
+
+
+def compare(label, single, many, structures):
+    legs = [leg for structure in structures for leg in structure]
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        singles = [single(leg) for leg in legs]
+        single_time = time.perf_counter() - start
+        start = time.perf_counter()
+        batched = [row for structure in structures for row in many(structure)]
+        batch_time = time.perf_counter() - start
+    mismatches = sum(1 for a, b in zip(singles, batched) if tuple(a or (None, None, None))[0] != b[0])
+    misses = sum(1 for b in batched if b[3] is not None)
+    print(f"{label}: {len(structures)} structures, {len(legs)} legs")
+    print(f"  single calls:  {single_time / len(structures) * 1e3:9.2f} ms/structure")
+    print(f"  batch call:    {batch_time / len(structures) * 1e3:9.2f} ms/structure")
+    print(f"  speedup:       {single_time / batch_time:9.1f}x  (misses {misses}, mismatches {mismatches})")
+
+
+def bench_tradesmart(rows, n):
+    module = load_script('Broker')
+    TradeSmart = module.TradeSmart
+    df = tradesmart_master(rows)
+    TradeSmart.exchange_data = df
+    TradeSmart.fno_index = module.FnoIndex(df)
+    options = df[df['Instrument'].astype(str).str.startswith('OPT')]
+
+    def to_leg(row, strike, pe, code):
+        return (row['Exchange'], row['Symbol'], str(int(strike)), "1" if pe else "0", code, row['Instrument'])
+
+    compare("TradeSmart", lambda leg: TradeSmart.get_token_details(*leg), TradeSmart.get_token_details_many,
+            iron_condors(options, n, 0, to_leg))
+
+
+def bench_icici(rows, n):
+    module = load_script('ICICI')
+    ICICI_Broker = module.ICICI_Broker
+    df = icici_master(rows)
+    ICICI_Broker.instrument_df = df
+    ICICI_Broker.expiry_calendars = module.build_calendars(df, ['ExAllowed', 'ShortName', 'Series'], 'ExpiryDate')
+    options = df[df['Series'] == 'OPTION']
+    names = {v: k for k, v in module.SYMBOL_MAP.items()}
+    names['BSESEN'] = 'SENSEX'
+
+    def to_leg(row, strike, pe, code):
+        return (row['ExAllowed'], names.get(row['ShortName'], row['ShortName']), strike, pe, code, 'OPTIDX')
+
+    compare("ICICI", lambda leg: ICICI_Broker.get_icici_token_details(*leg),
+            ICICI_Broker.get_icici_token_details_many, iron_condors(options, n, 0, to_leg))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--structures', type=int, default=20)
+    args = parser.parse_args()
+    bench_tradesmart(args.rows, args.structures)
+    bench_icici(args.rows, args.structures)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# bench_download.py
+"""
+Time download_and_combine_data against a local stand-in for the TradeSmart
+master host, serving fixture zips with artificial latency, sequentially
+(one worker) and concurrently.
+
+    python benchmarks/bench_download.py --rows 200000 --latency 0.5 --fail-first 1
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Broker'))
+
+from download import EXCHANGES, download_and_combine_data  # noqa: E402
+from standins import MasterFileServer, zip_bytes  # noqa: E402
+from synthetic import tradesmart_master  # noqa: E402
+
+
+def fixture_files(rows):
+    df = tradesmart_master(rows)
+    files = {}
+    for exchange in EXCHANGES:
+        part = df[df['Exchange'] == exchange].drop(columns=['Exchange'])
+        files[f"/{exchange}_symbols.txt.zip"] = zip_bytes(f"{exchange}_symbols.txt", part.to_csv(index=False))
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--latency', type=float, default=0.5, help="seconds added to every response")
+    parser.add_argument('--fail-first', type=int, default=0, help="503s served per file before succeeding")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format="%(asctime)s [%(levelname)s] %(message)s")
+
+    files = fixture_files(args.rows)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, workers in (('sequential', 1), ('concurrent', args.workers)):
+            with MasterFileServer(files, args.latency, args.fail_first) as server:
+                urls = [server.url + path for path in files]
+                start = time.perf_counter()
+                df = download_and_combine_data(urls, os.path.join(tmp, f"{label}.csv"), max_workers=workers,
+                                               backoff=0.1)
+                results[label] = time.perf_counter() - start
+                print(f"{label:<11} ({workers} workers): {results[label]:7.2f} s, {len(df)} rows, "
+                      f"{sum(server.hits.values())} requests")
+    print(f"speedup: {results['sequential'] / results['concurrent']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# bench_icici_processor.py
+"""
+Cold ICICIDataProcessor.run() on a large synthetic SecurityMaster.zip
+served by a local stand-in: the previous pipeline (extractall to disk,
+every column of each TXT file parsed, one file at a time) against the
+in-memory, usecols / explicit-dtype parse, in this process and across a
+process pool. Member files carry --extra filler columns, as the real ones
+carry many columns the processor drops.
+
+    python benchmarks/bench_icici_processor.py --rows 1000000 --extra 30
+"""
+import argparse
+import csv
+import importlib.util
+import io
+import logging
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+import numpy as np
+import pandas as pd
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+from standins import MasterFileServer  # noqa: E402
+from synthetic import icici_master  # noqa: E402
+
+MEMBERS = {'NSEScripMaster.txt': 'NSE', 'BSEScripMaster.txt': 'BSE',
+           'FONSEScripMaster.txt': 'NFO', 'FOBSEScripMaster.txt': 'BFO'}
+
+
+def load_icici_processor():
+    spec = importlib.util.spec_from_file_location(
+        'icici_data_processor', os.path.join(HERE, '..', 'ICICI', 'icici_data_processor.py'))
+    module = importlib.util.module_from_spec(spec)
+    # Registered so the process-pool workers can unpickle its parse function
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module.ICICIDataProcessor
+
+
+def security_master(rows, extra, seed=0):
+    """SecurityMaster.zip with one quoted-header TXT member per exchange."""
+    df = icici_master(rows)
+    df['ExpiryDate'] = df['ExpiryDate'].dt.strftime('%d-%b-%Y')
+    rng = np.random.default_rng(seed)
+    for i in range(extra):
+        df[f"Filler{i:02d}"] = rng.integers(0, 10_000, len(df)) if i % 2 else f"F{i}"
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as z:
+        for name, exchange in MEMBERS.items():
+            z.writestr(name, df[df['ExAllowed'] == exchange].to_csv(index=False, quoting=csv.QUOTE_NONNUMERIC))
+    return buffer.getvalue()
+
+
+def legacy_parse(processor, content):
+    """The parse before the in-memory path: extract to disk, read every column, one file at a time."""
+    os.makedirs(processor.extract_dir, exist_ok=True)
+    with zipfile.ZipFile(io.BytesIO(content)) as zip_ref:
+        zip_ref.extractall(processor.extract_dir)
+    dfs = []
+    for txt_file in sorted(f for f in os.listdir(processor.extract_dir) if f.endswith('.txt')):
+        df = pd.read_csv(os.path.join(processor.extract_dir, txt_file), delimiter=',')
+        df.columns = [column_name.strip(' "') for column_name in df.columns]
+        dfs.append(df[[col for col in processor.columns_to_keep if col in df.columns]])
+    return dfs
+
+
+def legacy_run(processor):
+    """The whole pipeline before the in-memory parse, cold."""
+    dfs = legacy_parse(processor, requests.get(processor.zip_url).content)
+    combined_df = pd.concat(dfs, ignore_index=True)
+    combined_df['ExpiryDate'] = pd.to_datetime(combined_df['ExpiryDate'], errors='coerce')
+    combined_df = combined_df.sort_values(by='ExpiryDate', ascending=True).reset_index(drop=True)
+    combined_df.to_csv(processor.combined_csv_file, index=False)
+    return combined_df
+
+
+def canonical(df):
+    return df.sort_values('Token').reset_index(drop=True).astype(str)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=500_000)
+    parser.add_argument('--extra', type=int, default=30)
+    parser.add_argument('--workers', type=int, default=None, help="pool size (default: one per CPU)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    ICICIDataProcessor = load_icici_processor()
+    payload = security_master(args.rows, args.extra)
+    print(f"SecurityMaster.zip: {len(payload) / 2**20:.1f} MB, {len(MEMBERS)} members, "
+          f"{10 + args.extra} columns, {os.cpu_count()} CPUs")
+
+    pool_label = f"in-memory, pool of {args.workers or os.cpu_count()}"
+    cases = (('extract + full parse', None), ('in-memory, 1 process', 1), (pool_label, args.workers or 0))
+    results = {}
+    cwd = os.getcwd()
+    with MasterFileServer({'/SecurityMaster.zip': payload}) as server:
+        for label, workers in cases:
+            with tempfile.TemporaryDirectory() as tmp:
+                os.chdir(tmp)
+                try:
+                    processor = ICICIDataProcessor()
+                    processor.zip_url = server.url + '/SecurityMaster.zip'
+                    processor.max_workers = workers or None
+                    start = time.perf_counter()
+                    if workers is None:
+                        legacy_parse(processor, payload)
+                    else:
+                        processor.zip_bytes = payload
+                        processor.parse_members(list(MEMBERS))
+                    parse = time.perf_counter() - start
+
+                    start = time.perf_counter()
+                    df = legacy_run(processor) if workers is None else processor.run()
+                    elapsed = time.perf_counter() - start
+                finally:
+                    os.chdir(cwd)
+            results[label] = (parse, elapsed, df)
+            print(f"  {label:<26} parse {parse:6.2f} s   run() {elapsed:6.2f} s  {len(df)} rows")
+
+    base_parse, base_run, legacy = next(iter(results.values()))
+    expected = canonical(legacy)
+    for label, (parse, elapsed, df) in list(results.items())[1:]:
+        same = canonical(df).equals(expected)
+        print(f"  {label:<26} speedup parse {base_parse / parse:5.1f}x, run() {base_run / elapsed:5.1f}x, "
+              f"same rows and values: {same}")
+
+
+if __name__ == "__main__":
+    main()
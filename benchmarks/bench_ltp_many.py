@@ -0,0 +1,85 @@
+# bench_ltp_many.py
+"""
+Mark a book of positions with N sequential TradeSmart.get_ltp calls against
+one get_ltp_many call, then again inside the quote cache TTL. Quotes come
+from a local Noren REST stand-in with a fixed per-request latency.
+
+    python benchmarks/bench_ltp_many.py --rows 200000 --positions 40 --latency 0.03
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'Broker'))
+
+from NorenRestApiPy.NorenApi import NorenApi  # noqa: E402
+from script import TradeSmart  # noqa: E402
+from standins import NorenRestServer  # noqa: E402
+from synthetic import tradesmart_master  # noqa: E402
+
+
+def quote(values):
+    token = int(values['token'])
+    return {'stat': 'Ok', 'exch': values['exch'], 'token': values['token'], 'lp': f"{100 + token % 997:.2f}"}
+
+
+def make_client(url):
+    """A TradeSmart pointed at the stand-in; TradeSmartLogin.__init__ hard-codes the real host."""
+    client = TradeSmart.__new__(TradeSmart)
+    NorenApi.__init__(client, host=url, websocket='ws://127.0.0.1:1/')
+    client.set_session('BENCH', 'x', 'token')
+    return client
+
+
+def timed(fn):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--positions', type=int, default=40)
+    parser.add_argument('--latency', type=float, default=0.03)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    df = tradesmart_master(args.rows)
+    TradeSmart.exchange_data = df
+    start = time.perf_counter()
+    TradeSmart.symbol_tokens = TradeSmart.build_symbol_tokens(df)
+    print(f"master rows: {len(df)}, symbol index built in {(time.perf_counter() - start) * 1e3:.0f} ms")
+    rows = df.iloc[np.random.default_rng(0).choice(len(df), args.positions, replace=False)]
+    items = list(zip(rows['Exchange'], rows['TradingSymbol']))
+
+    with NorenRestServer({'GetQuotes': quote}, latency=args.latency) as server:
+        client = make_client(server.url)
+        client.quote_workers = args.workers
+
+        TradeSmart.quote_cache.ttl = 0
+        sequential, seq_time = timed(lambda: [client.get_ltp(*item) for item in items])
+        TradeSmart.quote_cache.clear()
+        TradeSmart.quote_cache.ttl = 1.0
+        batched, batch_time = timed(lambda: client.get_ltp_many(items))
+        calls = server.calls.get('GetQuotes', 0)
+        _, warm_time = timed(lambda: client.get_ltp_many(items))
+        warm_calls = server.calls.get('GetQuotes', 0) - calls
+
+    mismatches = sum(1 for a, b in zip(sequential, batched) if a != b)
+    print(f"{args.positions} positions, {args.latency * 1e3:.0f} ms per quote, {args.workers} workers")
+    print(f"  sequential get_ltp:  {seq_time * 1e3:8.1f} ms")
+    print(f"  get_ltp_many (cold): {batch_time * 1e3:8.1f} ms  {seq_time / batch_time:5.1f}x")
+    print(f"  get_ltp_many (warm): {warm_time * 1e3:8.1f} ms  network calls {warm_calls}")
+    print(f"  cache {TradeSmart.quote_cache.stats()}, mismatches {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# bench_option_chain.py
+"""
+Pick ATM +/- N strikes (CE and PE token at each) for random underlyings,
+expiry codes and spots on a synthetic TradeSmart master: one
+get_token_details call per strike and side (on the masking path and on
+fno_index) against TradeSmart.option_chain(...).window(spot, N), cold
+(chain built on the first request) and warm (cached). Checks that every
+way returns the same tokens.
+
+    python benchmarks/bench_option_chain.py --rows 500000 --picks 50 --width 10
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+from bench_batch_legs import EXPIRY_CODES, load_script  # noqa: E402
+from synthetic import tradesmart_master  # noqa: E402
+
+
+def sample_picks(df, n, seed=0):
+    """(exchange, underlying, expiry code, spot) with the spot between listed strikes."""
+    rng = np.random.default_rng(seed)
+    options = df[df['Instrument'].astype(str).str.startswith('OPT')]
+    picks = []
+    for i in rng.integers(0, len(options), n):
+        row = options.iloc[i]
+        picks.append((row['Exchange'], row['Symbol'], EXPIRY_CODES[i % len(EXPIRY_CODES)],
+                      float(row['StrikePrice']) + float(rng.uniform(-20, 20))))
+    return picks
+
+
+def per_strike(TradeSmart, picks, ladders):
+    """ATM +/- N the way it is done without a chain: two get_token_details calls per strike."""
+    results = []
+    for (exchange, symbol, expiry, _), strikes in zip(picks, ladders):
+        results.append([(TradeSmart.get_token_details(exchange, symbol, str(strike), is_pe, expiry)[0])
+                        for strike in strikes for is_pe in ('0', '1')])
+    return results
+
+
+def from_chain(TradeSmart, picks, width):
+    results = []
+    for exchange, symbol, expiry, spot in picks:
+        window = TradeSmart.option_chain(exchange, symbol, expiry).window(spot, width)
+        results.append([token for ce, pe in zip(window.ce_tokens.tolist(), window.pe_tokens.tolist())
+                        for token in (ce, pe)])
+    return results
+
+
+def timed(fn):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=500_000)
+    parser.add_argument('--picks', type=int, default=50)
+    parser.add_argument('--width', type=int, default=10, help="strikes either side of ATM")
+    args = parser.parse_args()
+
+    module = load_script('Broker')
+    TradeSmart = module.TradeSmart
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'combined_instruments.csv')
+        tradesmart_master(args.rows).to_csv(path, index=False)
+        TradeSmart.exchange_data = df = module.load_combined_instruments(path)
+    picks = sample_picks(df, args.picks)
+
+    _, build = timed(lambda: module.OptionChains(module.option_rows(df)))
+    TradeSmart.fno_index = None
+    TradeSmart.option_chains = module.OptionChains(module.option_rows(df))
+    chains, cold = timed(lambda: from_chain(TradeSmart, picks, args.width))
+    _, warm = timed(lambda: from_chain(TradeSmart, picks, args.width))
+    ladders = [TradeSmart.option_chain(e, s, x).window(spot, args.width).strikes.tolist() for e, s, x, spot in picks]
+    atm = timed(lambda: [TradeSmart.option_chain(e, s, x).atm_strike(spot) for e, s, x, spot in picks])[1]
+
+    masking, masking_time = timed(lambda: per_strike(TradeSmart, picks, ladders))
+    TradeSmart.fno_index = module.FnoIndex(df)
+    indexed, indexed_time = timed(lambda: per_strike(TradeSmart, picks, ladders))
+
+    lookups = sum(len(ladder) * 2 for ladder in ladders)
+    print(f"master rows: {len(df)}, picks: {len(picks)} of ATM +/- {args.width} ({lookups} strike/side lookups), "
+          f"OptionChains build {build * 1e3:.0f} ms, {len(TradeSmart.option_chains._chains)} chains cached")
+    for label, elapsed in (('per strike, masking', masking_time), ('per strike, fno_index', indexed_time),
+                           ('option_chain, cold', cold), ('option_chain, warm', warm)):
+        print(f"  {label:<22} {elapsed / len(picks) * 1e3:9.3f} ms/pick  ({masking_time / elapsed:8.0f}x)")
+    print(f"  atm_strike (warm)      {atm / len(picks) * 1e6:9.1f} us/pick")
+    same = sum(a == b == [int(t) for t in c] for a, b, c in zip(
+        [[int(t) for t in r] for r in masking], [[int(t) for t in r] for r in indexed], chains))
+    print(f"  same tokens: {same}/{len(picks)}")
+
+
+if __name__ == "__main__":
+    main()
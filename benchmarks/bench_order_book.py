@@ -0,0 +1,106 @@
+# bench_order_book.py
+"""
+Many ICICI orders waiting at once: the old fetch_order_status, where each
+order downloads get_order_list() itself, against the shared
+OrderBookPoller. Orders fill after a random delay on an in-process Breeze
+stand-in that counts order-book downloads.
+
+    python benchmarks/bench_order_book.py --orders 50 --delay 0.1
+"""
+import argparse
+import contextlib
+import io
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from bench_batch_legs import load_script
+
+
+class BreezeBook:
+    """get_order_list() over orders that complete fill_after seconds after they were opened."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+        self.fills = {}
+        self._lock = threading.Lock()
+
+    def open(self, order_id, fill_after):
+        self.fills[order_id] = time.monotonic() + fill_after
+
+    def get_order_list(self):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        now = time.monotonic()
+        return {'Success': [{'order_id': order_id, 'average_price': '101.25',
+                             'order_status': 'Completed' if now >= at else 'Ordered'}
+                            for order_id, at in self.fills.items()]}
+
+
+def legacy_fetch_order_status(breeze, order_id, retries=3, delay=0.5):
+    """The previous fetch_order_status: its own sleep-and-scan loop per order."""
+    for _ in range(retries):
+        time.sleep(delay)
+        orders = breeze.get_order_list()
+        for order in orders['Success']:
+            if order.get('order_id') == order_id and order.get('order_status') in ('Completed', 'Rejected'):
+                return order
+    return None
+
+
+def run(label, wait, book, orders, delay):
+    rng = random.Random(0)
+    order_ids = [f"ORD{i:06d}" for i in range(orders)]
+    for order_id in order_ids:
+        book.open(order_id, rng.uniform(0, 2 * delay))
+    book.calls = 0
+
+    def one(order_id):
+        start = time.perf_counter()
+        order = wait(order_id)
+        return time.perf_counter() - start, order is not None
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=orders) as pool:
+        results = list(pool.map(one, order_ids))
+    elapsed = time.perf_counter() - start
+    latencies = np.array([r[0] for r in results]) * 1e3
+    filled = sum(r[1] for r in results)
+    print(f"  {label:<24} {book.calls:5d} get_order_list calls  p50 {np.percentile(latencies, 50):6.0f} ms  "
+          f"p95 {np.percentile(latencies, 95):6.0f} ms  filled {filled}/{orders}  wall {elapsed:5.2f} s")
+    book.fills.clear()
+    return book.calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--orders', type=int, default=50)
+    parser.add_argument('--delay', type=float, default=0.1)
+    parser.add_argument('--latency', type=float, default=0.02)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    ICICI_Broker = load_script('ICICI').ICICI_Broker
+    book = BreezeBook(args.latency)
+    broker = ICICI_Broker.__new__(ICICI_Broker)
+    # The stand-in has no call limit; measure without the broker's default throttle
+    broker.rate_limits = None
+    broker.obj = book
+
+    print(f"{args.orders} concurrent orders, poll every {args.delay * 1e3:.0f} ms, "
+          f"{args.latency * 1e3:.0f} ms per order-book download")
+    legacy = run('per-order polling (old)', lambda o: legacy_fetch_order_status(book, o, delay=args.delay),
+                 book, args.orders, args.delay)
+    shared = run('shared poller', lambda o: broker.fetch_order_status(o, delay=args.delay),
+                 book, args.orders, args.delay)
+    print(f"  order-book downloads cut {legacy / max(shared, 1):5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
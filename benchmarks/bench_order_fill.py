@@ -0,0 +1,129 @@
+# bench_order_fill.py
+"""
+Time TradeSmart.place_order_on_broker from submission to a known fill
+against a local Noren stand-in that fills every order after --fill-delay:
+the old fixed 0.5 s sleep-then-poll loop, OrderTracker on REST polling
+alone, and OrderTracker fed by websocket order updates.
+
+    python benchmarks/bench_order_fill.py --orders 20 --fill-delay 0.05
+"""
+import argparse
+import contextlib
+import io
+import logging
+import itertools
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'Broker'))
+
+from NorenRestApiPy.NorenApi import NorenApi  # noqa: E402
+from script import TradeSmart  # noqa: E402
+from standins import NorenFeedServer, NorenRestServer  # noqa: E402
+from synthetic import tradesmart_master  # noqa: E402
+
+
+class Exchange:
+    """Fills every order fill_delay seconds after PlaceOrder and reports it on the order stream."""
+
+    def __init__(self, fill_delay):
+        self.fill_delay = fill_delay
+        self.orders = {}
+        self.feed = None
+        self._ids = itertools.count(24101800000001)
+
+    def place(self, values):
+        orderno = str(next(self._ids))
+        self.orders[orderno] = [{'norenordno': orderno, 'status': 'OPEN', 'tsym': values['tsym']}]
+        threading.Timer(self.fill_delay, self.fill, args=(orderno,)).start()
+        return {'stat': 'Ok', 'norenordno': orderno}
+
+    def fill(self, orderno):
+        update = {'t': 'om', 'norenordno': orderno, 'status': 'COMPLETE', 'reporttype': 'Fill',
+                  'avgprc': '101.25', 'flprc': '101.25'}
+        self.orders[orderno].insert(0, update)
+        if self.feed is not None:
+            self.feed.push(update)
+
+    def history(self, values):
+        return self.orders.get(values['norenordno'], {'stat': 'Not_Ok', 'emsg': 'no data'})
+
+    def cancel(self, values):
+        return {'stat': 'Ok', 'result': values['norenordno']}
+
+
+def make_client(url, ws_url):
+    client = TradeSmart.__new__(TradeSmart)
+    NorenApi.__init__(client, host=url, websocket=ws_url)
+    client.set_session('BENCH', 'x', 'token')
+    return client
+
+
+def legacy_place(client, *args):
+    """The previous completion wait: sleep 0.5 s, then poll single_order_history."""
+    ret = client.place_order(buy_or_sell='B', product_type='I', exchange='NFO', tradingsymbol='NIFTY',
+                             quantity=50, discloseqty=0, price_type='MKT', price=0, trigger_price=0,
+                             retention='DAY', remarks='TUSTA')
+    orderno = ret.get('norenordno')
+    for _ in range(3):
+        time.sleep(0.5)
+        history = client.single_order_history(orderno)
+        if history:
+            break
+    return orderno, {}, None
+
+
+def run(label, place, orders):
+    latencies = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(orders):
+            start = time.perf_counter()
+            order_id, _, error = place('NIFTY', 50, 'NFO', 'B', 'MARKET', 0)
+            latencies.append(time.perf_counter() - start)
+            if error:
+                raise SystemExit(f"{label}: {error}")
+    p50, p95 = np.percentile(np.array(latencies) * 1e3, [50, 95])
+    print(f"  {label:<22} p50 {p50:7.1f} ms  p95 {p95:7.1f} ms")
+    return p50
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--orders', type=int, default=20)
+    parser.add_argument('--fill-delay', type=float, default=0.05)
+    parser.add_argument('--latency', type=float, default=0.005)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    TradeSmart.exchange_data = tradesmart_master(1_000)
+    exchange = Exchange(args.fill_delay)
+    handlers = {'PlaceOrder': exchange.place, 'SingleOrdHist': exchange.history, 'CancelOrder': exchange.cancel}
+    with NorenRestServer(handlers, latency=args.latency) as rest, NorenFeedServer([]) as feed_server:
+        print(f"{args.orders} orders, fill after {args.fill_delay * 1e3:.0f} ms, "
+              f"{args.latency * 1e3:.0f} ms per REST call")
+        legacy = run('sleep-poll (old)', lambda *a: legacy_place(make_client(rest.url, feed_server.url), *a),
+                     args.orders)
+
+        polling = make_client(rest.url, feed_server.url)
+        run('tracker, REST only', polling.place_order_on_broker, args.orders)
+        print(f"    {polling.order_tracker.stats}")
+
+        streaming = make_client(rest.url, feed_server.url)
+        exchange.feed = feed_server
+        with contextlib.redirect_stdout(io.StringIO()):
+            streaming.start_streams()
+        if not streaming.tick_feed.wait_connected(10) or not streaming.order_tracker.streaming.wait(10):
+            raise SystemExit("order stream stand-in did not connect")
+        stream = run('tracker, order stream', streaming.place_order_on_broker, args.orders)
+        print(f"    {streaming.order_tracker.stats}")
+        streaming.stop_streams()
+    print(f"  speedup over sleep-poll: {legacy / stream:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# bench_paper.py
+"""
+Paper order throughput: the old is_paper path (a 'Paper' + uuid id and a
+blocking get_ltp per order, quoted from a local Noren REST stand-in with a
+fixed latency) against TradeSmart.place_order_on_broker(is_paper=True) on
+the PaperEngine, priced from the tick feed table, and the engine on its
+own replaying recorded ticks against resting limit orders.
+
+    python benchmarks/bench_paper.py --rows 200000 --symbols 200 --orders 20000 --latency 0.03
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+import uuid
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+from bench_batch_legs import load_script  # noqa: E402
+from NorenRestApiPy.NorenApi import NorenApi  # noqa: E402
+from common.paper_engine import PaperEngine  # noqa: E402
+from standins import NorenRestServer  # noqa: E402
+from synthetic import tradesmart_master  # noqa: E402
+
+
+def quote(values):
+    token = int(values['token'])
+    return {'stat': 'Ok', 'exch': values['exch'], 'token': values['token'], 'lp': f"{100 + token % 997:.2f}"}
+
+
+def legacy_paper(client, exchange, symbol):
+    """What is_paper did before the engine: a fresh id and a blocking LTP to price the fill."""
+    return 'Paper' + str(uuid.uuid4()), client.get_ltp(exchange, symbol)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--symbols', type=int, default=200)
+    parser.add_argument('--orders', type=int, default=20_000)
+    parser.add_argument('--legacy-orders', type=int, default=100, help="orders timed on the old path")
+    parser.add_argument('--ticks', type=int, default=200_000, help="recorded ticks replayed into the engine")
+    parser.add_argument('--latency', type=float, default=0.03, help="stand-in seconds per quote")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    module = load_script('Broker')
+    TradeSmart = module.TradeSmart
+    df = tradesmart_master(args.rows)
+    TradeSmart.exchange_data = df
+    TradeSmart.symbol_tokens = TradeSmart.build_symbol_tokens(df)
+    rng = np.random.default_rng(0)
+    rows = df.iloc[rng.choice(len(df), args.symbols, replace=False)]
+    exchanges = rows['Exchange'].astype(str).tolist()
+    symbols = rows['TradingSymbol'].astype(str).tolist()
+    tokens = rows['Token'].astype(str).tolist()
+    picks = rng.integers(0, args.symbols, args.orders)
+    sides = np.where(rng.random(args.orders) < 0.5, 'B', 'S')
+
+    with NorenRestServer({'GetQuotes': quote}, latency=args.latency) as server:
+        client = TradeSmart.__new__(TradeSmart)
+        NorenApi.__init__(client, host=server.url, websocket='ws://127.0.0.1:1/')
+        client.set_session('BENCH', 'x', 'token')
+
+        # Old path: every order waits on a quote (the quote cache is empty for each new symbol)
+        TradeSmart.quote_cache.ttl = 0
+        start = time.perf_counter()
+        for i in picks[:args.legacy_orders]:
+            legacy_paper(client, exchanges[i], symbols[i])
+        legacy = (time.perf_counter() - start) / args.legacy_orders
+        TradeSmart.quote_cache.ttl = 1.0
+        legacy_calls = server.calls.get('GetQuotes', 0)
+
+        # Engine path: prices from the tick feed table, as with start_streams running
+        feed = TradeSmart.tick_feed = module.TickFeed(client, df)
+        feed.connected.set()
+        for exchange, token in zip(exchanges, tokens):
+            feed.on_tick({'e': exchange, 'tk': token, 'lp': quote({'exch': exchange, 'token': token})['lp']})
+        start = time.perf_counter()
+        results = [client.place_order_on_broker(symbols[i], 50, exchanges[i], side, 'MARKET', 0, is_paper=True)
+                   for i, side in zip(picks.tolist(), sides.tolist())]
+        engine_path = (time.perf_counter() - start) / args.orders
+        engine_calls = server.calls.get('GetQuotes', 0) - legacy_calls
+    filled = sum(1 for order_id, _, error in results if order_id and error is None)
+    book = client.paper().positions()
+
+    # Engine alone: resting limits around the last price, filled by a replayed random walk
+    engine = PaperEngine()
+    base = np.array([float(quote({'exch': e, 'token': t})['lp']) for e, t in zip(exchanges, tokens)])
+    engine.replay(exchanges, tokens, base)
+    offsets = rng.uniform(-0.02, 0.02, args.orders)
+    start = time.perf_counter()
+    for i, side, offset in zip(picks.tolist(), sides.tolist(), offsets.tolist()):
+        engine.place(exchanges[i], tokens[i], side, 50, 'LIMIT', round(base[i] * (1 + offset), 2))
+    placed = time.perf_counter() - start
+    resting = sum(order[4] == 'OPEN' for order in engine.orders.values())
+    walk = rng.integers(0, args.symbols, args.ticks)
+    prices = base[walk] * (1 + rng.normal(0, 0.01, args.ticks))
+    start = time.perf_counter()
+    engine.replay([exchanges[i] for i in walk.tolist()], [tokens[i] for i in walk.tolist()], prices)
+    replayed = time.perf_counter() - start
+    statuses = np.array([order[4] for order in engine.orders.values()])
+
+    print(f"{args.symbols} symbols, quote latency {args.latency * 1e3:.0f} ms")
+    print(f"  old is_paper (get_ltp per order) {1 / legacy:10.0f} orders/s  "
+          f"({legacy * 1e3:.2f} ms/order, {legacy_calls} quotes for {args.legacy_orders} orders)")
+    print(f"  place_order_on_broker on engine  {1 / engine_path:10.0f} orders/s  "
+          f"({engine_path * 1e6:.1f} us/order, {engine_calls} quotes, {filled}/{args.orders} filled, "
+          f"{len(book)} positions, P&L {client.paper().pnl():.2f})")
+    print(f"  engine limit orders              {args.orders / placed:10.0f} orders/s  "
+          f"({args.orders - resting} marketable, {resting} resting; after replay {(statuses == 'COMPLETE').sum()} filled, "
+          f"{(statuses == 'OPEN').sum()} resting)")
+    print(f"  engine tick replay               {args.ticks / replayed:10.0f} ticks/s   P&L {engine.pnl():.2f}")
+
+
+if __name__ == "__main__":
+    main()
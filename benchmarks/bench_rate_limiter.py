@@ -0,0 +1,140 @@
+# bench_rate_limiter.py
+"""
+Rate limiter scheduling: quote pollers flooding a broker's overall limit
+while orders and order-book polls go through the same RateLimiter, once
+with priorities (orders, then status, then quotes) and once first come
+first served. Reports the wait of each kind of call, the peak queue depth
+and the busiest --window of granted calls against what the limit allows,
+then an ICICI_Broker place_basket (Breeze client stand-in) under the same
+quote load.
+
+    python benchmarks/bench_rate_limiter.py --rate 20 --burst 5 --quoters 8 --seconds 5
+"""
+import argparse
+import bisect
+import logging
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+from bench_batch_legs import load_script  # noqa: E402
+from common.instrumentation import REGISTRY  # noqa: E402
+from common.rate_limiter import ORDER, QUOTE, STATUS, RateLimiter  # noqa: E402
+from standins import BreezeOrders, OrderSim  # noqa: E402
+from synthetic import icici_master  # noqa: E402
+
+
+def busiest(granted, window):
+    """Most calls granted in any window seconds."""
+    granted = sorted(granted)
+    return max((bisect.bisect_right(granted, t + window) - i for i, t in enumerate(granted)), default=0)
+
+
+def flood(limiter, endpoint, latency, stop, granted):
+    """One quote poller: acquire, call, repeat until stop."""
+    while not stop.is_set():
+        limiter.acquire(endpoint, QUOTE)
+        granted.append(time.monotonic())
+        time.sleep(latency)
+
+
+def run(args, prioritised):
+    REGISTRY.reset()
+    limiter = RateLimiter({'*': (args.rate, args.burst)}, name='bench')
+    priority = (lambda p: p) if prioritised else (lambda p: QUOTE)
+    stop, granted, waits = threading.Event(), [], {'order': [], 'status': []}
+
+    def every(interval, endpoint, kind, p):
+        while not stop.wait(interval):
+            waits[kind].append(limiter.acquire(endpoint, priority(p)))
+            granted.append(time.monotonic())
+
+    threads = [threading.Thread(target=flood, args=(limiter, 'get_quotes', args.latency, stop, granted))
+               for _ in range(args.quoters)]
+    threads.append(threading.Thread(target=every, args=(args.order_interval, 'place_order', 'order', ORDER)))
+    threads.append(threading.Thread(target=every, args=(args.status_interval, 'get_order_list', 'status', STATUS)))
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+    stats = limiter.stats()
+    quotes = REGISTRY.histogram('bench.wait.get_quotes').snapshot()
+    label = 'priorities' if prioritised else 'first come first served'
+    print(f"  {label}: {len(granted)} calls in {elapsed:.1f} s ({len(granted) / elapsed:.1f}/s), busiest "
+          f"{args.window:g} s {busiest(granted, args.window)} calls (limit allows "
+          f"{args.burst + args.rate * args.window:.0f}), peak quote queue {stats['get_quotes']['max_queued']}")
+    for kind in ('order', 'status'):
+        w = np.array(waits[kind])
+        print(f"    {kind:<6} wait p50 {np.median(w) * 1e3:7.1f} ms  p95 {np.percentile(w, 95) * 1e3:7.1f} ms  "
+              f"max {w.max() * 1e3:7.1f} ms  ({len(w)} calls)")
+    print(f"    quote  wait p50 {quotes['p50'] * 1e3:7.1f} ms  p95 {quotes['p95'] * 1e3:7.1f} ms  "
+          f"max {quotes['max'] * 1e3:7.1f} ms  ({quotes['count']} calls)")
+
+
+def icici_basket(args):
+    REGISTRY.reset()
+    ICICI_Broker = load_script('ICICI').ICICI_Broker
+    ICICI_Broker.instrument_df = icici_master(20_000)
+    ICICI_Broker.build_indexes()
+    sim = OrderSim(latency=args.latency, fill_delay=0.1)
+    # Skip __init__: it opens a Breeze session; the stand-in takes the client's place.
+    broker = ICICI_Broker.__new__(ICICI_Broker)
+    broker.obj = BreezeOrders(sim)
+    broker.rate_limits = {'*': (args.rate, args.burst)}
+    options = ICICI_Broker.instrument_df[ICICI_Broker.instrument_df['Series'] == 'OPTION']
+    legs = [(token, symbol, 25, exchange, 'BUY', 'MARKET', 0) for token, symbol, exchange in
+            zip(options['Token'].tolist()[:4], options['ShortName'].tolist(), options['ExAllowed'].tolist())]
+    stop, granted = threading.Event(), []
+    quoters = [threading.Thread(target=flood, args=(broker.limiter(), 'get_quotes', args.latency, stop, granted))
+               for _ in range(args.quoters)]
+    for thread in quoters:
+        thread.start()
+    time.sleep(1)
+    start = time.perf_counter()
+    results = broker.place_basket(legs)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for thread in quoters:
+        thread.join()
+    filled = sum(1 for order_id, _, error in results if order_id and error is None)
+    stats = broker.limiter().stats()
+    print(f"icici place_basket of {len(legs)} legs under the quote flood: {elapsed * 1e3:.0f} ms, {filled} filled")
+    for endpoint in ('place_order', 'get_order_list', 'get_quotes'):
+        s = stats.get(endpoint)
+        if s:
+            print(f"  {endpoint:<15} {s['calls']:4d} calls, {s['throttled']:4d} queued, peak queue "
+                  f"{s['max_queued']:2d}, wait p95 {s['wait_p95'] * 1e3:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rate', type=float, default=20, help="overall calls per second")
+    parser.add_argument('--burst', type=int, default=5)
+    parser.add_argument('--quoters', type=int, default=8, help="threads polling quotes as fast as allowed")
+    parser.add_argument('--latency', type=float, default=0.01, help="stand-in seconds per call")
+    parser.add_argument('--order-interval', type=float, default=0.25)
+    parser.add_argument('--status-interval', type=float, default=0.5)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--window', type=float, default=1.0, help="window for the busiest-calls check")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    print(f"overall limit {args.rate:g}/s, burst {args.burst}, {args.quoters} quote pollers, an order every "
+          f"{args.order_interval:g} s and an order-book poll every {args.status_interval:g} s")
+    for prioritised in (False, True):
+        run(args, prioritised)
+    icici_basket(args)
+
+
+if __name__ == "__main__":
+    main()
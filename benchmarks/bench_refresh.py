@@ -0,0 +1,112 @@
+# bench_refresh.py
+"""
+Time full against incremental refreshes of both instrument pipelines,
+served by a local stand-in: a cold run, an unchanged re-run, and a re-run
+after one exchange file changed.
+
+    python benchmarks/bench_refresh.py --rows 200000 --latency 0.2
+"""
+import argparse
+import importlib.util
+import io
+import logging
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'Broker'))
+
+from download import EXCHANGES, download_and_combine_data  # noqa: E402
+from standins import MasterFileServer, zip_bytes  # noqa: E402
+from synthetic import icici_master, tradesmart_master  # noqa: E402
+
+
+def load_icici_processor():
+    spec = importlib.util.spec_from_file_location(
+        'icici_data_processor', os.path.join(HERE, '..', 'ICICI', 'icici_data_processor.py'))
+    module = importlib.util.module_from_spec(spec)
+    # Registered so the process-pool workers can unpickle its parse function
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module.ICICIDataProcessor
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"  {label:<28} {time.perf_counter() - start:7.2f} s, {len(result)} rows")
+    return result
+
+
+def bench_tradesmart(rows, latency, etag, tmp):
+    df = tradesmart_master(rows)
+    files = {}
+    for exchange in EXCHANGES:
+        part = df[df['Exchange'] == exchange].drop(columns=['Exchange'])
+        files[f"/{exchange}_symbols.txt.zip"] = zip_bytes(f"{exchange}_symbols.txt", part.to_csv(index=False))
+
+    output = os.path.join(tmp, 'combined_instruments.csv')
+    cache_dir = os.path.join(tmp, 'ts_cache')
+    with MasterFileServer(files, latency, etag=etag) as server:
+        urls = [server.url + path for path in files]
+        print(f"TradeSmart ({'ETag' if etag else 'content hash'}):")
+        timed("full refresh", lambda: download_and_combine_data(urls, output))
+        timed("incremental, cold cache", lambda: download_and_combine_data(urls, output, cache_dir=cache_dir))
+        timed("incremental, unchanged", lambda: download_and_combine_data(urls, output, cache_dir=cache_dir))
+        nfo = df[df['Exchange'] == 'NFO'].drop(columns=['Exchange']).iloc[:-1]
+        server.files['/NFO_symbols.txt.zip'] = zip_bytes("NFO_symbols.txt", nfo.to_csv(index=False))
+        timed("incremental, NFO changed", lambda: download_and_combine_data(urls, output, cache_dir=cache_dir))
+
+
+def bench_icici(rows, latency, etag, tmp):
+    df = icici_master(rows)
+    members = {
+        'NSEScripMaster.txt': df[df['ExAllowed'] == 'NSE'],
+        'BSEScripMaster.txt': df[df['ExAllowed'] == 'BSE'],
+        'FONSEScripMaster.txt': df[df['ExAllowed'] == 'NFO'],
+        'FOBSEScripMaster.txt': df[df['ExAllowed'] == 'BFO'],
+    }
+
+    def security_master(frames):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as z:
+            for name, frame in frames.items():
+                z.writestr(name, frame.to_csv(index=False))
+        return buffer.getvalue()
+
+    ICICIDataProcessor = load_icici_processor()
+    cwd = os.getcwd()
+    os.chdir(tmp)
+    try:
+        files = {'/SecurityMaster.zip': security_master(members)}
+        with MasterFileServer(files, latency, etag=etag) as server:
+            print(f"ICICI ({'ETag' if etag else 'content hash'}):")
+            processor = ICICIDataProcessor()
+            processor.zip_url = server.url + '/SecurityMaster.zip'
+            timed("cold run", processor.run)
+            timed("unchanged", processor.run)
+            members['FOBSEScripMaster.txt'] = members['FOBSEScripMaster.txt'].iloc[:-1]
+            server.files['/SecurityMaster.zip'] = security_master(members)
+            timed("FOBSE changed", processor.run)
+    finally:
+        os.chdir(cwd)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--no-etag', action='store_true', help="serve without validators to use the hash check")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bench_tradesmart(args.rows, args.latency, not args.no_etag, tmp)
+        bench_icici(args.rows, args.latency, not args.no_etag, tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# bench_schema.py
+"""
+Memory footprint and lookup speed of the instrument masters loaded the old
+way (pd.read_csv with default dtypes, every column kept) against the
+TRADESMART_SCHEMA / ICICI_SCHEMA load, per column and in total. Lookups
+are the frame paths that scan the master (TradeSmart masking path and
+substring get_ltp fallback, ICICI get_icici_token_details) and the index
+builds done at initialize_data.
+
+    python benchmarks/bench_schema.py --rows 500000 --legs 300
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+from bench_batch_legs import load_script  # noqa: E402
+from bench_token_details import sample_legs  # noqa: E402
+from synthetic import icici_master, tradesmart_master  # noqa: E402
+
+
+def legacy_filter_fno_instruments(cls, df, exchange, symbol, strike_price=None, ce_pe=None, instrumenttype=None):
+    """TradeSmart.filter_fno_instruments before the schema: strikes re-parsed on every lookup."""
+    if 'FUT' in (instrumenttype or ''):
+        return df[(df['Exchange'] == exchange) &
+                  (df['TradingSymbol'].str.contains(symbol, case=False, na=False)) &
+                  (df['Instrument'] == 'FUTIDX')]
+    return df[(df['Exchange'] == exchange) &
+              (df['TradingSymbol'].str.contains(symbol, case=False, na=False)) &
+              ((pd.to_numeric(df['StrikePrice'], errors='coerce') == float(strike_price)) |
+               (pd.to_numeric(df['Strike'], errors='coerce') == float(strike_price))) &
+              (df['OptionType'] == ce_pe)]
+
+
+def legacy_load(path, parse_expiry=False):
+    df = pd.read_csv(path)
+    df = df.loc[:, ~df.columns.str.contains('^unnamed', case=False)]
+    if parse_expiry:
+        df['ExpiryDate'] = pd.to_datetime(df['ExpiryDate'], errors='coerce')
+    return df
+
+
+def timed(fn, repeat=1):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            result = fn()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def normalise(results):
+    return [tuple(int(v) if isinstance(v, np.integer) else v for v in r) if isinstance(r, tuple) else r
+            for r in results]
+
+
+def memory_report(before, after, load_before, load_after):
+    mb = lambda df: df.memory_usage(deep=True, index=False) / 2**20  # noqa: E731
+    usage = pd.DataFrame({'before': mb(before), 'after': mb(after)})
+    usage['dtype before'] = before.dtypes.astype(str)
+    usage['dtype after'] = after.dtypes.astype(str)
+    print(usage.fillna({'before': 0.0, 'after': 0.0}).fillna('-').to_string(float_format=lambda v: f"{v:8.2f}"))
+    total_before, total_after = usage['before'].sum(), usage['after'].sum()
+    print(f"  total {total_before:8.1f} MB -> {total_after:8.1f} MB ({total_before / total_after:.1f}x smaller), "
+          f"CSV load {load_before * 1e3:.0f} ms -> {load_after * 1e3:.0f} ms")
+
+
+def compare(label, before, after, unit='ms', scale=1e3):
+    (r_before, t_before), (r_after, t_after) = before, after
+    mismatches = '' if r_before is None else \
+        f"  mismatches {sum(a != b for a, b in zip(normalise(r_before), normalise(r_after)))}"
+    print(f"  {label:<30} {t_before * scale:9.2f} {unit} -> {t_after * scale:9.2f} {unit}  "
+          f"({t_before / t_after:5.1f}x){mismatches}")
+
+
+def bench_tradesmart(tmp, rows, n_legs):
+    module = load_script('Broker')
+    TradeSmart = module.TradeSmart
+    path = os.path.join(tmp, 'combined_instruments.csv')
+    tradesmart_master(rows).to_csv(path, index=False)
+    before, load_before = timed(lambda: legacy_load(path))
+    after, load_after = timed(lambda: module.load_combined_instruments(path))
+    print(f"TradeSmart ({len(after)} rows)")
+    memory_report(before, after, load_before, load_after)
+
+    legs = sample_legs(before, n_legs)
+    searches = [('NSE', 'STK00001'), ('BSE', 'STK00002'), ('NFO', 'NIFTY'), ('NSE', 'NOSUCHSYMBOL')]
+    current = TradeSmart.filter_fno_instruments
+
+    def run(frame, legacy):
+        TradeSmart.exchange_data, TradeSmart.fno_index, TradeSmart.symbol_tokens = frame, None, None
+        TradeSmart.filter_fno_instruments = classmethod(legacy_filter_fno_instruments) if legacy else current
+        masking = timed(lambda: [TradeSmart.get_token_details(*leg) for leg in legs])
+        masking = (masking[0], masking[1] / len(legs))
+        search = timed(lambda: [TradeSmart.resolve_ltp_token(*s) for s in searches], repeat=5)
+        search = (search[0], search[1] / len(searches))
+        return masking, search, timed(lambda: module.FnoIndex(frame)), \
+            timed(lambda: TradeSmart.build_symbol_tokens(frame))
+
+    old, new = run(before, True), run(after, False)
+    TradeSmart.filter_fno_instruments = current
+    compare('get_token_details (masking)', old[0], new[0], 'ms/leg')
+    compare('resolve_ltp_token (substring)', old[1], new[1], 'ms/search')
+    compare('FnoIndex build', (None, old[2][1]), (None, new[2][1]))
+    compare('build_symbol_tokens', (None, old[3][1]), (None, new[3][1]))
+
+
+def bench_icici(tmp, rows, n_legs):
+    module = load_script('ICICI')
+    ICICI_Broker = module.ICICI_Broker
+    path = os.path.join(tmp, 'combined_instrument_data.csv')
+    icici_master(rows).to_csv(path, index=False)
+    before, load_before = timed(lambda: legacy_load(path, parse_expiry=True))
+    after, load_after = timed(lambda: module.load_combined_instruments(path))
+    print(f"ICICI ({len(after)} rows)")
+    memory_report(before, after, load_before, load_after)
+
+    sample = before[before['Series'].isin(['OPTION', 'FUTURE'])].sample(n_legs, random_state=0)
+    legs = [(r.ExAllowed, r.ShortName, r.StrikePrice, r.OptionType == 'PE',
+             'M' if r.Series == 'FUTURE' else 'W', 'FUTIDX' if r.Series == 'FUTURE' else None)
+            for r in sample.itertuples()]
+
+    def run(frame):
+        ICICI_Broker.instrument_df = frame
+        calendars = timed(lambda: module.build_calendars(frame, ['ExAllowed', 'ShortName', 'Series'], 'ExpiryDate'))
+        ICICI_Broker.expiry_calendars = calendars[0]
+        details = timed(lambda: [ICICI_Broker.get_icici_token_details(*leg) for leg in legs])
+        return (details[0], details[1] / len(legs)), (None, calendars[1]), timed(lambda: module.TokenIndex(frame))
+
+    logging.disable(logging.WARNING)
+    old, new = run(before), run(after)
+    logging.disable(logging.NOTSET)
+    compare('get_icici_token_details', old[0], new[0], 'ms/leg')
+    compare('build_calendars', old[1], new[1])
+    compare('TokenIndex build', (None, old[2][1]), (None, new[2][1]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--legs', type=int, default=100)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        bench_tradesmart(tmp, args.rows, args.legs)
+        bench_icici(tmp, args.rows, args.legs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# bench_sessions.py
+"""
+Request latency with and without the SessionPool, against a local Noren
+REST stand-in whose QuickAuth login takes --login-latency. Covers a fresh
+login per request, pooled live sessions, a restart restoring persisted
+tokens, an expired session re-logging in lazily, and a burst of users
+logging in at once under the concurrent-login cap.
+
+    python benchmarks/bench_sessions.py --requests 50 --login-latency 0.3
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+sys.path.insert(0, os.path.join(HERE, '..', 'Broker'))
+
+from common.session_pool import SessionPool  # noqa: E402
+from login import TradeSmartLogin  # noqa: E402
+from NorenRestApiPy.NorenApi import NorenApi  # noqa: E402
+from standins import NorenRestServer  # noqa: E402
+
+TOTP_SECRET = 'JBSWY3DPEHPK3PXP'
+
+
+class AuthServer:
+    """QuickAuth issues a fresh token per login and tracks how many logins overlap."""
+
+    def __init__(self, login_latency):
+        self.login_latency = login_latency
+        self.tokens = set()
+        self.logins = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def quick_auth(self, values):
+        with self._lock:
+            self.logins += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.login_latency)
+        token = uuid.uuid4().hex
+        with self._lock:
+            self.tokens.add(token)
+            self.active -= 1
+        return {'stat': 'Ok', 'susertoken': token, 'uname': values['uid']}
+
+
+def client_class(url):
+    class Client(TradeSmartLogin):
+        def __init__(self):
+            NorenApi.__init__(self, host=url, websocket='ws://127.0.0.1:1/')
+    return Client
+
+
+def timed(fn, n):
+    latencies = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(n):
+            start = time.perf_counter()
+            fn(i)
+            latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1e3
+
+
+def show(label, latencies, extra=''):
+    print(f"  {label:<32} p50 {np.percentile(latencies, 50):7.1f} ms  p95 {np.percentile(latencies, 95):7.1f} ms"
+          f"{extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--login-latency', type=float, default=0.3)
+    parser.add_argument('--latency', type=float, default=0.01)
+    parser.add_argument('--users', type=int, default=12)
+    args = parser.parse_args()
+
+    auth = AuthServer(args.login_latency)
+    handlers = {'QuickAuth': auth.quick_auth, 'Limits': lambda v: {'stat': 'Ok', 'cash': '100000.00'}}
+    with NorenRestServer(handlers, latency=args.latency, sessions=auth.tokens) as server, \
+            tempfile.TemporaryDirectory() as tmp:
+        Client = client_class(server.url)
+        creds = {'user': 'U1', 'pwd': 'p', 'factor2': TOTP_SECRET, 'vc': 'VC', 'app_key': 'k', 'imei': 'i'}
+        store = os.path.join(tmp, 'sessions.json')
+        print(f"{args.requests} get_limits requests, login {args.login_latency * 1e3:.0f} ms, "
+              f"call {args.latency * 1e3:.0f} ms")
+
+        def fresh(i):
+            client = Client()
+            client.open_session(**creds)
+            client.get_limits()
+        no_pool = timed(fresh, args.requests)
+        show('login per request (no pool)', no_pool)
+
+        pool = SessionPool(store_path=store)
+        pooled = timed(lambda i: Client.pooled_call(pool, creds, lambda c: c.get_limits()), args.requests)
+        show('pooled', pooled, f"  logins {pool.stats['logins']}")
+
+        restarted = SessionPool(store_path=store)
+        restored = timed(lambda i: Client.pooled_call(restarted, creds, lambda c: c.get_limits()), 1)
+        show('after restart (restored token)', restored, f"  restores {restarted.stats['restores']}")
+
+        auth.tokens.clear()
+        expired = timed(lambda i: Client.pooled_call(restarted, creds, lambda c: c.get_limits()), 1)
+        ok = Client.pooled_call(restarted, creds, lambda c: c.get_limits()).get('stat')
+        show('expired session (lazy re-login)', expired, f"  relogins {restarted.stats['relogins']}, then {ok}")
+
+        burst = SessionPool(max_logins=2)
+        users = [{**creds, 'user': f"U{i:03d}"} for i in range(args.users)]
+        auth.max_active = 0
+        logins_before = auth.logins
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=4 * args.users) as ex:
+            list(ex.map(lambda i: Client.pooled_call(burst, users[i % args.users], lambda c: c.get_limits()),
+                        range(4 * args.users)))
+        print(f"  burst: {4 * args.users} requests from {args.users} users -> {auth.logins - logins_before} logins, "
+              f"max {auth.max_active} concurrent, {time.perf_counter() - start:.2f} s")
+        print(f"  speedup pooled vs login per request: {np.median(no_pool) / np.median(pooled):5.1f}x (p50)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# bench_shared_store.py
+"""
+Memory of N worker processes holding the TradeSmart instrument master:
+each parsing its own copy from the CSV, against each attaching to the
+published snapshot through InstrumentStore. Private and
+proportional (Pss) memory are read from /proc/<pid>/smaps_rollup once all
+N workers are resident, minus a worker that only imported the script
+(Linux only); first with the frame alone, then with the per-worker lookup
+indexes built on it. Also shows a new version published while workers are
+attached and picked up by refresh_instruments() without a restart.
+
+    python benchmarks/bench_shared_store.py --rows 500000 --workers 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+from common.instrument_schema import TRADESMART_SCHEMA, apply_schema  # noqa: E402
+from common.snapshot import snapshot_path, write_snapshot  # noqa: E402
+from synthetic import tradesmart_master  # noqa: E402
+
+# Each worker loads the master, reports, then answers one line on stdin at a
+# time ("index", "refresh" or "exit") so all N are resident at the same time.
+WORKER = r"""
+import json, sys, time
+sys.path.insert(0, sys.argv[1])
+import script
+from common.instrument_schema import read_csv
+from common.instrument_store import InstrumentStore
+from common.snapshot import snapshot_path
+TradeSmart = script.TradeSmart
+mode, csv_path = sys.argv[2], sys.argv[3]
+start = time.perf_counter()
+if mode == 'private':
+    TradeSmart.exchange_data = read_csv(csv_path, script.TRADESMART_SCHEMA)
+elif mode == 'shared':
+    TradeSmart.instrument_store = InstrumentStore(snapshot_path(csv_path), schema=script.TRADESMART_SCHEMA)
+    TradeSmart.exchange_data = TradeSmart.instrument_store.attach()
+store = TradeSmart.instrument_store
+def reply(**fields):
+    rows = 0 if TradeSmart.exchange_data is None else len(TradeSmart.exchange_data)
+    print(json.dumps({'seconds': time.perf_counter() - start, 'rows': rows,
+                      'version': store.version if store else None, **fields}), flush=True)
+reply()
+for line in sys.stdin:
+    start = time.perf_counter()
+    if line.strip() == 'index':
+        if TradeSmart.exchange_data is not None:
+            TradeSmart.build_indexes()
+        reply()
+    elif line.strip() == 'refresh':
+        reply(changed=TradeSmart.refresh_instruments())
+    else:
+        break
+"""
+
+
+def memory_mb(pid):
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        fields = {line.split()[0]: int(line.split()[1]) for line in f if line.split()[0].endswith(':')}
+    return ((fields['Private_Clean:'] + fields['Private_Dirty:']) / 1024, fields['Pss:'] / 1024)
+
+
+def spawn(mode, csv_path, workers, cwd):
+    broker_dir = os.path.join(HERE, '..', 'Broker')
+    procs = [subprocess.Popen([sys.executable, '-c', WORKER, broker_dir, mode, csv_path], cwd=cwd,
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+                              env={**os.environ, 'PYTHONPATH': os.pathsep.join(
+                                  [os.path.join(HERE, '..'), os.environ.get('PYTHONPATH', '')])})
+             for _ in range(workers)]
+    return procs, [json.loads(p.stdout.readline()) for p in procs]
+
+
+def send(procs, line):
+    replies = []
+    for p in procs:
+        p.stdin.write(line + '\n')
+        p.stdin.flush()
+    for p in procs:
+        replies.append(json.loads(p.stdout.readline()))
+    return replies
+
+
+def close(procs):
+    for p in procs:
+        p.stdin.write('exit\n')
+        p.stdin.close()
+        p.wait()
+
+
+def usage(procs, base):
+    """Mean private MB per worker and total Pss MB, both above the import-only baseline."""
+    mem = [memory_mb(p.pid) for p in procs]
+    return (sum(m[0] for m in mem) / len(procs) - base[0], sum(m[1] for m in mem) - len(procs) * base[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        df = tradesmart_master(args.rows)
+        csv_path = os.path.join(tmp, 'combined_instruments.csv')
+        df.to_csv(csv_path, index=False)
+        write_snapshot(apply_schema(df, TRADESMART_SCHEMA), snapshot_path(csv_path))
+        print(f"TradeSmart master ({len(df)} rows), {args.workers} workers")
+
+        procs, _ = spawn('none', csv_path, 1, tmp)
+        base = memory_mb(procs[0].pid)
+        close(procs)
+
+        frames, indexed = {}, {}
+        for mode in ('private', 'shared'):
+            procs, results = spawn(mode, csv_path, args.workers, tmp)
+            private, frames[mode] = usage(procs, base)
+            worst = max(r['seconds'] for r in results)
+            print(f"  {mode:<8} frame      load {worst * 1e3:6.0f} ms  private +{private:7.1f} MB/worker  "
+                  f"Pss total +{frames[mode]:7.1f} MB")
+            results = send(procs, 'index')
+            private, indexed[mode] = usage(procs, base)
+            worst = max(r['seconds'] for r in results)
+            print(f"  {mode:<8} + indexes  build {worst * 1e3:5.0f} ms  private +{private:7.1f} MB/worker  "
+                  f"Pss total +{indexed[mode]:7.1f} MB")
+            if mode == 'shared':
+                before = results[0]['version']
+                write_snapshot(apply_schema(tradesmart_master(args.rows // 2), TRADESMART_SCHEMA),
+                               snapshot_path(csv_path))
+                replies = send(procs, 'refresh')
+                print(f"  republished while attached: {sum(r['changed'] for r in replies)}/{args.workers} workers "
+                      f"switched {before[:12]}.. -> {replies[0]['version'][:12]}.., rows {results[0]['rows']} "
+                      f"-> {replies[0]['rows']}")
+            close(procs)
+        saved = frames['private'] - frames['shared']
+        print(f"  saved by sharing the frame: {saved / args.workers:7.1f} MB/worker, {saved:7.1f} MB total "
+              f"({saved / max(indexed['private'], 1e-6):.0%} of the total with indexes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# bench_startup.py
+"""
+Cold-start time and load memory of load_combined_instruments for both
+brokers, from the CSV alone and from the typed snapshot. Every load runs
+in a fresh interpreter so peak RSS is not shared between runs (Linux only).
+
+    python benchmarks/bench_startup.py --rows 500000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+from common.instrument_schema import ICICI_SCHEMA, TRADESMART_SCHEMA, apply_schema  # noqa: E402
+from common.snapshot import snapshot_path, write_snapshot  # noqa: E402
+from synthetic import icici_master, tradesmart_master  # noqa: E402
+
+# Peak RSS comes from VmHWM: ru_maxrss is inherited from the (large) parent across fork.
+CHILD = r"""
+import json, os, sys, time
+def peak_kb():
+    with open('/proc/self/status') as f:
+        return next(int(line.split()[1]) for line in f if line.startswith('VmHWM'))
+sys.path.insert(0, sys.argv[1])
+from script import load_combined_instruments
+before = peak_kb()
+start = time.perf_counter()
+df = load_combined_instruments(sys.argv[2])
+elapsed = time.perf_counter() - start
+after = peak_kb()
+print(json.dumps({'seconds': elapsed, 'rss_kb': after - before, 'rows': len(df),
+                  'frame_mb': df.memory_usage(deep=True).sum() / 2**20}))
+"""
+
+
+def measure(broker_dir, csv_path, cwd):
+    out = subprocess.run([sys.executable, '-c', CHILD, broker_dir, csv_path], cwd=cwd,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    args = parser.parse_args()
+
+    cases = [
+        ('TradeSmart', 'Broker', 'combined_instruments.csv', tradesmart_master, TRADESMART_SCHEMA),
+        ('ICICI', 'ICICI', 'combined_instrument_data.csv', icici_master, ICICI_SCHEMA),
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, folder, filename, generate, schema in cases:
+            df = generate(args.rows)
+            csv_only = os.path.join(tmp, label, 'csv', filename)
+            with_snapshot = os.path.join(tmp, label, 'snapshot', filename)
+            for path in (csv_only, with_snapshot):
+                os.makedirs(os.path.dirname(path))
+                df.to_csv(path, index=False)
+            write_snapshot(apply_schema(df, schema), snapshot_path(with_snapshot))
+
+            broker_dir = os.path.join(HERE, '..', folder)
+            print(f"{label} ({len(df)} rows)")
+            results = {}
+            for mode, path in (('csv', csv_only), ('snapshot', with_snapshot)):
+                results[mode] = r = measure(broker_dir, path, tmp)
+                print(f"  {mode:<9} {r['seconds'] * 1e3:8.0f} ms  peak RSS +{r['rss_kb'] / 1024:7.1f} MB  "
+                      f"frame {r['frame_mb']:7.1f} MB")
+            print(f"  speedup   {results['csv']['seconds'] / results['snapshot']['seconds']:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# bench_symbol_search.py
+"""
+Partial symbol lookups on a full-size synthetic TradeSmart master: the
+str.contains scan get_ltp and the equity branch of get_token_details fell
+back to, against SymbolIndex (common/symbol_index.py). Queries are exact
+symbols, prefixes, inner substrings and misses drawn per exchange. Checks
+that the index finds exactly the symbols the scan matched, and how often
+its top candidate is the scan's first row (they differ where ranking
+prefers an exact or prefix match over an earlier row).
+
+    python benchmarks/bench_symbol_search.py --rows 500000 --queries 50
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+from bench_batch_legs import load_script  # noqa: E402
+from common.symbol_index import SymbolIndex  # noqa: E402
+from synthetic import tradesmart_master  # noqa: E402
+
+EXCHANGES = ('NSE', 'BSE', 'NFO')
+
+
+def sample_queries(df, n, seed=0):
+    """(kind, exchange, text) tuples, n of each kind per exchange."""
+    rng = np.random.default_rng(seed)
+    queries = []
+    for exchange in EXCHANGES:
+        symbols = df.loc[df['Exchange'] == exchange, 'TradingSymbol'].astype(str).to_numpy()
+        for symbol in symbols[rng.integers(0, len(symbols), n)]:
+            cut = int(rng.integers(2, len(symbol)))
+            start = int(rng.integers(1, len(symbol) - 2))
+            queries += [('exact', exchange, symbol), ('prefix', exchange, symbol[:cut].lower()),
+                        ('substring', exchange, symbol[start:start + 3 + int(rng.integers(0, 5))]),
+                        ('miss', exchange, 'QX' + symbol[-4:])]
+    return queries
+
+
+def legacy_search(df, exchange, text):
+    """Every distinct symbol the old fallback matched, first row first."""
+    rows = df[df['Exchange'] == exchange]
+    rows = rows[rows['TradingSymbol'].str.contains(text.upper(), case=False, na=False)]
+    return list(dict.fromkeys(rows['TradingSymbol'].astype(str)))
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def report(label, queries, legacy, indexed, legacy_time, indexed_time):
+    same = sum(sorted(a) == sorted(b) for a, b in zip(legacy, indexed))
+    top = sum((a[:1] == b[:1]) for a, b in zip(legacy, indexed))
+    print(f"  {label:<10} scan {legacy_time / len(queries) * 1e3:8.2f} ms   index {indexed_time / len(queries) * 1e6:8.1f} us"
+          f"   ({legacy_time / indexed_time:7.0f}x)  same matches {same}/{len(queries)}, same top {top}/{len(queries)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=500_000)
+    parser.add_argument('--queries', type=int, default=25, help="queries of each kind per exchange")
+    args = parser.parse_args()
+
+    module = load_script('Broker')
+    TradeSmart = module.TradeSmart
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'combined_instruments.csv')
+        tradesmart_master(args.rows).to_csv(path, index=False)
+        df = module.load_combined_instruments(path)
+    queries = sample_queries(df, args.queries)
+    print(f"master rows: {len(df)}, queries: {len(queries)}")
+
+    index = SymbolIndex(df['TradingSymbol'], df['Exchange'])
+    for exchange in EXCHANGES:
+        group, elapsed = timed(lambda: index.group(exchange))
+        trigrams, trigram_time = timed(group.trigrams)
+        print(f"  build {exchange}: {len(group.names):7d} symbols, sorted {elapsed * 1e3:6.0f} ms, "
+              f"trigrams {trigram_time * 1e3:6.0f} ms ({trigrams[3].nbytes / 2**20:.1f} MB postings)")
+
+    for kind in ('exact', 'prefix', 'substring', 'miss'):
+        subset = [q for q in queries if q[0] == kind]
+        legacy, legacy_time = timed(lambda: [legacy_search(df, ex, text) for _, ex, text in subset])
+        indexed, indexed_time = timed(lambda: [[s for s, _ in index.search(ex, text, None)] for _, ex, text in subset])
+        _, top_time = timed(lambda: [index.search(ex, text, 1) for _, ex, text in subset])
+        report(kind, subset, legacy, indexed, legacy_time, indexed_time)
+        print(f"  {'':<10} best candidate only (limit=1) {top_time / len(subset) * 1e6:8.1f} us")
+
+    partial = [(ex, text) for kind, ex, text in queries if kind in ('prefix', 'substring')]
+    TradeSmart.exchange_data, TradeSmart.symbol_tokens = df, TradeSmart.build_symbol_tokens(df)
+    with contextlib.redirect_stdout(io.StringIO()):
+        TradeSmart.symbol_index = None
+        _, legacy_time = timed(lambda: [TradeSmart.resolve_ltp_token(*q) for q in partial])
+        TradeSmart.symbol_index = index
+        _, indexed_time = timed(lambda: [TradeSmart.resolve_ltp_token(*q) for q in partial])
+    print(f"  resolve_ltp_token on partial symbols: {legacy_time / len(partial) * 1e3:.2f} ms -> "
+          f"{indexed_time / len(partial) * 1e6:.1f} us ({legacy_time / indexed_time:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
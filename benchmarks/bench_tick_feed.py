@@ -0,0 +1,96 @@
+# bench_tick_feed.py
+"""
+Replay recorded ticks through a local Noren websocket stand-in into
+TradeSmart.tick_feed, check the last-price table against the recording and
+compare get_ltp served from the table with get_ltp over REST GetQuotes.
+
+    python benchmarks/bench_tick_feed.py --rows 200000 --positions 40 --ticks 20000
+    python benchmarks/bench_tick_feed.py --recording ticks.jsonl
+
+A recording is one touchline message per line with at least 'e', 'tk' and 'lp'.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'Broker'))
+
+from NorenRestApiPy.NorenApi import NorenApi  # noqa: E402
+from script import TradeSmart  # noqa: E402
+from standins import NorenFeedServer, NorenRestServer  # noqa: E402
+from synthetic import record_ticks, tradesmart_master  # noqa: E402
+
+
+def make_client(url, ws_url):
+    client = TradeSmart.__new__(TradeSmart)
+    NorenApi.__init__(client, host=url, websocket=ws_url)
+    client.set_session('BENCH', 'x', 'token')
+    return client
+
+
+def per_call(fn, items):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        results = [fn(*item) for item in items]
+    return results, (time.perf_counter() - start) / len(items)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--positions', type=int, default=40)
+    parser.add_argument('--ticks', type=int, default=20_000)
+    parser.add_argument('--recording', help="JSONL file of recorded touchline ticks")
+    parser.add_argument('--latency', type=float, default=0.03)
+    args = parser.parse_args()
+
+    df = tradesmart_master(args.rows)
+    TradeSmart.exchange_data = df
+    TradeSmart.symbol_tokens = TradeSmart.build_symbol_tokens(df)
+    rows = df.iloc[np.random.default_rng(0).choice(len(df), args.positions, replace=False)]
+    if args.recording:
+        with open(args.recording) as f:
+            ticks = [json.loads(line) for line in f if line.strip()]
+    else:
+        ticks = record_ticks(rows, args.ticks)
+    expected = {(t['e'], t['tk']): float(t['lp']) for t in ticks}
+    items = list(zip(rows['Exchange'], rows['TradingSymbol']))
+
+    def quote(values):
+        return {'stat': 'Ok', 'lp': f"{expected.get((values['exch'], values['token']), 0):.2f}"}
+
+    with NorenRestServer({'GetQuotes': quote}, latency=args.latency) as rest, NorenFeedServer(ticks) as feed_server:
+        client = make_client(rest.url, feed_server.url)
+        TradeSmart.quote_cache.ttl = 0
+        rest_prices, rest_time = per_call(client.get_ltp, items)
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            feed = client.start_streams(expected.keys(), track_orders=False)
+        if not feed.wait_connected(10) or not feed_server.replayed.wait(30):
+            raise SystemExit("tick feed stand-in did not finish replaying")
+        while feed.ticks < feed_server.sent:
+            time.sleep(0.001)
+        ingest = time.perf_counter() - start
+        stream_prices, stream_time = per_call(client.get_ltp, items)
+        table = {key: feed.ltp(*key) for key in expected}
+        client.stop_streams()
+
+    stale = sum(1 for key, price in expected.items() if table[key] != price)
+    mismatches = sum(1 for a, b in zip(rest_prices, stream_prices) if a != b)
+    print(f"master rows {len(df)}, table slots {len(feed.slots)}, recorded ticks {len(ticks)}")
+    print(f"  replay + ingest:     {ingest * 1e3:8.1f} ms  ({feed.ticks / ingest:,.0f} ticks/s)")
+    print(f"  get_ltp via REST:    {rest_time * 1e3:8.3f} ms/call")
+    print(f"  get_ltp via table:   {stream_time * 1e3:8.3f} ms/call  ({rest_time / stream_time:,.0f}x)")
+    print(f"  table vs recording: {stale} stale, get_ltp REST vs table: {mismatches} mismatches")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# bench_token_details.py
+"""
+Compare TradeSmart.get_token_details on the masking path against the
+composite FnoIndex built in initialize_data.
+
+    python benchmarks/bench_token_details.py --rows 500000 --legs 2000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Broker'))
+
+from instrument_index import FnoIndex  # noqa: E402
+from script import TradeSmart, load_combined_instruments  # noqa: E402
+from synthetic import tradesmart_master  # noqa: E402
+
+EXPIRY_CODES = ['W', 'NW', 'M', 'NM', 'NNM']
+
+
+def sample_legs(df, n, seed=0):
+    rng = np.random.default_rng(seed)
+    options = df[df['Instrument'].astype(str).str.startswith('OPT')]
+    futures = df[df['Instrument'] == 'FUTIDX']
+    legs = []
+    for i in rng.integers(0, len(options), n):
+        row = options.iloc[i]
+        legs.append((row['Exchange'], row['Symbol'], str(int(row['StrikePrice'])),
+                     "1" if row['OptionType'] == 'PE' else "0",
+                     EXPIRY_CODES[i % len(EXPIRY_CODES)], row['Instrument']))
+    for i in rng.integers(0, len(futures), max(1, n // 10)):
+        row = futures.iloc[i]
+        legs.append((row['Exchange'], row['Symbol'], None, None, EXPIRY_CODES[i % 3 * 2 % 5], 'FUTIDX'))
+    return legs
+
+
+def run(legs):
+    start = time.perf_counter()
+    results = [TradeSmart.get_token_details(*leg) for leg in legs]
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--legs', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'combined_instruments.csv')
+        tradesmart_master(args.rows).to_csv(path, index=False)
+        TradeSmart.exchange_data = load_combined_instruments(path)
+    legs = sample_legs(TradeSmart.exchange_data, args.legs)
+    print(f"master rows: {len(TradeSmart.exchange_data)}, legs: {len(legs)}")
+
+    TradeSmart.fno_index = None
+    legacy, legacy_time = run(legs)
+
+    start = time.perf_counter()
+    TradeSmart.fno_index = FnoIndex(TradeSmart.exchange_data)
+    build_time = time.perf_counter() - start
+    indexed, indexed_time = run(legs)
+
+    mismatches = sum(
+        1 for a, b in zip(legacy, indexed)
+        if (a or (None, None, None))[0] != b[0]
+    )
+    print(f"index build:   {build_time * 1e3:10.1f} ms ({len(TradeSmart.fno_index)} keys)")
+    print(f"masking path:  {legacy_time / len(legs) * 1e6:10.1f} us/leg")
+    print(f"indexed path:  {indexed_time / len(legs) * 1e6:10.1f} us/leg")
+    print(f"speedup:       {legacy_time / indexed_time:10.1f}x")
+    print(f"mismatches:    {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# bench_token_lookup.py
+"""
+Compare ICICI_Broker.filter_csv_by_token on the copy-and-scan path against
+the TokenIndex built in initialize_data.
+
+    python benchmarks/bench_token_lookup.py --rows 500000 --lookups 2000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ICICI'))
+
+from icici_instrument_index import TokenIndex  # noqa: E402
+from script import ICICI_Broker, load_combined_instruments  # noqa: E402
+from synthetic import icici_master  # noqa: E402
+
+
+def run(broker, tokens):
+    start = time.perf_counter()
+    results = [broker.filter_csv_by_token(token) for token in tokens]
+    return results, time.perf_counter() - start
+
+
+def same(a, b):
+    if isinstance(a, str) or isinstance(b, str):
+        return a == b
+    (right_a, row_a), (right_b, row_b) = a, b
+    return right_a == right_b and all(
+        (pd.isna(row_a[col]) and pd.isna(row_b[col])) or row_a[col] == row_b[col] for col in row_a.index
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--lookups', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'combined_instrument_data.csv')
+        icici_master(args.rows).to_csv(path, index=False)
+        ICICI_Broker.instrument_df = load_combined_instruments(path)
+
+    rng = np.random.default_rng(0)
+    tokens = ICICI_Broker.instrument_df['Token'].to_numpy()[rng.integers(0, len(ICICI_Broker.instrument_df), args.lookups)]
+    # Skip __init__: it opens a Breeze session and the lookup only needs class state.
+    broker = object.__new__(ICICI_Broker)
+    print(f"master rows: {len(ICICI_Broker.instrument_df)}, lookups: {len(tokens)}")
+
+    ICICI_Broker.token_index = None
+    legacy, legacy_time = run(broker, tokens)
+
+    start = time.perf_counter()
+    ICICI_Broker.token_index = TokenIndex(ICICI_Broker.instrument_df)
+    build_time = time.perf_counter() - start
+    indexed, indexed_time = run(broker, tokens)
+
+    mismatches = sum(1 for a, b in zip(legacy, indexed) if not same(a, b))
+    print(f"index build:   {build_time * 1e3:10.1f} ms ({len(ICICI_Broker.token_index)} tokens)")
+    print(f"copy + scan:   {legacy_time / len(tokens) * 1e6:10.1f} us/lookup")
+    print(f"indexed:       {indexed_time / len(tokens) * 1e6:10.1f} us/lookup")
+    print(f"speedup:       {legacy_time / indexed_time:10.1f}x")
+    print(f"mismatches:    {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+# load_orders.py
+"""
+Load test for TradeSmart.place_order_on_broker and
+ICICI_Broker.place_order_on_broker against local broker stand-ins
+(standins.OrderSim behind a Noren REST server or a Breeze client
+stand-in) with configurable latency, error rates and fill behaviour.
+
+Orders are offered open-loop at --rate per second onto --concurrency
+worker threads, so when the broker path cannot keep up the backlog shows
+as queueing time rather than a lower offered rate. Reports throughput and
+p50 / p95 / p99 per stage:
+
+    queue    offered until a worker picked the order up
+    resolve  token -> instrument row (ICICI filter_csv_by_token)
+    submit   the place-order call to the broker
+    settle   submit returned until the order was known filled, rejected
+             or cancelled after the timeout
+    total    offered until place_order_on_broker returned
+
+followed by the broker's own spans (common/instrumentation.py): token
+resolution, each broker API call, status polling and the LTP fallback.
+ICICI_Broker's default client-side rate_limits are off unless
+--broker-limits is given.
+
+    python benchmarks/load_orders.py --broker tradesmart --rate 100 --orders 1000 --latency 0.02
+    python benchmarks/load_orders.py --broker icici --rate 20 --reject-rate 0.05 --output load.json
+"""
+import argparse
+import collections
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+from bench_batch_legs import load_script  # noqa: E402
+from common.instrumentation import REGISTRY  # noqa: E402
+from NorenRestApiPy.NorenApi import NorenApi  # noqa: E402
+from standins import BreezeOrders, NorenFeedServer, NorenRestServer, OrderSim, noren_handlers  # noqa: E402
+from synthetic import icici_master, tradesmart_master  # noqa: E402
+
+STAGES = ('queue', 'resolve', 'submit', 'settle', 'total')
+
+
+class Stages:
+    """Per-order stage durations, recorded by wrapping the calls that bound each stage."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def begin(self):
+        self._local.marks = {}
+        return self._local.marks
+
+    def wrap(self, owner, name, stage):
+        fn = getattr(owner, name)
+        local = self._local
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                marks = getattr(local, 'marks', None)
+                if marks is not None:
+                    marks[stage] = marks.get(stage, 0.0) + time.perf_counter() - start
+                    marks[f"{stage}_end"] = time.perf_counter()
+
+        setattr(owner, name, timed)
+
+
+def tradesmart_placer(sim, args, stages, exit_stack):
+    module = load_script('Broker')
+    TradeSmart = module.TradeSmart
+    TradeSmart.exchange_data = tradesmart_master(1_000)
+    feed = exit_stack.enter_context(NorenFeedServer([])) if args.stream else None
+    rest = exit_stack.enter_context(NorenRestServer(noren_handlers(sim, feed)))
+
+    client = TradeSmart.__new__(TradeSmart)
+    NorenApi.__init__(client, host=rest.url, websocket=feed.url if feed else rest.url)
+    client.set_session('LOAD', 'x', 'token')
+    client.order_timeout = args.order_timeout
+    if feed is not None:
+        with contextlib.redirect_stdout(io.StringIO()):
+            client.start_streams()
+        if not client.tick_feed.wait_connected(10) or not client.order_tracker.streaming.wait(10):
+            raise SystemExit("order stream stand-in did not connect")
+        exit_stack.callback(client.stop_streams)
+    stages.wrap(client, 'place_order', 'submit')
+    symbols = TradeSmart.exchange_data['TradingSymbol'].tolist()
+    return lambda i: client.place_order_on_broker(symbols[i % len(symbols)], 50, 'NFO', 'B', 'MARKET', 0)
+
+
+def icici_placer(sim, args, stages, exit_stack):
+    ICICI_Broker = load_script('ICICI').ICICI_Broker
+    ICICI_Broker.instrument_df = icici_master(20_000)
+    ICICI_Broker.build_indexes()
+    # Skip __init__: it opens a Breeze session; the stand-in takes the client's place.
+    broker = ICICI_Broker.__new__(ICICI_Broker)
+    broker.obj = BreezeOrders(sim)
+    if not args.broker_limits:
+        broker.rate_limits = None
+    stages.wrap(broker, 'filter_csv_by_token', 'resolve')
+    stages.wrap(broker.obj, 'place_order', 'submit')
+    orders = ICICI_Broker.instrument_df[ICICI_Broker.instrument_df['Series'] == 'OPTION']
+    legs = list(zip(orders['Token'].tolist(), orders['ShortName'].tolist(), orders['ExAllowed'].tolist()))
+    return lambda i: broker.place_order_on_broker(*legs[i % len(legs)][:2], 25, legs[i % len(legs)][2], 'BUY',
+                                                  'MARKET', 0)
+
+
+def drive(place, stages, rate, orders, concurrency):
+    """Offer orders at rate per second; one record of stage durations and outcome per order."""
+    records = [None] * orders
+
+    def one(i, due):
+        start = time.perf_counter()
+        marks = stages.begin()
+        try:
+            order_id, _, error = (place(i) or (None, None, 'no result'))[:3]
+        except Exception as e:  # a failure of the harness itself, not of the order
+            order_id, error = None, f"harness error: {e}"
+        done = time.perf_counter()
+        record = {'queue': start - due, 'total': done - due, 'ok': bool(order_id) and error is None,
+                  'error': error}
+        record.update((stage, marks[stage]) for stage in ('resolve', 'submit') if stage in marks)
+        if 'submit_end' in marks:
+            record['settle'] = done - marks['submit_end']
+        records[i] = record
+
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=concurrency) as pool:
+        t0 = time.perf_counter()
+        for i in range(orders):
+            due = t0 + i / rate
+            wait = due - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            pool.submit(one, i, due)
+        offered = time.perf_counter() - t0
+    elapsed = time.perf_counter() - t0
+    return records, offered, elapsed
+
+
+def summarise(records, offered, elapsed):
+    ok = sum(r['ok'] for r in records)
+    summary = {
+        'orders': len(records),
+        'ok': ok,
+        'offered_rate': len(records) / offered if offered else None,
+        'throughput': len(records) / elapsed,
+        'ok_throughput': ok / elapsed,
+        'errors': dict(collections.Counter(r['error'] for r in records if not r['ok']).most_common()),
+        'stages': {},
+    }
+    for stage in STAGES:
+        values = np.array([r[stage] for r in records if stage in r])
+        if len(values):
+            p50, p95, p99 = np.percentile(values * 1e3, [50, 95, 99])
+            summary['stages'][stage] = {'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99, 'count': len(values)}
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--broker', choices=('tradesmart', 'icici'), default='tradesmart')
+    parser.add_argument('--rate', type=float, default=50.0, help="orders offered per second")
+    parser.add_argument('--orders', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=64, help="worker threads placing orders")
+    parser.add_argument('--latency', type=float, default=0.02, help="stand-in seconds per call")
+    parser.add_argument('--jitter', type=float, default=0.005, help="mean extra exponential seconds per call")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of placements refused")
+    parser.add_argument('--reject-rate', type=float, default=0.0, help="share of accepted orders rejected")
+    parser.add_argument('--unfilled-rate', type=float, default=0.0, help="share of accepted orders never filled")
+    parser.add_argument('--fill-delay', type=float, default=0.05, help="seconds from placement to fill")
+    parser.add_argument('--order-timeout', type=float, default=3.0, help="TradeSmart.order_timeout")
+    parser.add_argument('--stream', action='store_true', help="TradeSmart: settle orders from the order stream")
+    parser.add_argument('--broker-limits', action='store_true',
+                        help="ICICI: keep the default rate_limits; the stand-in itself has no call limit")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write the summary JSON here")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    sim = OrderSim(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                   reject_rate=args.reject_rate, unfilled_rate=args.unfilled_rate, fill_delay=args.fill_delay,
+                   seed=args.seed)
+    stages = Stages()
+    with contextlib.ExitStack() as exit_stack:
+        build = tradesmart_placer if args.broker == 'tradesmart' else icici_placer
+        with contextlib.redirect_stdout(io.StringIO()):
+            place = build(sim, args, stages, exit_stack)
+        print(f"{args.broker}: {args.orders} orders at {args.rate:g}/s on {args.concurrency} threads, "
+              f"{args.latency * 1e3:.0f} ms + ~{args.jitter * 1e3:.0f} ms per call, fill after "
+              f"{args.fill_delay * 1e3:.0f} ms, refused {args.error_rate:.0%} / rejected {args.reject_rate:.0%} / "
+              f"unfilled {args.unfilled_rate:.0%}")
+        REGISTRY.reset()
+        records, offered, elapsed = drive(place, stages, args.rate, args.orders, args.concurrency)
+    summary = summarise(records, offered, elapsed)
+    summary['spans'] = REGISTRY.export()
+    summary['stand_in'] = {'calls': sim.calls, 'outcomes': sim.outcomes}
+    summary['args'] = vars(args)
+
+    print(f"  offered {summary['offered_rate']:7.1f}/s   completed {summary['throughput']:7.1f}/s   "
+          f"ok {summary['ok']}/{summary['orders']} ({summary['ok_throughput']:.1f}/s)   wall {elapsed:.2f} s")
+    print(f"  {'stage':<8} {'p50':>9} {'p95':>9} {'p99':>9}  (ms)")
+    for stage, p in summary['stages'].items():
+        print(f"  {stage:<8} {p['p50_ms']:9.1f} {p['p95_ms']:9.1f} {p['p99_ms']:9.1f}  n={p['count']}")
+    print(f"  {'span':<28} {'p50':>9} {'p95':>9} {'p99':>9}  (ms, bucket bounds)")
+    for name, h in summary['spans'].items():
+        print(f"  {name:<28} {h['p50'] * 1e3:9.2f} {h['p95'] * 1e3:9.2f} {h['p99'] * 1e3:9.2f}  n={h['count']}"
+              + (f" errors={h['errors']}" if h['errors'] else ""))
+    for error, count in summary['errors'].items():
+        print(f"  {count:6d} x {error}")
+    print(f"  stand-in calls {sim.calls}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"summary written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,482 @@
+# standins.py
+"""Local stand-ins for the broker endpoints, for benchmarks that must not touch the network."""
+import base64
+import hashlib
+import io
+import itertools
+import json
+import random
+import socket
+import struct
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def zip_bytes(name: str, text: str) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as z:
+        z.writestr(name, text)
+    return buffer.getvalue()
+
+
+class MasterFileServer:
+    """
+    Serve fixture zips (path -> bytes) over HTTP on localhost with an
+    artificial per-request latency. The first ``fail_first`` requests for
+    each path answer 503 so client retries are exercised. Responses carry an
+    ETag derived from the body and honour If-None-Match with a 304;
+    ``files`` can be replaced while serving to simulate a new master.
+    """
+
+    def __init__(self, files: dict, latency: float = 0.0, fail_first: int = 0, etag: bool = True):
+        self.files = files
+        self.etag = etag
+        self.latency = latency
+        self.fail_first = fail_first
+        self.hits = {}
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with server._lock:
+                    server.hits[self.path] = server.hits.get(self.path, 0) + 1
+                    attempt = server.hits[self.path]
+                time.sleep(server.latency)
+                body = server.files.get(self.path)
+                if body is None or attempt <= server.fail_first:
+                    self.send_response(404 if body is None else 503)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                etag = '"%s"' % hashlib.sha1(body).hexdigest()
+                if server.etag and self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                if server.etag:
+                    self.send_header('ETag', etag)
+                self.send_header('Content-Type', 'application/zip')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class NorenRestServer:
+    """
+    Minimal Noren REST endpoint on localhost. Requests are the library's
+    ``jData=<json>&jKey=<token>`` form posts; ``handlers`` maps a route name
+    (e.g. 'GetQuotes') to a callable taking the decoded jData dict and
+    returning the JSON-serialisable reply. Every request sleeps ``latency``
+    seconds first; ``calls`` counts requests per route. With ``sessions`` (a
+    set of valid jKeys), requests on any route but QuickAuth carrying another
+    jKey get Noren's session-expired reply.
+    """
+
+    def __init__(self, handlers: dict, latency: float = 0.0, sessions=None):
+        self.handlers = handlers
+        self.latency = latency
+        self.sessions = sessions
+        self.calls = {}
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                route = self.path.strip('/').rsplit('/', 1)[-1]
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode()
+                jdata, _, jkey = body.partition('&jKey=')
+                values = json.loads(jdata[len('jData='):]) if jdata.startswith('jData=') else {}
+                with server._lock:
+                    server.calls[route] = server.calls.get(route, 0) + 1
+                time.sleep(server.latency)
+                handler = server.handlers.get(route)
+                if server.sessions is not None and route != 'QuickAuth' and jkey not in server.sessions:
+                    reply = {'stat': 'Not_Ok', 'emsg': 'Session Expired :  Invalid Session Key'}
+                elif handler is None:
+                    reply = {'stat': 'Not_Ok', 'emsg': f'no route {route}'}
+                else:
+                    reply = handler(values)
+                data = json.dumps(reply).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/NorenWClientTP/"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _ws_accept(key: str) -> str:
+    digest = hashlib.sha1((key + '258EAFA5-E914-47DA-95CA-C5AB0DC85B11').encode()).digest()
+    return base64.b64encode(digest).decode()
+
+
+def _ws_read(conn):
+    """Read one client frame; returns (opcode, payload) or (None, b'') when the socket closes."""
+    def exact(n):
+        data = b''
+        while len(data) < n:
+            chunk = conn.recv(n - len(data))
+            if not chunk:
+                raise ConnectionError
+            data += chunk
+        return data
+
+    try:
+        b1, b2 = exact(2)
+        length = b2 & 0x7F
+        if length == 126:
+            length = struct.unpack('>H', exact(2))[0]
+        elif length == 127:
+            length = struct.unpack('>Q', exact(8))[0]
+        mask = exact(4) if b2 & 0x80 else b'\0\0\0\0'
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(exact(length)))
+        return b1 & 0x0F, payload
+    except (ConnectionError, OSError):
+        return None, b''
+
+
+def _ws_frame(opcode: int, payload: bytes) -> bytes:
+    n = len(payload)
+    if n < 126:
+        header = struct.pack('>BB', 0x80 | opcode, n)
+    elif n < 1 << 16:
+        header = struct.pack('>BBH', 0x80 | opcode, 126, n)
+    else:
+        header = struct.pack('>BBQ', 0x80 | opcode, 127, n)
+    return header + payload
+
+
+class NorenFeedServer:
+    """
+    Local stand-in for the Noren websocket (NorenWSTP). It answers the
+    connect message with an 'ck' OK, acknowledges touchline subscriptions
+    with a 'tk' carrying the last recorded price of each token, then replays
+    the recorded ``ticks`` ('tf' dicts with 'e', 'tk', 'lp') for subscribed
+    tokens, ``interval`` seconds apart; ``sent`` counts the price messages
+    delivered, acks included. ``push`` sends any message (for example an
+    'om' order update) to every connected client.
+    """
+
+    def __init__(self, ticks, interval: float = 0.0, loop: bool = False):
+        self.ticks = list(ticks)
+        self.interval = interval
+        self.loop = loop
+        self.sent = 0
+        self.replayed = threading.Event()
+        self._clients = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind(('127.0.0.1', 0))
+        self._sock.listen()
+        self.url = f"ws://127.0.0.1:{self._sock.getsockname()[1]}/NorenWSTP/"
+        self._thread = threading.Thread(target=self._accept, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._sock.close()
+        with self._lock:
+            for conn, _ in self._clients:
+                conn.close()
+
+    def push(self, message: dict):
+        data = _ws_frame(0x1, json.dumps(message).encode())
+        with self._lock:
+            for conn, lock in self._clients:
+                with lock:
+                    try:
+                        conn.sendall(data)
+                    except OSError:
+                        pass
+
+    def _accept(self):
+        while not self._stop.is_set():
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        request = b''
+        while b'\r\n\r\n' not in request:
+            chunk = conn.recv(4096)
+            if not chunk:
+                conn.close()
+                return
+            request += chunk
+        headers = dict(line.split(': ', 1) for line in request.decode().split('\r\n')[1:] if ': ' in line)
+        key = next(v for k, v in headers.items() if k.lower() == 'sec-websocket-key')
+        conn.sendall(('HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+                      f'Sec-WebSocket-Accept: {_ws_accept(key)}\r\n\r\n').encode())
+        lock = threading.Lock()
+        with self._lock:
+            self._clients.append((conn, lock))
+
+        def send(message):
+            with lock:
+                conn.sendall(_ws_frame(0x1, json.dumps(message).encode()))
+
+        subscribed = set()
+        replay = None
+        while not self._stop.is_set():
+            opcode, payload = _ws_read(conn)
+            if opcode is None or opcode == 0x8:
+                break
+            if opcode == 0x9:
+                with lock:
+                    conn.sendall(_ws_frame(0xA, payload))
+                continue
+            if opcode != 0x1:
+                continue
+            message = json.loads(payload)
+            kind = message.get('t')
+            if kind == 'c':
+                send({'t': 'ck', 's': 'OK', 'uid': message.get('uid')})
+            elif kind == 'o':
+                send({'t': 'ok'})
+            elif kind in ('t', 'd'):
+                new = [tuple(k.split('|', 1)) for k in message.get('k', '').split('#') if '|' in k]
+                subscribed.update(new)
+                last = {}
+                for tick in self.ticks:
+                    last[(tick['e'], tick['tk'])] = tick
+                for exchange, token in new:
+                    ack = {'t': 'tk', 'e': exchange, 'tk': token}
+                    if (exchange, token) in last:
+                        ack['lp'] = last[(exchange, token)]['lp']
+                        self.sent += 1
+                    send(ack)
+                if replay is None:
+                    replay = threading.Thread(target=self._replay, args=(send, subscribed), daemon=True)
+                    replay.start()
+            elif kind in ('u', 'ud'):
+                subscribed.difference_update(tuple(k.split('|', 1)) for k in message.get('k', '').split('#'))
+        with self._lock:
+            self._clients = [c for c in self._clients if c[0] is not conn]
+        conn.close()
+
+    def _replay(self, send, subscribed):
+        while not self._stop.is_set():
+            for tick in self.ticks:
+                if self._stop.is_set():
+                    return
+                if (tick['e'], tick['tk']) not in subscribed:
+                    continue
+                try:
+                    send({'t': 'tf', **tick})
+                except OSError:
+                    return
+                self.sent += 1
+                if self.interval:
+                    time.sleep(self.interval)
+            self.replayed.set()
+            if not self.loop:
+                return
+
+
+class OrderSim:
+    """
+    Order lifecycle behind the Noren and Breeze stand-ins. Each call first
+    sleeps latency plus an exponential jitter with mean ``jitter``. A
+    placement is refused with probability ``error_rate``; an accepted order
+    is rejected with probability ``reject_rate``, never fills with
+    probability ``unfilled_rate`` (so the client times out and cancels),
+    and otherwise fills ``fill_delay`` seconds after placement. Outcomes
+    are drawn from a seeded generator, so a run is repeatable at a given
+    order count; ``outcomes`` counts them and ``calls`` counts requests.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, reject_rate=0.0, unfilled_rate=0.0,
+                 fill_delay=0.0, fill_price=101.25, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.reject_rate = reject_rate
+        self.unfilled_rate = unfilled_rate
+        self.fill_delay = fill_delay
+        self.fill_price = fill_price
+        self.orders = {}
+        self.outcomes = {}
+        self.calls = {}
+        self.on_fill = None
+        self._rng = random.Random(seed)
+        self._ids = itertools.count(24101800000001)
+        self._lock = threading.Lock()
+
+    def delay(self, call):
+        with self._lock:
+            self.calls[call] = self.calls.get(call, 0) + 1
+            jitter = self._rng.expovariate(1 / self.jitter) if self.jitter else 0.0
+        time.sleep(self.latency + jitter)
+
+    def place(self):
+        """(order_id, None) for an accepted order, (None, reason) for a refused one."""
+        with self._lock:
+            draw = self._rng.random()
+            if draw < self.error_rate:
+                self.outcomes['refused'] = self.outcomes.get('refused', 0) + 1
+                return None, 'RMS:Margin Exceeds, Required Margin exceeds available funds'
+            draw = (draw - self.error_rate) / (1 - self.error_rate)
+            outcome = 'rejected' if draw < self.reject_rate else \
+                'unfilled' if draw < self.reject_rate + self.unfilled_rate else 'filled'
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+            order_id = str(next(self._ids))
+            self.orders[order_id] = (outcome, time.monotonic() + self.fill_delay, False)
+        if outcome != 'unfilled' and self.on_fill is not None:
+            threading.Timer(self.fill_delay if outcome == 'filled' else 0.0, self.on_fill, args=(order_id,)).start()
+        return order_id, None
+
+    def status(self, order_id):
+        """'open', 'filled', 'rejected', 'cancelled' or None for an unknown order."""
+        entry = self.orders.get(order_id)
+        if entry is None:
+            return None
+        outcome, fill_at, cancelled = entry
+        if cancelled:
+            return 'cancelled'
+        if outcome == 'rejected':
+            return 'rejected'
+        if outcome == 'filled' and time.monotonic() >= fill_at:
+            return 'filled'
+        return 'open'
+
+    def cancel(self, order_id):
+        with self._lock:
+            entry = self.orders.get(order_id)
+            if entry is None or self.status(order_id) != 'open':
+                return False
+            self.orders[order_id] = (entry[0], entry[1], True)
+            return True
+
+
+def noren_handlers(sim: OrderSim, feed=None) -> dict:
+    """NorenRestServer routes for placing, tracking, cancelling and quoting orders on sim."""
+    statuses = {'open': 'OPEN', 'filled': 'COMPLETE', 'rejected': 'REJECTED', 'cancelled': 'CANCELED'}
+
+    def update(order_id):
+        row = {'norenordno': order_id, 'status': statuses[sim.status(order_id)]}
+        if row['status'] == 'COMPLETE':
+            row.update(avgprc=str(sim.fill_price), flprc=str(sim.fill_price))
+        elif row['status'] == 'REJECTED':
+            row['rejreason'] = 'RED:Order price is out of the price band'
+        return row
+
+    def place(values):
+        sim.delay('PlaceOrder')
+        order_id, error = sim.place()
+        if order_id is None:
+            return {'stat': 'Not_Ok', 'emsg': error}
+        return {'stat': 'Ok', 'norenordno': order_id}
+
+    def history(values):
+        sim.delay('SingleOrdHist')
+        if sim.status(values.get('norenordno')) is None:
+            return {'stat': 'Not_Ok', 'emsg': 'Error Occurred : 5 "no data"'}
+        return [update(values['norenordno'])]
+
+    def cancel(values):
+        sim.delay('CancelOrder')
+        if not sim.cancel(values.get('norenordno')):
+            return {'stat': 'Not_Ok', 'emsg': 'Rejected : ORA:Order not found to cancel'}
+        return {'stat': 'Ok', 'result': values['norenordno']}
+
+    def quotes(values):
+        sim.delay('GetQuotes')
+        return {'stat': 'Ok', 'exch': values.get('exch'), 'token': values.get('token'), 'lp': str(sim.fill_price)}
+
+    if feed is not None:
+        sim.on_fill = lambda order_id: feed.push({'t': 'om', 'reporttype': 'Fill', **update(order_id)})
+    return {'PlaceOrder': place, 'SingleOrdHist': history, 'CancelOrder': cancel, 'GetQuotes': quotes}
+
+
+class BreezeOrders:
+    """
+    In-process stand-in for the BreezeConnect client methods ICICI_Broker
+    calls around an order (place_order, get_order_list, cancel_order,
+    get_quotes), answering in Breeze's {'Success', 'Status', 'Error'} shape.
+    Breeze signs each request against its fixed host, so the client object
+    is replaced rather than the endpoint.
+    """
+    STATUSES = {'open': 'Ordered', 'filled': 'Completed', 'rejected': 'Rejected', 'cancelled': 'Cancelled'}
+
+    def __init__(self, sim: OrderSim):
+        self.sim = sim
+
+    def place_order(self, **order):
+        self.sim.delay('place_order')
+        order_id, error = self.sim.place()
+        if order_id is None:
+            return {'Success': None, 'Status': 500, 'Error': error}
+        return {'Success': {'order_id': order_id, 'message': 'Successfully Placed the order'}, 'Status': 200,
+                'Error': None}
+
+    def get_order_list(self, **kwargs):
+        self.sim.delay('get_order_list')
+        rows = []
+        for order_id in list(self.sim.orders):
+            status = self.STATUSES[self.sim.status(order_id)]
+            row = {'order_id': order_id, 'order_status': status,
+                   'average_price': str(self.sim.fill_price) if status == 'Completed' else '0'}
+            if status == 'Rejected':
+                row['rejection_reason'] = 'Order price is out of the price band'
+            rows.append(row)
+        return {'Success': rows, 'Status': 200, 'Error': None}
+
+    def cancel_order(self, order_id, **kwargs):
+        self.sim.delay('cancel_order')
+        if not self.sim.cancel(order_id):
+            return {'Success': None, 'Status': 500, 'Error': 'Order not found to cancel'}
+        return {'Success': {'order_id': order_id, 'message': 'Successfully cancelled the order'}, 'Status': 200,
+                'Error': None}
+
+    def get_quotes(self, exchange_code, **kwargs):
+        self.sim.delay('get_quotes')
+        return {'Success': [{'exchange_code': exchange_code, 'ltp': self.sim.fill_price}], 'Status': 200,
+                'Error': None}
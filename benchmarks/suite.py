@@ -0,0 +1,225 @@
+# suite.py
+"""
+Benchmark suite for the instrument and order hot paths, on synthetic
+TradeSmart and ICICI masters of each --rows size, with the results saved
+as JSON so runs can be compared.
+
+Each case is timed --repeat times after initialize_data (so the indexes
+built at load are in place, as in production); the JSON keeps every
+sample plus min / median / mean and the per-operation median. With
+--compare, each case is matched by (name, rows) against an earlier
+results file and the run exits 1 when any median is more than
+--threshold times slower.
+
+    python benchmarks/suite.py --rows 100000 1000000 --output results.json
+    python benchmarks/suite.py --rows 100000 --compare results.json
+"""
+import argparse
+import contextlib
+import datetime as dt
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+from bench_batch_legs import EXPIRY_CODES, load_script  # noqa: E402
+from bench_token_details import sample_legs  # noqa: E402
+from common.instrument_schema import ICICI_SCHEMA, TRADESMART_SCHEMA, apply_schema  # noqa: E402
+from common.snapshot import snapshot_path, write_snapshot  # noqa: E402
+from synthetic import icici_master, tradesmart_master  # noqa: E402
+
+sys.path.insert(0, os.path.join(HERE, '..', 'Broker'))
+from normalise import create_normalized_symbols  # noqa: E402
+
+
+def publish(df, tmp, name, schema, snapshot):
+    """Write df as <tmp>/<kind>/<name> and, for the snapshot kind, its typed snapshot beside it."""
+    folder = os.path.join(tmp, 'snapshot' if snapshot else 'csv')
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, name)
+    df.to_csv(path, index=False)
+    if snapshot:
+        write_snapshot(apply_schema(df, schema), snapshot_path(path))
+    return path
+
+
+def expiry_slices(df, keys, n, seed=0):
+    """n frames of one contract line each (every expiry of one strike and side), as filter_by_expiry receives."""
+    groups = list(df.groupby(keys, observed=True, sort=False).indices.values())
+    rng = np.random.default_rng(seed)
+    return [df.iloc[groups[i]] for i in rng.integers(0, len(groups), n)]
+
+
+def tradesmart_cases(tmp, rows, n):
+    module = load_script('Broker')
+    TradeSmart = module.TradeSmart
+    master = tradesmart_master(rows)
+    csv_path = publish(master, tmp, 'combined_instruments.csv', TRADESMART_SCHEMA, snapshot=False)
+    snap_path = publish(master, tmp, 'combined_instruments.csv', TRADESMART_SCHEMA, snapshot=True)
+    client = TradeSmart.__new__(TradeSmart)
+    client.initialize_data(snap_path)
+    df = TradeSmart.exchange_data
+
+    fno_legs = sample_legs(df, n)
+    equities = df[df['Exchange'].isin(['NSE', 'BSE'])].sample(n, random_state=0)
+    equity_legs = list(zip(equities['Exchange'].astype(str), equities['Symbol'].astype(str)))
+    options = df[df['Instrument'].astype(str).str.startswith('OPT')]
+    slices = expiry_slices(options, ['Exchange', 'Symbol', 'StrikePrice', 'OptionType'], n)
+    normalised = os.path.join(tmp, 'normalized_instruments.csv')
+    return [
+        ('tradesmart.load_combined_instruments[csv]', lambda: module.load_combined_instruments(csv_path), 1),
+        ('tradesmart.load_combined_instruments[snapshot]', lambda: module.load_combined_instruments(snap_path), 1),
+        ('tradesmart.get_token_details[fno]', lambda: [TradeSmart.get_token_details(*leg) for leg in fno_legs],
+         len(fno_legs)),
+        ('tradesmart.get_token_details[equity]',
+         lambda: [TradeSmart.get_token_details(*leg) for leg in equity_legs], len(equity_legs)),
+        ('tradesmart.filter_by_expiry',
+         lambda: [TradeSmart.filter_by_expiry(s, EXPIRY_CODES[i % len(EXPIRY_CODES)]) for i, s in enumerate(slices)],
+         len(slices)),
+        ('normalise.create_normalized_symbols', lambda: create_normalized_symbols(csv_path, normalised), 1),
+    ]
+
+
+def icici_cases(tmp, rows, n):
+    module = load_script('ICICI')
+    ICICI_Broker = module.ICICI_Broker
+    master = icici_master(rows)
+    csv_path = publish(master, tmp, 'combined_instrument_data.csv', ICICI_SCHEMA, snapshot=False)
+    snap_path = publish(master, tmp, 'combined_instrument_data.csv', ICICI_SCHEMA, snapshot=True)
+    # Skip __init__: it opens a Breeze session and these paths only need class state.
+    broker = ICICI_Broker.__new__(ICICI_Broker)
+    # The stand-in has no call limit; measure without the broker's default throttle
+    broker.rate_limits = None
+    broker.initialize_data(snap_path)
+    df = ICICI_Broker.instrument_df
+
+    sample = df[df['Series'].isin(['OPTION', 'FUTURE'])].sample(n, random_state=0)
+    legs = [(r.ExAllowed, r.ShortName, r.StrikePrice, r.OptionType == 'PE',
+             'M' if r.Series == 'FUTURE' else EXPIRY_CODES[i % len(EXPIRY_CODES)],
+             'FUTIDX' if r.Series == 'FUTURE' else None)
+            for i, r in enumerate(sample.itertuples())]
+    tokens = df['Token'].sample(n, random_state=1).tolist()
+    slices = expiry_slices(df[df['Series'] == 'OPTION'], ['ExAllowed', 'ShortName', 'StrikePrice', 'OptionType'], n)
+    return [
+        ('icici.load_combined_instruments[csv]', lambda: module.load_combined_instruments(csv_path), 1),
+        ('icici.load_combined_instruments[snapshot]', lambda: module.load_combined_instruments(snap_path), 1),
+        ('icici.get_icici_token_details', lambda: [ICICI_Broker.get_icici_token_details(*leg) for leg in legs],
+         len(legs)),
+        ('icici.filter_csv_by_token', lambda: [broker.filter_csv_by_token(token) for token in tokens], len(tokens)),
+        ('icici.filter_by_expiry',
+         lambda: [ICICI_Broker.filter_by_expiry(s, EXPIRY_CODES[i % len(EXPIRY_CODES)]) for i, s in enumerate(slices)],
+         len(slices)),
+    ]
+
+
+def measure(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def environment(args):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=HERE, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=HERE,
+                                    capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+    return {
+        'timestamp': dt.datetime.now(dt.timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'dirty': dirty,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'repeat': args.repeat,
+        'ops': args.ops,
+    }
+
+
+def run(args):
+    results = []
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            for build in (tradesmart_cases, icici_cases):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    cases = build(tmp, rows, args.ops)
+                for name, fn, ops in cases:
+                    if args.only and not any(pattern in name for pattern in args.only):
+                        continue
+                    samples = measure(fn, args.repeat)
+                    median = statistics.median(samples)
+                    results.append({'name': name, 'rows': rows, 'ops': ops, 'samples': samples,
+                                    'min': min(samples), 'median': median, 'mean': statistics.fmean(samples),
+                                    'median_per_op': median / ops})
+                    print(f"  {rows:>9} rows  {name:<48} {median / ops * 1e3:11.4f} ms/op  "
+                          f"(median of {len(samples)}, {ops} ops)")
+    return results
+
+
+def compare(results, baseline_path, threshold):
+    """Print each case against the baseline; return the names of those slower than threshold."""
+    with open(baseline_path) as f:
+        baseline = {(r['name'], r['rows']): r for r in json.load(f)['results']}
+    regressions = []
+    print(f"against {baseline_path} (regression above {threshold:.2f}x):")
+    for r in results:
+        before = baseline.get((r['name'], r['rows']))
+        if before is None:
+            print(f"  {r['rows']:>9} rows  {r['name']:<48} (new)")
+            continue
+        ratio = r['median_per_op'] / before['median_per_op']
+        flag = 'REGRESSION' if ratio > threshold else ''
+        if flag:
+            regressions.append(f"{r['name']}@{r['rows']}")
+        print(f"  {r['rows']:>9} rows  {r['name']:<48} {before['median_per_op'] * 1e3:11.4f} -> "
+              f"{r['median_per_op'] * 1e3:11.4f} ms/op  {ratio:6.2f}x  {flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--ops', type=int, default=200, help="lookups per per-call case")
+    parser.add_argument('--only', nargs='*', help="run only cases whose name contains one of these")
+    parser.add_argument('--output', help="write the results JSON here")
+    parser.add_argument('--compare', help="results JSON of an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=1.25)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    print(f"suite: rows {args.rows}, {args.repeat} repeats, {args.ops} ops per lookup case")
+    results = run(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment(args), 'results': results}, f, indent=2)
+        print(f"results written to {args.output}")
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
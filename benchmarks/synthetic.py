@@ -0,0 +1,202 @@
+# synthetic.py
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+
+# Underlyings chosen so that no name is a substring of another; the legacy
+# masking path matches TradingSymbol with str.contains and would otherwise
+# mix contracts across underlyings.
+INDEX_UNDERLYINGS = {
+    'NFO': [('NIFTY', 75, 50, 22000)],
+    'BFO': [('SENSEX', 20, 100, 72000), ('BANKEX', 30, 100, 52000)],
+}
+
+
+def _expiries(start: dt.date, weeks: int = 8, months: int = 3):
+    """Weekly Thursday expiries plus the last Thursday of the following months."""
+    first = start + dt.timedelta(days=(3 - start.weekday()) % 7)
+    dates = {first + dt.timedelta(weeks=i) for i in range(weeks)}
+    for m in range(1, months + 1):
+        year, month = divmod(first.month - 1 + m, 12)
+        last = dt.date(first.year + year, month + 1, 1) - dt.timedelta(days=1)
+        dates.add(last - dt.timedelta(days=(last.weekday() - 3) % 7))
+    return sorted(dates)
+
+
+def _option_rows(exchange, symbols, lots, steps, spots, expiries, strikes_per_side, instrument):
+    """Every CE/PE strike around spot for each underlying and expiry, in one pass."""
+    symbols, lots, steps, spots = (np.asarray(a) for a in (symbols, lots, steps, spots))
+    und, exp, offset, opt = (a.ravel() for a in np.meshgrid(
+        np.arange(len(symbols)), np.arange(len(expiries)),
+        np.arange(-strikes_per_side, strikes_per_side + 1), [0, 1], indexing='ij'))
+    strike = spots[und] + steps[und] * offset
+    option_type = np.where(opt == 0, 'CE', 'PE')
+    expiry_str = np.array([e.strftime('%d-%b-%Y').upper() for e in expiries])[exp]
+    expiry_code = np.array([e.strftime('%d%b%y').upper() for e in expiries])[exp]
+    symbol = pd.Series(symbols[und])
+    trading_symbol = symbol + expiry_code + np.where(opt == 0, 'C', 'P') + pd.Series(strike).astype(str)
+    return pd.DataFrame({
+        'Exchange': exchange,
+        'LotSize': lots[und],
+        'Symbol': symbol,
+        'TradingSymbol': trading_symbol,
+        'Expiry': expiry_str,
+        'Instrument': instrument,
+        'OptionType': option_type,
+        'StrikePrice': strike.astype(float),
+        'TickSize': 0.05,
+    })
+
+
+def _future_rows(exchange, symbols, lots, expiries, instrument):
+    monthly = [e for e in expiries if (e + dt.timedelta(days=7)).month != e.month]
+    symbols, lots = np.asarray(symbols), np.asarray(lots)
+    und, exp = (a.ravel() for a in np.meshgrid(np.arange(len(symbols)), np.arange(len(monthly)), indexing='ij'))
+    symbol = pd.Series(symbols[und])
+    return pd.DataFrame({
+        'Exchange': exchange,
+        'LotSize': lots[und],
+        'Symbol': symbol,
+        'TradingSymbol': symbol + np.array([e.strftime('%d%b%y').upper() for e in monthly])[exp] + 'F',
+        'Expiry': np.array([e.strftime('%d-%b-%Y').upper() for e in monthly])[exp],
+        'Instrument': instrument,
+        'OptionType': 'XX',
+        'StrikePrice': -1.0,
+        'TickSize': 0.05,
+    })
+
+
+def tradesmart_master(rows: int = 200_000, seed: int = 0, start: dt.date = dt.date(2025, 4, 1)) -> pd.DataFrame:
+    """
+    Build a frame shaped like combined_instruments.csv (the seven TradeSmart
+    *_symbols.txt files concatenated) with roughly ``rows`` rows.
+    """
+    rng = np.random.default_rng(seed)
+    expiries = _expiries(start)
+    frames = []
+    for exchange, underlyings in INDEX_UNDERLYINGS.items():
+        symbols, lots, steps, spots = zip(*underlyings)
+        frames.append(_option_rows(exchange, symbols, lots, steps, spots, expiries, 40, 'OPTIDX'))
+        frames.append(_future_rows(exchange, symbols, lots, expiries, 'FUTIDX'))
+
+    monthly = [e for e in expiries if (e + dt.timedelta(days=7)).month != e.month]
+    per_stock = len(monthly) * (2 * 10 + 1) * 2 + len(monthly) + 2
+    built = sum(len(f) for f in frames)
+    n_stocks = max(1, (rows - built) // per_stock)
+    symbols = np.array([f"STK{i:05d}" for i in range(n_stocks)])
+    lots = rng.integers(1, 40, n_stocks) * 25
+    spots = rng.integers(10, 400, n_stocks) * 10
+    frames.append(_option_rows('NFO', symbols, lots, np.full(n_stocks, 10), spots, monthly, 10, 'OPTSTK'))
+    frames.append(_future_rows('NFO', symbols, lots, monthly, 'FUTSTK'))
+    for exchange, suffix in (('NSE', '-EQ'), ('BSE', '')):
+        frames.append(pd.DataFrame({
+            'Exchange': exchange,
+            'LotSize': 1,
+            'Symbol': symbols,
+            'TradingSymbol': pd.Series(symbols) + suffix,
+            'Expiry': np.nan,
+            'Instrument': 'EQ',
+            'OptionType': 'XX',
+            'StrikePrice': -1.0,
+            'TickSize': 0.05,
+        }))
+
+    df = pd.concat(frames, ignore_index=True)
+    df.insert(1, 'Token', np.arange(10_000, 10_000 + len(df)))
+    # Some exchange files name the column Strike; after the concat it is
+    # present and empty for the rest.
+    df['Strike'] = np.nan
+    return df
+
+
+ICICI_INDEX_UNDERLYINGS = {
+    'NFO': [('NIFTY', 'NIFTY 50', 75, 50, 22000), ('CNXBAN', 'NIFTY BANK', 30, 100, 48000)],
+    'BFO': [('BSESEN', 'SENSEX', 20, 100, 72000)],
+}
+
+
+def icici_master(rows: int = 200_000, seed: int = 0, start: dt.date = dt.date(2025, 4, 1)) -> pd.DataFrame:
+    """
+    Build a frame shaped like combined_instrument_data.csv as written by
+    ICICIDataProcessor (SecurityMaster TXT files, columns_to_keep, sorted by
+    ExpiryDate) with roughly ``rows`` rows.
+    """
+    rng = np.random.default_rng(seed)
+    expiries = _expiries(start)
+    monthly = [e for e in expiries if (e + dt.timedelta(days=7)).month != e.month]
+
+    def options(exchange, short_names, names, lots, steps, spots, dates, strikes_per_side):
+        frame = _option_rows(exchange, short_names, lots, steps, spots, dates, strikes_per_side, 'OPTION')
+        name = dict(zip(short_names, names))
+        return pd.DataFrame({
+            'ShortName': frame['Symbol'],
+            'Series': 'OPTION',
+            'ExchangeCode': frame['Symbol'],
+            'ExpiryDate': pd.to_datetime(frame['Expiry'], format='%d-%b-%Y').dt.strftime('%Y-%m-%d'),
+            'StrikePrice': frame['StrikePrice'],
+            'OptionType': frame['OptionType'],
+            'ExAllowed': exchange,
+            'LotSize': frame['LotSize'],
+            'Name': frame['Symbol'].map(name),
+        })
+
+    def futures(exchange, short_names, names, lots):
+        und, exp = (a.ravel() for a in np.meshgrid(np.arange(len(short_names)), np.arange(len(monthly)), indexing='ij'))
+        return pd.DataFrame({
+            'ShortName': np.asarray(short_names)[und],
+            'Series': 'FUTURE',
+            'ExchangeCode': np.asarray(short_names)[und],
+            'ExpiryDate': np.array([e.strftime('%Y-%m-%d') for e in monthly])[exp],
+            'StrikePrice': 0.0,
+            'OptionType': 'XX',
+            'ExAllowed': exchange,
+            'LotSize': np.asarray(lots)[und],
+            'Name': np.asarray(names)[und],
+        })
+
+    frames = []
+    for exchange, underlyings in ICICI_INDEX_UNDERLYINGS.items():
+        short_names, names, lots, steps, spots = zip(*underlyings)
+        frames.append(options(exchange, short_names, names, lots, steps, spots, expiries, 40))
+        frames.append(futures(exchange, short_names, names, lots))
+
+    per_stock = len(monthly) * (2 * 10 + 1) * 2 + len(monthly) + 2
+    built = sum(len(f) for f in frames)
+    n_stocks = max(1, (rows - built) // per_stock)
+    short_names = np.array([f"STK{i:05d}" for i in range(n_stocks)])
+    names = np.array([f"STOCK {i:05d} LTD" for i in range(n_stocks)])
+    lots = rng.integers(1, 40, n_stocks) * 25
+    spots = rng.integers(10, 400, n_stocks) * 10
+    frames.append(options('NFO', short_names, names, lots, np.full(n_stocks, 10), spots, monthly, 10))
+    frames.append(futures('NFO', short_names, names, lots))
+    for exchange in ('NSE', 'BSE'):
+        frames.append(pd.DataFrame({
+            'ShortName': short_names,
+            'Series': 'EQ',
+            'ExchangeCode': short_names,
+            'ExpiryDate': np.nan,
+            'StrikePrice': 0.0,
+            'OptionType': np.nan,
+            'ExAllowed': exchange,
+            'LotSize': 1,
+            'Name': names,
+        }))
+
+    df = pd.concat(frames, ignore_index=True)
+    df.insert(0, 'Token', rng.permutation(len(df)) + 1_000)
+    df['ExpiryDate'] = pd.to_datetime(df['ExpiryDate'], errors='coerce')
+    return df.sort_values(by='ExpiryDate', ascending=True).reset_index(drop=True)
+
+
+def record_ticks(rows, n, seed=0):
+    """A random walk per position, interleaved, in Noren touchline form."""
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(rows), n)
+    steps = rng.normal(0, 0.5, n)
+    last = {i: 100.0 + i for i in range(len(rows))}
+    ticks = []
+    for i, step in zip(picks, steps):
+        last[i] = max(0.05, round(last[i] + step, 2))
+        ticks.append({'e': rows['Exchange'].iloc[i], 'tk': str(rows['Token'].iloc[i]), 'lp': f"{last[i]:.2f}"})
+    return ticks
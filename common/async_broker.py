@@ -0,0 +1,131 @@
+# async_broker.py
+"""
+Asyncio facade over the synchronous broker clients.
+
+The SDK calls of TradeSmart (NorenApi) and ICICI_Broker (BreezeConnect)
+block, so each call runs on a thread pool shared by every instance of the
+same broker class, sized by that class's ``async_workers``. Per broker class
+at most ``async_max_pending`` calls are queued or running at once; further
+callers wait on the event loop, which stays free to serve everything else.
+The lanes assume a single event loop per process.
+
+A live order only holds a lane worker while it is sent and while its
+result is put together: the wait for its fill (up to the broker's
+order_timeout, when it has one) is awaited on the event loop, on the broker's order stream
+or poller future, so orders waiting on fills are not capped by the
+worker count.
+"""
+import asyncio
+import functools
+import inspect
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_WORKERS = 8
+
+_lanes = {}
+_lanes_lock = threading.Lock()
+
+
+class BrokerLane:
+    """Thread pool, admission semaphore and counters shared by one broker class."""
+
+    def __init__(self, broker_cls):
+        self.workers = getattr(broker_cls, 'async_workers', DEFAULT_WORKERS)
+        self.max_pending = getattr(broker_cls, 'async_max_pending', 4 * self.workers)
+        self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"{broker_cls.__name__}-io")
+        self.stats = {'calls': 0, 'in_flight': 0, 'waiting': 0, 'max_waiting': 0, 'settling': 0, 'max_settling': 0}
+        self._slots = None
+
+    async def run(self, fn, *args, **kwargs):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        stats = self.stats
+        stats['waiting'] += 1
+        stats['max_waiting'] = max(stats['max_waiting'], stats['waiting'])
+        async with self._slots:
+            stats['waiting'] -= 1
+            stats['in_flight'] += 1
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self.pool, functools.partial(fn, *args, **kwargs))
+            finally:
+                stats['in_flight'] -= 1
+                stats['calls'] += 1
+
+
+def broker_lane(broker_cls) -> BrokerLane:
+    with _lanes_lock:
+        lane = _lanes.get(broker_cls)
+        if lane is None:
+            lane = _lanes[broker_cls] = BrokerLane(broker_cls)
+        return lane
+
+
+class AsyncBroker:
+    """
+    Awaitable versions of the broker entry points for one client, e.g.
+    ``await AsyncBroker(ts).get_ltp('NSE', 'SBIN-EQ')``.
+    """
+
+    def __init__(self, broker):
+        self.broker = broker
+        self.lane = broker_lane(type(broker))
+
+    async def call(self, method, *args, **kwargs):
+        """Run broker.<method>(*args, **kwargs) on the broker's lane."""
+        return await self.lane.run(getattr(self.broker, method), *args, **kwargs)
+
+    async def place_order_on_broker(self, *args, **kwargs):
+        """
+        broker.place_order_on_broker, with the live order sent on the lane
+        (begin_order), its fill awaited here (order_future, order_timeout)
+        and the result built on the lane again (end_order). Paper orders
+        run whole on the lane.
+        """
+        broker = self.broker
+        arguments = inspect.signature(broker.place_order_on_broker).bind(*args, **kwargs)
+        arguments.apply_defaults()
+        arguments = dict(arguments.arguments)
+        if arguments.pop('is_paper') or not hasattr(broker, 'begin_order'):
+            return await self.call('place_order_on_broker', *args, **kwargs)
+        try:
+            order_id, context, error = await self.lane.run(broker.begin_order, **arguments)
+            if error:
+                return None, None, error
+            update = await self.settle(order_id)
+            return await self.lane.run(broker.end_order, order_id, context, update)
+        except Exception as e:
+            logging.error("Order placement failed: %s", e)
+            return None, None, str(e)
+
+    async def settle(self, order_id):
+        """
+        The terminal update of order_id, or None when order_timeout passes
+        first; with order_timeout None, order_future bounds the wait itself.
+        """
+        stats = self.lane.stats
+        stats['settling'] += 1
+        stats['max_settling'] = max(stats['max_settling'], stats['settling'])
+        try:
+            future = asyncio.wrap_future(self.broker.order_future(order_id))
+            return await asyncio.wait_for(future, self.broker.order_timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            stats['settling'] -= 1
+
+    async def get_ltp(self, *args, **kwargs):
+        return await self.call('get_ltp', *args, **kwargs)
+
+    async def cancel_order_on_broker(self, order_id):
+        return await self.call('cancel_order_on_broker', order_id)
+
+    async def get_funds(self):
+        """ICICI_Broker.get_funds, or TradeSmart.get_funds_available."""
+        method = 'get_funds' if hasattr(self.broker, 'get_funds') else 'get_funds_available'
+        return await self.call(method)
+
+    async def get_funds_available(self):
+        return await self.get_funds()
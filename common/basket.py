@@ -0,0 +1,124 @@
+# basket.py
+"""
+Concurrent submission of basket (multi-leg) orders.
+
+Every leg is submitted and settled on its own thread, so the legs of a
+basket reach the exchange together instead of one status wait apart.
+Each broker splits its place_order_on_broker into the three calls
+run_basket takes:
+
+    submit(leg)                -> (order_id, context, error)       sends the order
+    settle(order_id, context)  -> (order_id, order_params, error)  waits for the fill
+    cancel(order_id)                                                cancels a working order
+
+With all_or_none, the first leg to be refused or rejected aborts the
+basket: legs not yet submitted are not sent and working legs are
+cancelled. A leg that filled before its cancel arrived stays filled and is
+returned as such; unwinding it is left to the caller.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Fields a basket leg may set, by broker; a tuple leg gives them in this order
+TRADESMART_ORDER_FIELDS = ('symbol', 'qty', 'exchange', 'buy_sell', 'order_type', 'price', 'is_overnight')
+ICICI_ORDER_FIELDS = ('symbol_token', 'symbol', 'qty', 'exchange_code', 'buy_sell', 'order_type', 'price',
+                      'is_overnight')
+
+
+def order_kwargs(leg, fields) -> dict:
+    """
+    Normalise a basket leg given as a dict of place_order_on_broker keyword
+    arguments or as a tuple in its positional order; is_overnight is
+    optional, everything else is required.
+    """
+    kwargs = dict(leg) if isinstance(leg, dict) else dict(zip(fields, leg))
+    kwargs.setdefault('is_overnight', False)
+    unknown = [field for field in kwargs if field not in fields]
+    if unknown:
+        raise ValueError(f"Leg {leg!r} has unknown field(s) {', '.join(unknown)}")
+    missing = [field for field in fields if field not in kwargs]
+    if missing:
+        raise ValueError(f"Leg {leg!r} is missing {', '.join(missing)}")
+    return kwargs
+
+
+class _Basket:
+    def __init__(self, cancel, all_or_none):
+        self.cancel = cancel
+        self.all_or_none = all_or_none
+        self.abort_reason = None
+        # Submitted legs not settled yet: index -> order_id
+        self.working = {}
+        self.lock = threading.Lock()
+
+    def submitted(self, i, order_id) -> bool:
+        """Record a working leg; False when the basket aborted meanwhile (the caller cancels it)."""
+        with self.lock:
+            if self.abort_reason is None:
+                self.working[i] = order_id
+                return True
+        return False
+
+    def settled(self, i):
+        with self.lock:
+            self.working.pop(i, None)
+
+    def fail(self, i, error):
+        """Abort an all-or-none basket on its first failed leg and cancel the legs still working."""
+        if not self.all_or_none:
+            return
+        with self.lock:
+            if self.abort_reason is not None:
+                return
+            self.abort_reason = f"leg {i} failed: {error}"
+            working = [(j, order_id) for j, order_id in self.working.items() if j != i]
+        logging.warning("Basket aborted, %s; cancelling %s working leg(s)", self.abort_reason, len(working))
+        for j, order_id in working:
+            self.cancel_leg(j, order_id)
+
+    def cancel_leg(self, i, order_id):
+        try:
+            self.cancel(order_id)
+        except Exception as e:
+            logging.error("Error cancelling basket leg %s (%s): %s", i, order_id, e)
+
+
+def run_basket(legs, submit, settle, cancel, all_or_none=False, workers=None) -> list:
+    """
+    Submit every leg concurrently and wait for all of them. Returns one
+    (order_id, order_params, error) tuple per leg, in leg order, as
+    place_order_on_broker returns for a single order.
+    """
+    basket = _Basket(cancel, all_or_none)
+    results = [None] * len(legs)
+
+    def run(i, leg):
+        if basket.abort_reason is not None:
+            results[i] = (None, None, f"Not placed: basket aborted, {basket.abort_reason}")
+            return
+        try:
+            order_id, context, error = submit(leg)
+        except Exception as e:
+            order_id, context, error = None, None, str(e)
+        if error:
+            results[i] = (None, None, error)
+            basket.fail(i, error)
+            return
+        if not basket.submitted(i, order_id):
+            basket.cancel_leg(i, order_id)
+        try:
+            results[i] = settle(order_id, context)
+        except Exception as e:
+            results[i] = (None, None, str(e))
+        finally:
+            basket.settled(i)
+        if results[i][2]:
+            basket.fail(i, results[i][2])
+
+    if not legs:
+        return results
+    with ThreadPoolExecutor(max_workers=min(workers or len(legs), len(legs)), thread_name_prefix='basket') as pool:
+        for i, leg in enumerate(legs):
+            pool.submit(run, i, leg)
+    return results
@@ -0,0 +1,69 @@
+# expiry_calendar.py
+"""
+Expiry calendars for the W / NW / M / NM / NNM expiry codes.
+
+A calendar holds the sorted distinct expiries of one contract line (for
+example NFO NIFTY options) and the month-end subset of them, with every
+code resolved up front, so a lookup is a dict hit with no date parsing.
+resolve_codes does the same for many contract lines at once.
+"""
+import numpy as np
+import pandas as pd
+
+EXPIRY_CODES = ('W', 'NW', 'M', 'NM', 'NNM')
+# resolve_codes' date for a code that names no expiry
+NO_EXPIRY = np.iinfo(np.int64).min
+
+
+class ExpiryCalendar:
+    def __init__(self, expiries):
+        expiries = np.asarray(expiries, dtype='datetime64[ns]')
+        self.expiries = np.unique(expiries[~np.isnat(expiries)])
+        months = self.expiries.astype('datetime64[M]')
+        # The last expiry of each calendar month is that month's monthly expiry.
+        self.monthly = self.expiries[np.r_[months[1:] != months[:-1], True]] if len(self.expiries) \
+            else self.expiries
+        self._resolved = {}
+        for code, (dates, offset) in {'W': (self.expiries, 0), 'NW': (self.expiries, 1),
+                                      'M': (self.monthly, 0), 'NM': (self.monthly, 1),
+                                      'NNM': (self.monthly, 2)}.items():
+            if offset < len(dates):
+                self._resolved[code] = dates[offset]
+
+    def __repr__(self):
+        return f"ExpiryCalendar({len(self.expiries)} expiries, {len(self.monthly)} monthly)"
+
+    def resolve(self, code):
+        """Return the expiry (datetime64[ns]) for an expiry code, or None."""
+        return self._resolved.get(code)
+
+
+def build_calendars(df: pd.DataFrame, key_columns, expiry_column) -> dict:
+    """One ExpiryCalendar per distinct key_columns tuple, from an already parsed expiry column."""
+    frame = df[list(key_columns) + [expiry_column]].dropna(subset=[expiry_column]).drop_duplicates()
+    calendars = {}
+    for key, group in frame.groupby(list(key_columns), sort=False, observed=True):
+        calendars[key] = ExpiryCalendar(group[expiry_column].to_numpy())
+    return calendars
+
+
+def resolve_codes(lines, expiries) -> np.ndarray:
+    """
+    The dates (int64 ns) the expiry codes name for many contract lines, one
+    row per line and one column per EXPIRY_CODES entry, as ExpiryCalendar
+    resolves them; NO_EXPIRY where a code names none. lines numbers the
+    lines 0..n-1 and expiries holds int64 ns dates, both sorted by line and
+    then expiry with no (line, expiry) pair repeated.
+    """
+    n = int(lines[-1]) + 1 if len(lines) else 0
+    resolved = np.full((n, len(EXPIRY_CODES)), NO_EXPIRY)
+    months = expiries.view('datetime64[ns]').astype('datetime64[M]')
+    month_end = np.r_[(lines[1:] != lines[:-1]) | (months[1:] != months[:-1]), True] if len(lines) \
+        else np.empty(0, dtype=bool)
+    for dates, dates_lines, columns in ((expiries, lines, (0, 1)), (expiries[month_end], lines[month_end], (2, 3, 4))):
+        starts = np.searchsorted(dates_lines, np.arange(n))
+        counts = np.bincount(dates_lines, minlength=n)
+        for offset, column in enumerate(columns):
+            listed = counts > offset
+            resolved[listed, column] = dates[starts[listed] + offset]
+    return resolved
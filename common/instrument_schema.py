@@ -0,0 +1,103 @@
+# instrument_schema.py
+"""
+Load-time schema of the instrument masters.
+
+A schema maps every column the lookups read to its kind; anything else in
+the CSV (TickSize, ExchangeCode, Name, unnamed index columns, ...) is never
+loaded.
+
+    'category'   low-cardinality text, kept as a pandas Categorical
+    'text'       high-cardinality text, left as loaded
+    'int'        int32 when every value fits, int64 otherwise
+    'float'      float64
+    ('date', source, format)
+                 datetime64 parsed once from source (format None infers it)
+
+Both brokers apply their schema before publishing a snapshot, so workers
+attaching to it get the compact dtypes without converting (or copying)
+anything.
+"""
+import numpy as np
+import pandas as pd
+
+TRADESMART_SCHEMA = {
+    'Exchange': 'category',
+    'Token': 'int',
+    'LotSize': 'int',
+    'Symbol': 'category',
+    'TradingSymbol': 'text',
+    'Instrument': 'category',
+    'OptionType': 'category',
+    'StrikePrice': 'float',
+    # Some exchange files name the strike column Strike
+    'Strike': 'float',
+    'expiry': ('date', 'Expiry', '%d-%b-%Y'),
+}
+
+ICICI_SCHEMA = {
+    'Token': 'int',
+    'ShortName': 'category',
+    'Series': 'category',
+    'ExpiryDate': ('date', 'ExpiryDate', None),
+    'StrikePrice': 'float',
+    'OptionType': 'category',
+    'ExAllowed': 'category',
+    'LotSize': 'int',
+}
+
+_INT32 = np.iinfo(np.int32)
+
+
+def source_columns(schema: dict) -> set:
+    """Columns to read from a CSV or snapshot to build the schema's columns."""
+    columns = set(schema)
+    columns.update(kind[1] for kind in schema.values() if isinstance(kind, tuple))
+    return columns
+
+
+def _cast(series: pd.Series, kind) -> pd.Series:
+    if kind == 'category':
+        return series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype('category')
+    if kind == 'float':
+        if pd.api.types.is_float_dtype(series):
+            return series
+        return pd.to_numeric(series, errors='coerce').astype(np.float64)
+    if kind == 'int':
+        if not pd.api.types.is_integer_dtype(series) or series.hasnans:
+            values = pd.to_numeric(series, errors='coerce')
+            if values.isna().sum() != series.isna().sum():
+                return series  # non-numeric values: keep them as loaded rather than lose them
+            if values.isna().any():
+                return values.astype(np.float64)
+            series = values
+        if series.dtype.itemsize > 4 and len(series) and _INT32.min <= series.min() and series.max() <= _INT32.max:
+            return series.astype(np.int32)
+        return series
+    return series
+
+
+def apply_schema(df: pd.DataFrame, schema: dict) -> pd.DataFrame:
+    """
+    The schema's columns of df with their schema dtypes, in schema order;
+    columns df lacks are skipped. Columns already in the right dtype are
+    passed through without a copy.
+    """
+    data = {}
+    for name, kind in schema.items():
+        if isinstance(kind, tuple):
+            _, source, fmt = kind
+            if name in df.columns and pd.api.types.is_datetime64_dtype(df[name]):
+                data[name] = df[name]
+            elif source in df.columns:
+                data[name] = pd.to_datetime(df[source], format=fmt, errors='coerce')
+        elif name in df.columns:
+            data[name] = _cast(df[name], kind)
+    return pd.DataFrame(data, copy=False)
+
+
+def read_csv(path: str, schema: dict) -> pd.DataFrame:
+    """Parse only the schema's columns of an instrument CSV, categoricals straight from the parser."""
+    wanted = source_columns(schema)
+    dtype = {name: 'category' for name, kind in schema.items() if kind == 'category'}
+    df = pd.read_csv(path, usecols=lambda column: column in wanted, dtype=dtype)
+    return apply_schema(df, schema)
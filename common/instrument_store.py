@@ -0,0 +1,55 @@
+# instrument_store.py
+"""
+Read-only instrument master shared by every worker process.
+
+One loader publishes the master with write_snapshot (download.py and
+ICICIDataProcessor already do). Each worker attaches to the live version
+memory-mapped, with text columns as Categoricals over the stored codes, so
+the column data lives once in the page cache instead of once per worker.
+A refreshed master is published as a new version; workers pick it up on
+their next refresh() without a restart, and the frames they already handed
+out stay valid.
+
+Given a schema (common/instrument_schema.py) only its columns are mapped,
+and apply_schema converts any column a snapshot does not already store in
+the schema dtype; snapshots the loaders publish need no conversion.
+"""
+import os
+import threading
+
+import pandas as pd
+
+from common.instrument_schema import apply_schema, source_columns
+from common.snapshot import current_version, read_snapshot
+
+
+class InstrumentStore:
+    def __init__(self, path: str, columns=None, schema: dict = None):
+        self.path = path
+        self.schema = schema
+        self.columns = source_columns(schema) if columns is None and schema is not None else columns
+        self.version = None
+        self.frame: pd.DataFrame = None
+        self._lock = threading.Lock()
+
+    def attach(self) -> pd.DataFrame:
+        """Map the live version (again) and return it as a DataFrame."""
+        with self._lock:
+            version = current_version(self.path)
+            if version is None:
+                raise FileNotFoundError(f"No instrument store at {self.path}")
+            frame = read_snapshot(version, mmap=True, categorical=True, columns=self.columns)
+            self.frame = frame if self.schema is None else apply_schema(frame, self.schema)
+            self.version = os.path.basename(version)
+            return self.frame
+
+    def stale(self) -> bool:
+        version = current_version(self.path)
+        return version is not None and os.path.basename(version) != self.version
+
+    def refresh(self) -> bool:
+        """Attach to a newly published version if there is one; True when the frame changed."""
+        if self.frame is not None and not self.stale():
+            return False
+        self.attach()
+        return True
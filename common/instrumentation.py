@@ -0,0 +1,221 @@
+# instrumentation.py
+"""
+Timing spans, latency histograms and queue-based logging for the broker
+hot paths.
+
+    with span('tradesmart.api.place_order'):
+        ret = self.place_order(...)
+
+or, for a whole function,
+
+    @timed('tradesmart.place_order')
+    def place_order_on_broker(self, ...):
+
+A span adds its duration to the histogram of its name in REGISTRY (and
+counts an error when the block raises). Histograms keep counts in fixed
+log-spaced buckets, so recording is a bisect and an increment under a
+lock; export() and prometheus() give the per-stage latency distributions
+for a status endpoint, a benchmark or a scrape. Setting REGISTRY.enabled
+to False turns every span into a no-op.
+
+configure_logging() replaces logging.basicConfig: records are handed to a
+queue and formatted and written by a listener thread, so a log call on
+the order path never waits on the terminal or a file. Messages below the
+level are dropped before they are formatted. It starts a thread, so entry
+points call it (the scripts' __main__ blocks), not module imports.
+"""
+import atexit
+import bisect
+import functools
+import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+# Bucket upper bounds in seconds: four per doubling (each ~19% above the last) from 1 us
+# to ~134 s, then +Inf
+BUCKETS = tuple(1e-6 * 2 ** (i / 4) for i in range(109)) + (float('inf'),)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.errors = 0
+        self.sum = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, error=False):
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.errors += error
+            self.sum += seconds
+            if seconds < self.min:
+                self.min = seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation, capped at the largest seen; None when empty."""
+        with self._lock:
+            counts, count, largest = list(self.counts), self.count, self.max
+        if not count:
+            return None
+        rank, seen = q * count, 0
+        for bound, n in zip(self.buckets, counts):
+            seen += n
+            if seen >= rank and n:
+                return min(bound, largest)
+        return largest
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts, count, errors, total = list(self.counts), self.count, self.errors, self.sum
+            low, high = self.min, self.max
+        return {
+            'count': count, 'errors': errors, 'sum': total,
+            'mean': total / count if count else None, 'min': low if count else None, 'max': high if count else None,
+            'p50': self.quantile(0.5), 'p95': self.quantile(0.95), 'p99': self.quantile(0.99),
+            'buckets': {bound: n for bound, n in zip(self.buckets, counts) if n},
+        }
+
+
+class _Span:
+    __slots__ = ('registry', 'name', 'start')
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.name, time.perf_counter() - self.start, exc_type is not None)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Registry:
+    def __init__(self):
+        self.enabled = True
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name) -> Histogram:
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, Histogram())
+        return histogram
+
+    def observe(self, name, seconds, error=False):
+        self.histogram(name).observe(seconds, error)
+
+    def span(self, name):
+        return _Span(self, name) if self.enabled else _NO_SPAN
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+
+    def export(self) -> dict:
+        """name -> Histogram.snapshot(), in name order."""
+        return {name: self._histograms[name].snapshot() for name in sorted(self._histograms)}
+
+    def prometheus(self, metric='broker_span_seconds') -> str:
+        """All histograms in the Prometheus text format, one series per span name."""
+        lines = [f"# TYPE {metric} histogram"]
+        for name in sorted(self._histograms):
+            h = self._histograms[name]
+            with h._lock:
+                counts, count, total = list(h.counts), h.count, h.sum
+            cumulative = 0
+            for bound, n in zip(h.buckets, counts):
+                cumulative += n
+                le = '+Inf' if bound == float('inf') else f"{bound:.6g}"
+                lines.append(f'{metric}_bucket{{span="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{span="{name}"}} {total}')
+            lines.append(f'{metric}_count{{span="{name}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def span(name):
+    """Context manager timing its block into REGISTRY under name."""
+    return REGISTRY.span(name)
+
+
+def timed(name):
+    """Decorator timing every call of the function into REGISTRY under name."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with REGISTRY.span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+_listener = None
+
+
+def env_level(default=logging.INFO):
+    """
+    The BROKER_LOG_LEVEL environment variable as a level number: a level
+    name in any case or a number. default when it is unset or not a level.
+    """
+    value = os.environ.get('BROKER_LOG_LEVEL', '').strip()
+    if not value:
+        return default
+    if value.isdigit():
+        return int(value)
+    level = logging.getLevelName(value.upper())
+    return level if isinstance(level, int) else default
+
+
+def configure_logging(level=logging.INFO, fmt="%(asctime)s [%(levelname)s] %(message)s", stream=None):
+    """
+    basicConfig through a queue: the root logger gets a QueueHandler and a
+    listener thread writes to stream (stderr by default). Like basicConfig
+    it does nothing when the root logger already has handlers. The
+    BROKER_LOG_LEVEL environment variable overrides level.
+    """
+    global _listener
+    root = logging.getLogger()
+    if root.handlers:
+        return None
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter(fmt))
+    records = queue.SimpleQueue()
+    root.addHandler(QueueHandler(records))
+    root.setLevel(env_level(level))
+    _listener = QueueListener(records, handler, respect_handler_level=True)
+    _listener.start()
+    # Flush what is queued when the process exits
+    atexit.register(_listener.stop)
+    if os.environ.get('BROKER_LOG_LEVEL', '').strip() and env_level(None) is None:
+        logging.warning("Ignoring BROKER_LOG_LEVEL=%r: not a logging level", os.environ['BROKER_LOG_LEVEL'])
+    return _listener
@@ -0,0 +1,31 @@
+# legs.py
+"""Leg specs accepted by the batch token-resolution APIs of both brokers."""
+
+# Positional order of get_token_details / get_icici_token_details
+LEG_FIELDS = ('exch_seg', 'symbol', 'strike_price', 'is_pe', 'expiry', 'instrumenttype')
+LEG_DEFAULTS = {'strike_price': None, 'is_pe': None, 'expiry': 'W', 'instrumenttype': None}
+
+
+def leg_kwargs(leg) -> dict:
+    """
+    Normalise a leg given either as a dict of get_token_details keyword
+    arguments or as a tuple in its positional order.
+    """
+    if isinstance(leg, dict):
+        kwargs = {**LEG_DEFAULTS, **leg}
+    else:
+        kwargs = {**LEG_DEFAULTS, **dict(zip(LEG_FIELDS, leg))}
+    missing = [field for field in LEG_FIELDS if field not in kwargs]
+    if missing:
+        raise ValueError(f"Leg {leg!r} is missing {', '.join(missing)}")
+    return kwargs
+
+
+def describe_leg(kwargs: dict) -> str:
+    parts = [kwargs['exch_seg'], str(kwargs['symbol'])]
+    if kwargs.get('strike_price') is not None:
+        parts.append(str(kwargs['strike_price']))
+    if kwargs.get('instrumenttype'):
+        parts.append(kwargs['instrumenttype'])
+    parts.append(str(kwargs.get('expiry')))
+    return ' '.join(parts)
@@ -0,0 +1,157 @@
+# option_chain.py
+"""
+Option chains (the full strike ladder of one underlying and expiry) built
+from an instrument master.
+
+Each broker hands OptionChains its option rows normalised to the columns
+
+    exchange, underlying, expiry (datetime64), strike (float),
+    put (bool), token, trading_symbol, lot_size
+
+and asks for a chain by (exchange, underlying, expiry code). Codes resolve
+on the underlying's own expiry calendar, so 'W' is the nearest expiry
+listed for it. A chain is built on first request and cached per expiry
+date, so codes naming the same date share one chain; the cache lives as
+long as the OptionChains, which the brokers rebuild whenever the master
+reloads.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from common.expiry_calendar import ExpiryCalendar
+
+# Token of a strike listed on one side only
+NO_TOKEN = -1
+
+
+class OptionChain:
+    """
+    Strikes ascending with the CE and PE token and trading symbol at each,
+    as parallel NumPy arrays. A strike listed on one side only has
+    NO_TOKEN / None on the other.
+    """
+
+    def __init__(self, exchange, underlying, expiry, strikes, ce_tokens, pe_tokens, ce_symbols, pe_symbols,
+                 lot_size):
+        self.exchange = exchange
+        self.underlying = underlying
+        self.expiry = expiry
+        self.strikes = strikes
+        self.ce_tokens = ce_tokens
+        self.pe_tokens = pe_tokens
+        self.ce_symbols = ce_symbols
+        self.pe_symbols = pe_symbols
+        self.lot_size = lot_size
+
+    def __len__(self):
+        return len(self.strikes)
+
+    def __repr__(self):
+        return (f"OptionChain({self.exchange} {self.underlying} {np.datetime_as_string(self.expiry, unit='D')}, "
+                f"{len(self)} strikes, lot {self.lot_size})")
+
+    def atm_index(self, spot):
+        """Index of the strike nearest spot (the lower one on a tie) by binary search; None when empty."""
+        if not len(self.strikes):
+            return None
+        i = int(np.searchsorted(self.strikes, spot))
+        if i == len(self.strikes) or (i > 0 and spot - self.strikes[i - 1] <= self.strikes[i] - spot):
+            i -= 1
+        return i
+
+    def atm_strike(self, spot):
+        i = self.atm_index(spot)
+        return None if i is None else float(self.strikes[i])
+
+    def window(self, spot, n):
+        """The chain cut to the ATM strike and up to n strikes either side of it; the arrays are views."""
+        i = self.atm_index(spot)
+        if i is None:
+            return self
+        cut = slice(max(i - n, 0), i + n + 1)
+        return OptionChain(self.exchange, self.underlying, self.expiry, self.strikes[cut], self.ce_tokens[cut],
+                           self.pe_tokens[cut], self.ce_symbols[cut], self.pe_symbols[cut], self.lot_size)
+
+    def leg(self, strike, put=False):
+        """(token, trading_symbol, lot_size) at strike, or (None, None, None) when it is not listed."""
+        i = int(np.searchsorted(self.strikes, strike))
+        if i == len(self.strikes) or self.strikes[i] != strike:
+            return None, None, None
+        token = (self.pe_tokens if put else self.ce_tokens)[i]
+        if token == NO_TOKEN:
+            return None, None, None
+        return token, (self.pe_symbols if put else self.ce_symbols)[i], self.lot_size
+
+
+class OptionChains:
+    def __init__(self, rows: pd.DataFrame):
+        rows = rows[rows['expiry'].notna() & rows['strike'].notna()]
+        self.expiry = rows['expiry'].to_numpy('datetime64[ns]')
+        self.strike = rows['strike'].to_numpy(np.float64)
+        self.put = rows['put'].to_numpy(bool)
+        self.token = rows['token'].to_numpy()
+        self.trading_symbol = rows['trading_symbol'].to_numpy(dtype=object)
+        self.lot_size = rows['lot_size'].to_numpy()
+        # (exchange, underlying) -> positions of its option rows, in master order. Grouped on
+        # the columns as loaded (categoricals group on their codes) and upper-cased per key.
+        self._positions = {}
+        for (exchange, underlying), positions in rows.groupby(['exchange', 'underlying'], sort=False,
+                                                              observed=True).indices.items():
+            key = (str(exchange), str(underlying).upper())
+            if key in self._positions:
+                positions = np.sort(np.r_[self._positions[key], positions])
+            self._positions[key] = np.asarray(positions)
+        self._calendars = {}
+        self._chains = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._positions)
+
+    def calendar(self, exchange, underlying):
+        key = (exchange, underlying.upper())
+        calendar = self._calendars.get(key)
+        if calendar is None and key in self._positions:
+            calendar = self._calendars[key] = ExpiryCalendar(self.expiry[self._positions[key]])
+        return calendar
+
+    def chain(self, exchange, underlying, expiry='W'):
+        """The OptionChain for an expiry code ('W', 'NW', 'M', 'NM', 'NNM'), or None when there is none."""
+        calendar = self.calendar(exchange, underlying)
+        expiry_date = calendar.resolve(expiry) if calendar is not None else None
+        if expiry_date is None:
+            return None
+        key = (exchange, underlying.upper(), expiry_date)
+        chain = self._chains.get(key)
+        if chain is None:
+            with self._lock:
+                chain = self._chains.get(key)
+                if chain is None:
+                    chain = self._chains[key] = self._build(*key)
+        return chain
+
+    def _build(self, exchange, underlying, expiry_date):
+        positions = self._positions[(exchange, underlying)]
+        positions = positions[self.expiry[positions] == expiry_date]
+        strike = self.strike[positions]
+        # Strike-ordered, and for a strike listed twice on one side the first row wins
+        order = np.lexsort((positions, strike))
+        positions, strike = positions[order], strike[order]
+        strikes = strike[np.r_[True, strike[1:] != strike[:-1]]]
+
+        sides = []
+        for put in (False, True):
+            side = positions[self.put[positions] == put]
+            side = side[np.r_[True, self.strike[side][1:] != self.strike[side][:-1]]] if len(side) else side
+            at = np.searchsorted(strikes, self.strike[side])
+            tokens = np.full(len(strikes), NO_TOKEN, dtype=np.int64 if self.token.dtype.kind in 'iu' else object)
+            symbols = np.full(len(strikes), None, dtype=object)
+            tokens[at] = self.token[side]
+            symbols[at] = self.trading_symbol[side]
+            sides.append((tokens, symbols))
+        (ce_tokens, ce_symbols), (pe_tokens, pe_symbols) = sides
+        lot_size = self.lot_size[positions[:1]].tolist()[0] if len(positions) else None
+        return OptionChain(exchange, underlying, expiry_date, strikes, ce_tokens, pe_tokens, ce_symbols, pe_symbols,
+                           lot_size)
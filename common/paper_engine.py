@@ -0,0 +1,246 @@
+# paper_engine.py
+"""
+In-process matching engine for paper orders.
+
+Orders are priced from a local price source (the tick feed table, the
+quote cache, recorded ticks pushed through on_price) and never from the
+network. A market order fills at once at the last price plus slippage; a
+limit order that is marketable fills at the last price, otherwise it
+rests and fills at its limit when a later price reaches it. Resting
+limits sit in per-slot heaps, best price first; a cancel only marks the
+order, and a slot's heaps are rebuilt without their cancelled entries
+once those make up half of them.
+
+Each (exchange, token) gets a fixed slot, as in TickFeed, and positions
+are kept per slot in NumPy arrays: net quantity, bought / sold quantity
+and value, last price. Marking the whole book to market is then a few
+array operations:
+
+    pnl = sell_value - buy_value + net_qty * last_price
+"""
+import heapq
+import itertools
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+OPEN, COMPLETE, CANCELLED, REJECTED = 'OPEN', 'COMPLETE', 'CANCELLED', 'REJECTED'
+MARKET_TYPES = {'MARKET', 'MKT'}
+LIMIT_TYPES = {'LIMIT', 'LMT'}
+
+
+class PaperEngine:
+    """
+    price_source(exchange, token) -> price or None is asked first for the
+    price of an order; without one the last price given to on_price is
+    used, if it is younger than max_age seconds (any age when None).
+    slippage is the fraction a market order pays over the last price
+    (buys above it, sells below). on_fill(order_id, price) is called for
+    every fill, including resting limits filled from on_price.
+    """
+
+    def __init__(self, price_source=None, max_age=None, slippage=0.0, on_fill=None, capacity=1024,
+                 clock=time.monotonic):
+        self.price_source = price_source
+        self.max_age = max_age
+        self.slippage = slippage
+        self.on_fill = on_fill
+        self.clock = clock
+        self.slots = {}
+        self.keys = []
+        self.net_qty = np.zeros(capacity, dtype=np.int64)
+        self.buy_qty = np.zeros(capacity, dtype=np.int64)
+        self.sell_qty = np.zeros(capacity, dtype=np.int64)
+        self.buy_value = np.zeros(capacity)
+        self.sell_value = np.zeros(capacity)
+        self.last_price = np.full(capacity, np.nan)
+        self.updated = np.full(capacity, -np.inf)
+        # order_id -> [slot, side (+1 buy / -1 sell), qty, limit or None, status, fill price]
+        self.orders = {}
+        # slot -> ([(-limit, seq, order_id)] resting buys, [(limit, seq, order_id)] resting sells)
+        self._resting = {}
+        # slot -> cancelled orders still in its resting heaps
+        self._cancelled = {}
+        self._seq = itertools.count()
+        self._lock = threading.RLock()
+
+    def slot(self, exchange, token):
+        key = (exchange, str(token))
+        slot = self.slots.get(key)
+        if slot is None:
+            slot = self.slots[key] = len(self.keys)
+            self.keys.append(key)
+            if slot == len(self.net_qty):
+                self._grow()
+        return slot
+
+    def _grow(self):
+        size = 2 * len(self.net_qty)
+        for name, fill in (('net_qty', 0), ('buy_qty', 0), ('sell_qty', 0), ('buy_value', 0.0),
+                           ('sell_value', 0.0), ('last_price', np.nan), ('updated', -np.inf)):
+            old = getattr(self, name)
+            new = np.full(size, fill, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def price(self, exchange, token):
+        """Last price for (exchange, token) from price_source or on_price, or None."""
+        with self._lock:
+            return self._price(self.slot(exchange, token), exchange, token)
+
+    def _price(self, slot, exchange, token):
+        if self.price_source is not None:
+            price = self.price_source(exchange, token)
+            if price is not None and price > 0:
+                self._mark(slot, float(price))
+                return float(price)
+        if self.max_age is not None and self.clock() - self.updated[slot] > self.max_age:
+            return None
+        price = self.last_price[slot]
+        return None if np.isnan(price) else float(price)
+
+    def _mark(self, slot, price):
+        self.last_price[slot] = price
+        self.updated[slot] = self.clock()
+        if slot in self._resting:
+            self._cross(slot, price)
+
+    def on_price(self, exchange, token, price):
+        """A new last price: marks the slot and fills the resting limits it reaches."""
+        with self._lock:
+            self._mark(self.slot(exchange, token), float(price))
+
+    def replay(self, exchanges, tokens, prices):
+        """on_price for each recorded tick, in order."""
+        with self._lock:
+            for exchange, token, price in zip(exchanges, tokens, prices):
+                self._mark(self.slot(exchange, token), float(price))
+
+    def place(self, exchange, token, side, qty, order_type='MARKET', price=0):
+        """
+        Returns (order_id, status, fill_price, error). status is COMPLETE
+        for a fill, OPEN for a resting limit and REJECTED (order_id None)
+        when the order cannot be priced or is not a market or limit order.
+        """
+        buy = str(side).upper().startswith('B')
+        order_type = str(order_type).upper()
+        qty = int(qty)
+        if qty <= 0:
+            return None, REJECTED, None, f"Invalid quantity {qty}"
+        if order_type not in MARKET_TYPES and order_type not in LIMIT_TYPES:
+            return None, REJECTED, None, f"Unsupported paper order type {order_type}"
+        limit = float(price) if order_type in LIMIT_TYPES else None
+        if limit is not None and limit <= 0:
+            return None, REJECTED, None, f"Invalid limit price {price}"
+
+        with self._lock:
+            slot = self.slot(exchange, token)
+            last = self._price(slot, exchange, token)
+            if last is None and limit is None:
+                return None, REJECTED, None, f"No local price for {exchange}:{token}"
+            order_id = 'Paper' + str(uuid.uuid4())
+            order = self.orders[order_id] = [slot, 1 if buy else -1, qty, limit, OPEN, None]
+            if limit is None:
+                fill = last * (1 + self.slippage) if buy else last * (1 - self.slippage)
+            elif last is not None and (last <= limit if buy else last >= limit):
+                fill = last
+            else:
+                buys, sells = self._resting.setdefault(slot, ([], []))
+                if buy:
+                    heapq.heappush(buys, (-limit, next(self._seq), order_id))
+                else:
+                    heapq.heappush(sells, (limit, next(self._seq), order_id))
+                return order_id, OPEN, None, None
+            self._fill(order_id, order, fill)
+        return order_id, COMPLETE, fill, None
+
+    def _fill(self, order_id, order, price):
+        slot, side, qty = order[0], order[1], order[2]
+        if side > 0:
+            self.buy_qty[slot] += qty
+            self.buy_value[slot] += qty * price
+        else:
+            self.sell_qty[slot] += qty
+            self.sell_value[slot] += qty * price
+        self.net_qty[slot] += side * qty
+        order[4], order[5] = COMPLETE, price
+        if self.on_fill is not None:
+            self.on_fill(order_id, price)
+
+    def _cross(self, slot, price):
+        buys, sells = self._resting[slot]
+        while buys and -buys[0][0] >= price:
+            self._fill_resting(slot, heapq.heappop(buys)[2])
+        while sells and sells[0][0] <= price:
+            self._fill_resting(slot, heapq.heappop(sells)[2])
+        if not buys and not sells:
+            del self._resting[slot]
+            self._cancelled.pop(slot, None)
+
+    def _fill_resting(self, slot, order_id):
+        order = self.orders[order_id]
+        if order[4] == OPEN:
+            self._fill(order_id, order, order[3])
+        else:
+            self._cancelled[slot] -= 1
+
+    def _compact(self, slot):
+        """Count a cancelled resting order; rebuild the slot's heaps once half their entries are cancelled."""
+        cancelled = self._cancelled[slot] = self._cancelled.get(slot, 0) + 1
+        buys, sells = self._resting[slot]
+        if 2 * cancelled < len(buys) + len(sells):
+            return
+        for heap in (buys, sells):
+            heap[:] = [entry for entry in heap if self.orders[entry[2]][4] == OPEN]
+            heapq.heapify(heap)
+        del self._cancelled[slot]
+        if not buys and not sells:
+            del self._resting[slot]
+
+    def cancel(self, order_id) -> bool:
+        """Cancel a resting limit; False when it is unknown or no longer open."""
+        with self._lock:
+            order = self.orders.get(order_id)
+            if order is None or order[4] != OPEN:
+                return False
+            order[4] = CANCELLED
+            self._compact(order[0])
+            return True
+
+    def order(self, order_id):
+        """The order as a dict, or None when it is unknown."""
+        with self._lock:
+            order = self.orders.get(order_id)
+            if order is None:
+                return None
+            slot, side, qty, limit, status, fill = order
+            exchange, token = self.keys[slot]
+            return {'order_id': order_id, 'exchange': exchange, 'token': token, 'side': 'B' if side > 0 else 'S',
+                    'qty': qty, 'limit': limit, 'status': status, 'fill_price': fill}
+
+    def pnl(self) -> float:
+        """Realised plus mark-to-market P&L of the whole book; slots never priced count at zero."""
+        with self._lock:
+            n = len(self.keys)
+            marked = np.nan_to_num(self.last_price[:n]) * self.net_qty[:n]
+            return float(np.sum(self.sell_value[:n] - self.buy_value[:n] + marked))
+
+    def positions(self) -> pd.DataFrame:
+        """One row per traded instrument with its quantities, average prices, last price and P&L."""
+        with self._lock:
+            n = len(self.keys)
+            traded = (self.buy_qty[:n] + self.sell_qty[:n]) > 0
+            exchanges, tokens = zip(*self.keys) if n else ((), ())
+            df = pd.DataFrame({
+                'exchange': np.asarray(exchanges, dtype=object), 'token': np.asarray(tokens, dtype=object),
+                'net_qty': self.net_qty[:n], 'buy_qty': self.buy_qty[:n], 'sell_qty': self.sell_qty[:n],
+                'buy_value': self.buy_value[:n], 'sell_value': self.sell_value[:n],
+                'last_price': self.last_price[:n],
+            })[traded]
+        df['avg_buy'] = df['buy_value'] / df['buy_qty']
+        df['avg_sell'] = df['sell_value'] / df['sell_qty']
+        df['pnl'] = df['sell_value'] - df['buy_value'] + df['net_qty'] * df['last_price'].fillna(0)
+        return df.reset_index(drop=True)
@@ -0,0 +1,45 @@
+# quote_cache.py
+"""
+Short-TTL in-process cache of broker quote responses.
+
+Quotes are keyed by (exchange, token). An entry younger than ``ttl`` seconds
+is served without a network call; older entries count as misses and are
+overwritten by the next successful fetch. Only usable responses are stored,
+so a failed quote is retried on the next call.
+"""
+import threading
+import time
+
+
+class QuoteCache:
+    def __init__(self, ttl: float = 1.0, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, exchange, token):
+        """Return the cached quote for (exchange, token) if still fresh, else None."""
+        key = (exchange, str(token))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.clock() - entry[0] < self.ttl:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, exchange, token, quote):
+        with self._lock:
+            self._entries[(exchange, str(token))] = (self.clock(), quote)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
@@ -0,0 +1,173 @@
+# rate_limiter.py
+"""
+Client-side rate limiting of broker API calls, with priorities.
+
+A RateLimiter holds token buckets: one per endpoint listed in its limits
+and, under '*', one every call also draws from (the broker's overall cap,
+e.g. Breeze's calls per minute per API key). A call enters a slot before
+it goes out:
+
+    with limiter.slot('PlaceOrder', ORDER):
+        ret = api.place_order(...)
+
+and waits until every bucket it needs has a token. Waiters are served in
+priority order (ORDER, then STATUS, then QUOTE; first come first served
+within one priority): a waiter that cannot go yet holds back lower
+priority waiters on the buckets it is waiting for, but not those on other
+buckets. Endpoints with no bucket of their own and no '*' bucket pass
+straight through.
+
+reserve keeps tokens back for higher priorities: with {STATUS: 2,
+QUOTE: 4}, a status poll only takes a token while at least two more are
+left in each of its buckets, and a quote while four are, so steady polling
+cannot drain the bucket an order needs next.
+
+Wait times go to the REGISTRY histograms of common/instrumentation.py as
+<name>.wait.<endpoint>; stats() adds per-endpoint call counts and current
+and peak queue depth.
+"""
+import heapq
+import itertools
+import threading
+import time
+
+from common.instrumentation import REGISTRY
+
+# Priorities, highest first
+ORDER, STATUS, QUOTE = 0, 1, 2
+OVERALL = '*'
+
+
+class TokenBucket:
+    """rate tokens a second, holding at most burst; starts full."""
+
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.stamp = clock()
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def ready_in(self, need=1):
+        """Seconds until need tokens are available (after refill)."""
+        return 0.0 if self.tokens >= need else (need - self.tokens) / self.rate
+
+
+class RateLimiter:
+    def __init__(self, limits=None, name='broker', clock=time.monotonic, reserve=None):
+        """
+        limits maps an endpoint, or '*' for every call, to (calls per second,
+        burst); reserve maps a priority to the tokens its calls leave in a
+        bucket for higher priorities.
+        """
+        self.name = name
+        self.clock = clock
+        self.buckets = {endpoint: TokenBucket(rate, burst, clock) for endpoint, (rate, burst) in (limits or {}).items()}
+        self.reserve = dict(reserve or {})
+        for priority, kept in self.reserve.items():
+            for endpoint, bucket in self.buckets.items():
+                if kept + 1 > bucket.burst:
+                    raise ValueError(f"reserve of {kept} for priority {priority} leaves no token in the "
+                                     f"{endpoint!r} bucket (burst {bucket.burst:g})")
+        self.endpoints = {}
+        self._waiting = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def _bucket_keys(self, endpoint):
+        keys = [endpoint] if endpoint in self.buckets else []
+        if OVERALL in self.buckets:
+            keys.append(OVERALL)
+        return tuple(keys)
+
+    def _stats(self, endpoint):
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            stats = self.endpoints[endpoint] = {'calls': 0, 'throttled': 0, 'queued': 0, 'max_queued': 0}
+        return stats
+
+    def acquire(self, endpoint, priority=QUOTE):
+        """Block until the call may go out; returns the seconds waited."""
+        keys = self._bucket_keys(endpoint)
+        with self._cond:
+            stats = self._stats(endpoint)
+            stats['calls'] += 1
+            if not keys:
+                return 0.0
+            start = self.clock()
+            # [priority, seq, bucket keys, granted]
+            waiter = [priority, next(self._seq), keys, False]
+            heapq.heappush(self._waiting, waiter)
+            stats['queued'] += 1
+            stats['max_queued'] = max(stats['max_queued'], stats['queued'])
+            try:
+                wake = self._dispatch()
+                if not waiter[3]:
+                    stats['throttled'] += 1
+                while not waiter[3]:
+                    self._cond.wait(wake)
+                    wake = self._dispatch()
+            finally:
+                stats['queued'] -= 1
+            waited = self.clock() - start
+        REGISTRY.observe(f"{self.name}.wait.{endpoint}", waited)
+        return waited
+
+    def _dispatch(self):
+        """
+        Grant every waiter, in priority order, whose buckets all have a
+        token and are not held by a higher priority waiter; returns the
+        seconds until the next token any blocked waiter needs.
+        """
+        now = self.clock()
+        for bucket in self.buckets.values():
+            bucket.refill(now)
+        held, granted, wake = set(), False, None
+        for waiter in sorted(self._waiting):
+            keys = waiter[2]
+            need = 1 + self.reserve.get(waiter[0], 0)
+            if not held.intersection(keys) and all(self.buckets[key].tokens >= need for key in keys):
+                for key in keys:
+                    self.buckets[key].tokens -= 1
+                waiter[3] = granted = True
+                continue
+            held.update(keys)
+            ready = max(self.buckets[key].ready_in(need) for key in keys)
+            wake = ready if wake is None else min(wake, ready)
+        if granted:
+            self._waiting = [waiter for waiter in self._waiting if not waiter[3]]
+            heapq.heapify(self._waiting)
+            self._cond.notify_all()
+        return wake
+
+    def slot(self, endpoint, priority=QUOTE):
+        """Context manager for one call: waits in acquire on entry."""
+        return _Slot(self, endpoint, priority)
+
+    def stats(self) -> dict:
+        """endpoint -> calls, throttled, queued, max_queued and wait p50 / p95 / p99 / max (seconds)."""
+        with self._cond:
+            endpoints = {endpoint: dict(stats) for endpoint, stats in self.endpoints.items()}
+        for endpoint, stats in endpoints.items():
+            wait = REGISTRY.histogram(f"{self.name}.wait.{endpoint}").snapshot()
+            stats.update(wait_p50=wait['p50'], wait_p95=wait['p95'], wait_p99=wait['p99'], wait_max=wait['max'])
+        return endpoints
+
+
+class _Slot:
+    __slots__ = ('limiter', 'endpoint', 'priority')
+
+    def __init__(self, limiter, endpoint, priority):
+        self.limiter = limiter
+        self.endpoint = endpoint
+        self.priority = priority
+
+    def __enter__(self):
+        self.limiter.acquire(self.endpoint, self.priority)
+        return self
+
+    def __exit__(self, *exc):
+        return False
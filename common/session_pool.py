@@ -0,0 +1,144 @@
+# session_pool.py
+"""
+Authenticated broker sessions, shared per (user, broker).
+
+A live client is reused as is. Without one, a session token persisted by an
+earlier login is restored without any network handshake as long as it has
+not expired; only when neither exists does the pool run the full login
+(TOTP / generate_session), at most ``max_logins`` at a time and once per key
+however many callers ask concurrently. A restore that raises AuthError
+(the token was rejected, or the client cannot adopt it) falls back to that
+login. A call that fails authentication drops the session and is retried
+once on a fresh login.
+"""
+import datetime as dt
+import json
+import os
+import threading
+import time
+
+
+class AuthError(Exception):
+    """A broker rejected the credentials or the session token."""
+
+
+def daily_expiry(hour=0, now=None) -> float:
+    """Epoch seconds of the next local ``hour``:00; broker sessions reset daily."""
+    now = dt.datetime.fromtimestamp(now if now is not None else time.time())
+    expiry = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if expiry <= now:
+        expiry += dt.timedelta(days=1)
+    return expiry.timestamp()
+
+
+class SessionPool:
+    def __init__(self, store_path=None, max_logins=2, clock=time.time):
+        self.store_path = store_path
+        self.clock = clock
+        self.stats = {'hits': 0, 'restores': 0, 'failed_restores': 0, 'logins': 0, 'relogins': 0}
+        self._sessions = {}
+        self._tokens = self._load()
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self._logins = threading.BoundedSemaphore(max_logins)
+
+    # Persistence
+
+    def _load(self) -> dict:
+        if not self.store_path or not os.path.exists(self.store_path):
+            return {}
+        try:
+            with open(self.store_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        if not self.store_path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.store_path)), exist_ok=True)
+        tmp = self.store_path + '.tmp'
+        # Session tokens are credentials: owner-only, swapped in atomically.
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self._tokens, f)
+        os.replace(tmp, self.store_path)
+
+    @staticmethod
+    def _store_key(user_id, broker) -> str:
+        return f"{broker}:{user_id}"
+
+    # Sessions
+
+    def session(self, user_id, broker, login, restore=None):
+        """
+        A live client for (user_id, broker). ``login()`` performs the full
+        handshake and returns (client, token, expires_at); ``restore(token)``
+        rebuilds a client from a persisted token without a handshake, or
+        raises AuthError to have the pool log in instead.
+        """
+        key = (user_id, broker)
+        entry = self._sessions.get(key)
+        if entry is not None and entry[1] > self.clock():
+            self.stats['hits'] += 1
+            return entry[0]
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            entry = self._sessions.get(key)
+            if entry is not None and entry[1] > self.clock():
+                self.stats['hits'] += 1
+                return entry[0]
+
+            saved = self._tokens.get(self._store_key(user_id, broker))
+            if restore is not None and saved and saved['expires_at'] > self.clock():
+                try:
+                    client = restore(saved['token'])
+                except AuthError:
+                    self.stats['failed_restores'] += 1
+                else:
+                    self._sessions[key] = (client, saved['expires_at'])
+                    self.stats['restores'] += 1
+                    return client
+
+            with self._logins:
+                client, token, expires_at = login()
+            self.stats['logins'] += 1
+            self._sessions[key] = (client, expires_at)
+            with self._lock:
+                self._tokens[self._store_key(user_id, broker)] = {'token': token, 'expires_at': expires_at}
+                self._save()
+            return client
+
+    def invalidate(self, user_id, broker, client=None):
+        """
+        Forget the live client and the persisted token of (user_id, broker).
+        Given the failed client, a session another caller already replaced
+        is left alone.
+        """
+        key = (user_id, broker)
+        with self._lock:
+            entry = self._sessions.get(key)
+            if client is not None and entry is not None and entry[0] is not client:
+                return
+            self._sessions.pop(key, None)
+            if self._tokens.pop(self._store_key(user_id, broker), None) is not None:
+                self._save()
+
+    def call(self, user_id, broker, login, restore, fn, is_auth_failure=None):
+        """
+        fn(client) on the pooled session. If it raises AuthError, or
+        is_auth_failure(result, client) is true, the session is dropped and
+        fn runs once more on a fresh login.
+        """
+        client = self.session(user_id, broker, login, restore)
+        try:
+            result = fn(client)
+            if is_auth_failure is None or not is_auth_failure(result, client):
+                return result
+        except AuthError:
+            pass
+        self.invalidate(user_id, broker, client)
+        self.stats['relogins'] += 1
+        return fn(self.session(user_id, broker, login, restore))
@@ -0,0 +1,159 @@
+# snapshot.py
+"""
+Typed columnar snapshot of an instrument master.
+
+A snapshot is a directory next to the CSV (``combined_instruments.snapshot``).
+Each write goes to a new version subdirectory holding one ``.npy`` file per
+column and a ``meta.json``; a ``CURRENT`` file naming the live version is
+then replaced atomically, so readers, including processes that still have an
+older version memory-mapped, never see a half-written master. Numeric and
+datetime64 columns are stored as-is and can be memory-mapped; text columns
+are stored as integer codes (sized the way pandas sizes categorical codes)
+plus a unicode categories array, so nothing is pickled and nothing is
+re-parsed at load time.
+"""
+import json
+import os
+import shutil
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+META_FILE = "meta.json"
+CURRENT_FILE = "CURRENT"
+FORMAT_VERSION = 1
+# Versions kept after a publish, for readers still attached to older ones
+KEEP_VERSIONS = 2
+
+
+def snapshot_path(csv_path: str) -> str:
+    return os.path.splitext(csv_path)[0] + ".snapshot"
+
+
+def _column_file(path, column, suffix=""):
+    return os.path.join(path, f"{column}{suffix}.npy")
+
+
+def _codes_dtype(n_categories):
+    # The dtype pandas.Categorical keeps codes in, so attaching never converts them.
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def current_version(path: str):
+    """Directory of the live version of the snapshot at path, or None if there is none."""
+    try:
+        with open(os.path.join(path, CURRENT_FILE)) as f:
+            return os.path.join(path, f.read().strip())
+    except OSError:
+        # Snapshots written before versioning keep meta.json at the top level.
+        return path if os.path.exists(os.path.join(path, META_FILE)) else None
+
+
+def write_snapshot(df: pd.DataFrame, path: str, parse_dates: dict = None, numeric=()) -> str:
+    """
+    Publish ``df`` as a new version of the snapshot at ``path`` and return
+    the version directory.
+
+    parse_dates maps a target column to (source column, format) and adds it
+    as datetime64; columns listed in numeric are coerced with pd.to_numeric.
+    """
+    df = df.loc[:, ~df.columns.astype(str).str.contains('^unnamed', case=False)].copy()
+    for target, (source, fmt) in (parse_dates or {}).items():
+        if source in df.columns:
+            df[target] = pd.to_datetime(df[source], format=fmt, errors='coerce')
+    for column in numeric:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+
+    if os.path.exists(os.path.join(path, META_FILE)):
+        # Pre-versioning layout: move it aside so the directory can hold versions.
+        old = f"{path}.old-{uuid.uuid4().hex}"
+        os.replace(path, old)
+        shutil.rmtree(old, ignore_errors=True)
+    version = f"v{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+    tmp = os.path.join(path, f".tmp-{version}")
+    os.makedirs(tmp)
+    columns = []
+    for i, column in enumerate(df.columns):
+        series = df[column]
+        # Files are named by position; column names can carry spaces or quotes.
+        name = f"c{i}"
+        if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series) \
+                or pd.api.types.is_datetime64_dtype(series):
+            np.save(_column_file(tmp, name), series.to_numpy())
+            columns.append({'name': column, 'file': name, 'kind': 'array'})
+        else:
+            values = series.astype(object)
+            codes, categories = pd.factorize(values.where(values.isna(), values.astype(str)))
+            np.save(_column_file(tmp, name), codes.astype(_codes_dtype(len(categories))))
+            np.save(_column_file(tmp, name, ".categories"), np.asarray(categories, dtype=str))
+            columns.append({'name': column, 'file': name, 'kind': 'text'})
+
+    with open(os.path.join(tmp, META_FILE), 'w') as f:
+        json.dump({'version': FORMAT_VERSION, 'rows': len(df), 'columns': columns}, f, indent=2)
+
+    os.replace(tmp, os.path.join(path, version))
+    pointer = os.path.join(path, f".{CURRENT_FILE}-{version}")
+    with open(pointer, 'w') as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(path, CURRENT_FILE))
+    _prune(path, version)
+    return os.path.join(path, version)
+
+
+def _prune(path, live):
+    versions = sorted(name for name in os.listdir(path) if name.startswith('v') and name != live)
+    # Unlinking a version another process has mapped is safe on POSIX; elsewhere it is retried next publish.
+    for name in versions[:max(0, len(versions) - (KEEP_VERSIONS - 1))]:
+        shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+
+
+def read_snapshot(path: str, mmap: bool = True, categorical: bool = False, columns=None) -> pd.DataFrame:
+    """
+    Load the live version of a snapshot written by write_snapshot.
+
+    With categorical, text columns come back as pandas Categoricals over the
+    stored codes instead of decoded object arrays; together with mmap no
+    column data is copied into the process, so every process attaching to
+    the same version shares one copy through the page cache. columns limits
+    the load to those names.
+    """
+    version = current_version(path)
+    if version is None:
+        raise FileNotFoundError(f"No snapshot at {path}")
+    path = version
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+    if meta.get('version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {meta.get('version')} in {path}")
+
+    mmap_mode = 'r' if mmap else None
+    data = {}
+    for column in meta['columns']:
+        if columns is not None and column['name'] not in columns:
+            continue
+        values = np.load(_column_file(path, column['file']), mmap_mode=mmap_mode)
+        if column['kind'] == 'text':
+            categories = np.load(_column_file(path, column['file'], ".categories")).astype(object)
+            if categorical:
+                data[column['name']] = pd.Series(
+                    pd.Categorical.from_codes(values, categories=pd.Index(categories), validate=False), copy=False)
+            else:
+                data[column['name']] = np.append(categories, np.nan)[np.asarray(values)]
+        else:
+            data[column['name']] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def is_fresh(csv_path: str) -> bool:
+    """True when a snapshot exists for csv_path and is not older than the CSV."""
+    version = current_version(snapshot_path(csv_path))
+    path = os.path.join(version, META_FILE) if version else None
+    if path is None or not os.path.exists(path):
+        return False
+    return not os.path.exists(csv_path) or os.path.getmtime(path) >= os.path.getmtime(csv_path)
@@ -0,0 +1,157 @@
+# symbol_index.py
+"""
+Ranked partial-match search over the symbols of an instrument master.
+
+Symbols are searched within one group (an exchange), case-insensitively
+and literally (no regex). Candidates are ranked exact match first, then
+symbols starting with the text, then symbols containing it; within each,
+shorter symbols first and then the row that comes first in the master.
+
+Each group is built on its first search. Its distinct symbols are
+numbered in rank order, so any sorted list of ids is already ranked and a
+search stops as soon as it has limit candidates. Prefixes are bisected in
+a name-sorted copy; substrings go through a trigram index (trigram ->
+sorted symbol ids) built with numpy, without a per-symbol loop. Groups
+never searched cost nothing.
+"""
+import bisect
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+class _Group:
+    def __init__(self, symbols: pd.Series, positions: np.ndarray):
+        values = symbols.iloc[positions]
+        keep = values.notna().to_numpy()
+        values, positions = values[keep].to_numpy(dtype=object), positions[keep]
+        # Masters are upper case already; keep those strings rather than copy them
+        upper = pd.Series([s if s == u else u for s, u in zip(values, map(str.upper, values))], dtype=object)
+        first = ~upper.duplicated().to_numpy()
+        upper, positions = upper[first].tolist(), positions[first]
+        lengths = np.fromiter(map(len, upper), dtype=np.int64, count=len(upper))
+        rank = np.lexsort((positions, lengths))
+        self.names = [upper[i] for i in rank]
+        self.positions = positions[rank]
+        by_name = sorted(range(len(self.names)), key=self.names.__getitem__)
+        self.sorted_names = [self.names[i] for i in by_name]
+        self.by_name = np.array(by_name, dtype=np.int64)
+        self._trigrams = None
+        self._lock = threading.Lock()
+
+    def trigrams(self):
+        with self._lock:
+            if self._trigrams is None:
+                self._trigrams = _build_trigrams(self.names)
+        return self._trigrams
+
+    def prefixed(self, text, limit):
+        """Ranked ids of the symbols starting with text."""
+        lo = bisect.bisect_left(self.sorted_names, text)
+        hi = bisect.bisect_left(self.sorted_names, text + '\U0010ffff', lo)
+        ids = self.by_name[lo:hi]
+        if limit is not None and len(ids) > limit:
+            ids = np.partition(ids, limit - 1)[:limit]
+        return np.sort(ids).tolist()
+
+    def containing(self, text, limit):
+        """Ranked ids of the symbols containing text other than at the start."""
+        candidates = range(len(self.names)) if len(text) < 3 else _candidates(self.trigrams(), text)
+        names, found = self.names, []
+        for i in candidates:
+            if names[i].find(text) > 0:
+                found.append(i)
+                if len(found) == limit:
+                    break
+        return found
+
+
+def _build_trigrams(names):
+    """(alphabet, gram keys, offsets, postings) over every trigram of names."""
+    empty = np.zeros(0, dtype=np.int64)
+    if not names:
+        return empty, empty, np.zeros(1, dtype=np.int64), empty
+    padded = np.array(names, dtype=str)
+    width = padded.dtype.itemsize // 4
+    chars = padded.view(np.uint32).reshape(len(names), width)
+    # Characters renumbered 1..k-1 over those that occur, so a trigram fits in k**3
+    present = np.bincount(chars.ravel()) > 0
+    present[0] = False
+    alphabet = np.cumsum(present) * present
+    if width < 3:
+        return alphabet, empty, np.zeros(1, dtype=np.int64), empty
+    k = int(alphabet.max()) + 1
+    ids = alphabet[chars].astype(np.int64)
+    grams = (ids[:, :-2] * k + ids[:, 1:-1]) * k + ids[:, 2:]
+    valid = chars[:, 2:] != 0
+    rows = np.broadcast_to(np.arange(len(names), dtype=np.int64)[:, None], valid.shape)[valid]
+    # One key per (trigram, symbol) pair; sorting groups them by trigram with ids ascending
+    keys = np.sort(grams[valid] * len(names) + rows)
+    keys = keys[np.r_[True, keys[1:] != keys[:-1]]]
+    gram_of, postings = np.divmod(keys, len(names))
+    starts = np.flatnonzero(np.r_[True, gram_of[1:] != gram_of[:-1]])
+    return alphabet, gram_of[starts], np.r_[starts, len(keys)], postings.astype(np.int32)
+
+
+def _candidates(trigrams, text, chunk=4096):
+    """
+    Ids of the symbols holding every trigram of text (a superset of those
+    containing it), ascending, a chunk at a time so a search that fills
+    its limit early never intersects the rest of the postings.
+    """
+    alphabet, gram_keys, offsets, postings = trigrams
+    chars = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    if (chars >= len(alphabet)).any():
+        return
+    ids = alphabet[chars].astype(np.int64)
+    if not ids.all():
+        return
+    k = int(alphabet.max()) + 1
+    lists = []
+    for gram in set(((ids[:-2] * k + ids[1:-1]) * k + ids[2:]).tolist()):
+        at = np.searchsorted(gram_keys, gram)
+        if at == len(gram_keys) or gram_keys[at] != gram:
+            return
+        lists.append(postings[offsets[at]:offsets[at + 1]])
+    lists.sort(key=len)
+    for start in range(0, len(lists[0]), chunk):
+        result = lists[0][start:start + chunk]
+        for other in lists[1:]:
+            result = result[other.take(np.searchsorted(other, result), mode='clip') == result]
+        yield from result.tolist()
+
+
+class SymbolIndex:
+    def __init__(self, symbols: pd.Series, groups: pd.Series):
+        self.symbols = symbols
+        self.groups = groups
+        self._built = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"SymbolIndex({len(self.symbols)} rows, {len(self._built)} groups built)"
+
+    def group(self, group):
+        built = self._built.get(group)
+        if built is None:
+            with self._lock:
+                built = self._built.get(group)
+                if built is None:
+                    positions = np.flatnonzero((self.groups == group).to_numpy())
+                    built = self._built[group] = _Group(self.symbols, positions)
+        return built
+
+    def search(self, group, text, limit=10):
+        """
+        Up to limit (symbol, row position) candidates for text in group,
+        best first; limit None returns every match.
+        """
+        text = str(text).upper()
+        if not text:
+            return []
+        built = self.group(group)
+        ids = built.prefixed(text, limit)
+        if limit is None or len(ids) < limit:
+            ids += built.containing(text, None if limit is None else limit - len(ids))
+        return [(built.names[i], int(built.positions[i])) for i in ids]
@@ -0,0 +1,37 @@
+# conftest.py
+"""
+The Broker modules import their siblings by bare name and the stand-ins
+and synthetic masters live with the benchmarks, so both directories go on
+the path, after the repository root for the common package. ICICI goes
+last: its login and script modules share names with Broker's.
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+for folder in ('', 'Broker', 'benchmarks'):
+    path = os.path.abspath(os.path.join(ROOT, folder))
+    if path not in sys.path:
+        sys.path.insert(0, path)
+ICICI = os.path.abspath(os.path.join(ROOT, 'ICICI'))
+if ICICI not in sys.path:
+    sys.path.append(ICICI)
+
+
+@pytest.fixture(scope='session')
+def load_broker(tmp_path_factory):
+    """load_script(folder) (benchmarks/bench_batch_legs.py) from a scratch working directory."""
+    from bench_batch_legs import load_script
+
+    def load(folder):
+        # Broker/script.py creates its data folder in the working directory on import
+        cwd = os.getcwd()
+        os.chdir(tmp_path_factory.mktemp(folder))
+        try:
+            return load_script(folder)
+        finally:
+            os.chdir(cwd)
+
+    return load
@@ -0,0 +1,77 @@
+# test_async_broker.py
+import asyncio
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+
+from common.async_broker import AsyncBroker
+
+
+class FillingBroker:
+    """Orders are accepted at once and fill fill_delay later; order_future resolves on the fill."""
+    async_workers = 2
+    order_timeout = 1.0
+
+    def __init__(self, fill_delay=0.2, fills=True):
+        self.fill_delay = fill_delay
+        self.fills = fills
+        self.cancelled = []
+        self._ids = itertools.count(1)
+        self._futures = {}
+
+    def place_order_on_broker(self, symbol, qty, is_paper=False):
+        return 'paper', {'symbol': symbol}, None
+
+    def begin_order(self, symbol, qty):
+        order_id = str(next(self._ids))
+        future = self._futures[order_id] = Future()
+        if self.fills:
+            threading.Timer(self.fill_delay, future.set_result, args=({'status': 'COMPLETE'},)).start()
+        return order_id, {'symbol': symbol, 'qty': qty}, None
+
+    def order_future(self, order_id):
+        return self._futures[order_id]
+
+    def end_order(self, order_id, context, update):
+        if update is None:
+            self.cancelled.append(order_id)
+            return None, None, "Order was canceled due to timeout."
+        return order_id, context, None
+
+
+def test_fill_waits_do_not_hold_lane_workers():
+    class Broker(FillingBroker):
+        pass
+
+    facade = AsyncBroker(Broker())
+
+    async def run():
+        return await asyncio.gather(*(facade.place_order_on_broker('SBIN-EQ', i) for i in range(40)))
+
+    start = time.perf_counter()
+    results = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+    assert all(error is None for _, _, error in results)
+    # Two workers holding each 0.2 s fill would take 4 s
+    assert elapsed < 1.5
+    assert facade.lane.stats['max_settling'] > facade.lane.workers
+
+
+def test_timeout_ends_the_order_unfilled():
+    class Broker(FillingBroker):
+        order_timeout = 0.05
+
+    broker = Broker(fills=False)
+    result = asyncio.run(AsyncBroker(broker).place_order_on_broker('SBIN-EQ', 1))
+    assert result == (None, None, "Order was canceled due to timeout.")
+    assert broker.cancelled == ['1']
+    assert broker.order_future('1').cancelled()
+
+
+def test_paper_orders_run_whole():
+    class Broker(FillingBroker):
+        pass
+
+    result = asyncio.run(AsyncBroker(Broker()).place_order_on_broker('SBIN-EQ', 1, is_paper=True))
+    assert result == ('paper', {'symbol': 'SBIN-EQ'}, None)
@@ -0,0 +1,96 @@
+# test_basket.py
+import time
+
+from common.basket import run_basket
+from standins import BreezeOrders, OrderSim
+
+
+class Exchange:
+    """
+    run_basket's submit, settle and cancel over the Breeze stand-in. A leg
+    is (outcome, delay): 'refused' is turned away at submit, otherwise the
+    order is forced to 'filled', 'rejected' or 'unfilled'. A filled leg
+    fills delay seconds after placement; a refused or rejected one gets
+    its answer after delay.
+    """
+
+    def __init__(self, timeout=2.0):
+        self.sim = OrderSim()
+        self.client = BreezeOrders(self.sim)
+        self.timeout = timeout
+        self.cancelled = []
+        self.settled = []
+
+    def submit(self, leg):
+        outcome, delay = leg
+        if outcome in ('refused', 'rejected'):
+            time.sleep(delay)
+        if outcome == 'refused':
+            return None, None, "RMS:Margin Exceeds"
+        order_id = self.client.place_order()['Success']['order_id']
+        self.sim.orders[order_id] = (outcome, time.monotonic() + delay, False)
+        return order_id, leg, None
+
+    def settle(self, order_id, leg):
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            status = self.sim.status(order_id)
+            if status == 'filled':
+                self.settled.append(order_id)
+                return order_id, leg, None
+            if status in ('rejected', 'cancelled'):
+                return None, None, f"Order {order_id} {status}"
+            time.sleep(0.005)
+        return None, None, "Order was canceled due to timeout."
+
+    def cancel(self, order_id):
+        self.cancelled.append(order_id)
+        self.client.cancel_order(order_id)
+
+
+def test_results_are_in_leg_order():
+    exchange = Exchange()
+    # The last leg fills first
+    legs = [('filled', 0.15), ('filled', 0.1), ('filled', 0.0)]
+    results = run_basket(legs, exchange.submit, exchange.settle, exchange.cancel)
+    assert [params for _, params, _ in results] == legs
+    assert all(error is None for _, _, error in results)
+    assert exchange.settled == [order_id for order_id, _, _ in reversed(results)]
+
+
+def test_rejected_leg_cancels_the_working_legs():
+    exchange = Exchange()
+    # The rejection arrives once the other two legs are working
+    legs = [('filled', 1.0), ('unfilled', 0.0), ('rejected', 0.1)]
+    results = run_basket(legs, exchange.submit, exchange.settle, exchange.cancel, all_or_none=True)
+    assert results[2][2].endswith('rejected')
+    assert len(exchange.cancelled) == 2
+    assert {exchange.sim.status(order_id) for order_id in exchange.cancelled} == {'cancelled'}
+    assert all(order_id is None and 'cancelled' in error for order_id, _, error in results[:2])
+
+
+def test_refused_leg_stops_the_legs_not_yet_sent():
+    exchange = Exchange()
+    legs = [('refused', 0.0), ('filled', 0.0), ('filled', 0.0)]
+    results = run_basket(legs, exchange.submit, exchange.settle, exchange.cancel, all_or_none=True, workers=1)
+    assert results[0] == (None, None, "RMS:Margin Exceeds")
+    assert all(error.startswith("Not placed: basket aborted, leg 0 failed") for _, _, error in results[1:])
+    assert exchange.sim.orders == {} and exchange.cancelled == []
+
+
+def test_leg_filled_before_the_abort_stays_filled():
+    exchange = Exchange()
+    legs = [('filled', 0.0), ('rejected', 0.0)]
+    # The filled leg settles before the rejected one is even sent
+    results = run_basket(legs, exchange.submit, exchange.settle, exchange.cancel, all_or_none=True, workers=1)
+    assert results[0][2] is None and exchange.sim.status(results[0][0]) == 'filled'
+    assert results[1][2].endswith('rejected')
+    assert exchange.cancelled == []
+
+
+def test_without_all_or_none_other_legs_are_left_working():
+    exchange = Exchange()
+    legs = [('filled', 0.1), ('rejected', 0.0)]
+    results = run_basket(legs, exchange.submit, exchange.settle, exchange.cancel)
+    assert results[0][2] is None and results[1][2].endswith('rejected')
+    assert exchange.cancelled == []
@@ -0,0 +1,73 @@
+# test_breeze_session.py
+"""
+restore_breeze_session sets BreezeConnect internals directly. These tests
+read the installed SDK's source, without importing it (its import goes to
+the network), and fail when the attributes generate_session sets or the
+ApificationBreeze constructor change shape.
+"""
+import ast
+import importlib.util
+import os
+
+import pytest
+
+import breeze_session
+from breeze_session import BREEZE_RESTORE_VERSIONS, RESTORED_ATTRIBUTES, restore_breeze_session
+
+
+def sdk_classes() -> dict:
+    spec = importlib.util.find_spec('breeze_connect')
+    if spec is None or spec.origin is None:
+        pytest.skip("breeze_connect is not installed")
+    path = os.path.join(os.path.dirname(spec.origin), 'breeze_connect.py')
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    return {node.name: node for node in tree.body if isinstance(node, ast.ClassDef)}
+
+
+def method(cls, name):
+    return next(node for node in cls.body if isinstance(node, ast.FunctionDef) and node.name == name)
+
+
+def assigned(function) -> dict:
+    """self.<attribute> -> the source of the value assigned to it in function."""
+    return {target.attr: ast.unparse(node.value)
+            for node in ast.walk(function) if isinstance(node, ast.Assign)
+            for target in node.targets
+            if isinstance(target, ast.Attribute) and ast.unparse(target.value) == 'self'}
+
+
+def test_installed_release_is_one_restore_knows():
+    sdk_classes()
+    assert breeze_session.breeze_version().startswith(BREEZE_RESTORE_VERSIONS)
+
+
+def test_generate_session_sets_what_restore_sets():
+    breeze = sdk_classes()['BreezeConnect']
+    assert set(RESTORED_ATTRIBUTES) <= set(assigned(method(breeze, '__init__')))
+    session = assigned(method(breeze, 'generate_session'))
+    assert session['session_key'] == 'session_token'
+    assert session['secret_key'] == 'api_secret'
+    assert session['api_handler'] == 'ApificationBreeze(self)'
+    assert {'user_id', 'session_key'} <= set(assigned(method(breeze, 'api_util')))
+
+
+def test_apification_reads_only_the_restored_session():
+    init = method(sdk_classes()['ApificationBreeze'], '__init__')
+    assert [arg.arg for arg in init.args.args] == ['self', 'breeze_instance']
+    read = {node.attr for node in ast.walk(init)
+            if isinstance(node, ast.Attribute) and ast.unparse(node.value) == 'self.breeze'}
+    assert read <= set(RESTORED_ATTRIBUTES)
+    assert {'user_id', 'session_key'} <= read
+
+
+@pytest.mark.parametrize('version', ['2.0.0', None])
+def test_unknown_release_is_not_restored(monkeypatch, version):
+    monkeypatch.setattr(breeze_session, 'breeze_version', lambda: version)
+
+    class Client:
+        session_key = None
+
+    client = Client()
+    assert restore_breeze_session(client, 'u1', 'key', 'secret') is False
+    assert client.session_key is None
@@ -0,0 +1,57 @@
+# test_download.py
+import io
+import zipfile
+
+import pandas as pd
+import pytest
+
+from bench_download import fixture_files
+from download import EXCHANGES, download_and_combine_data
+from standins import MasterFileServer
+
+
+@pytest.fixture(scope='module')
+def files():
+    return fixture_files(5_000)
+
+
+def expected_frame(files):
+    """The fixtures parsed one exchange at a time, in EXCHANGES order, each tagged with its exchange."""
+    parts = []
+    for exchange in EXCHANGES:
+        with zipfile.ZipFile(io.BytesIO(files[f"/{exchange}_symbols.txt.zip"])) as z:
+            part = pd.read_csv(io.BytesIO(z.read(f"{exchange}_symbols.txt")))
+        parts.append(part.assign(Exchange=exchange))
+    return pd.concat(parts, ignore_index=True)
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_download_matches_fixtures(files, workers, tmp_path):
+    output = tmp_path / 'combined.csv'
+    with MasterFileServer(files) as server:
+        df = download_and_combine_data([server.url + path for path in files], str(output), max_workers=workers,
+                                       backoff=0.01)
+    expected = expected_frame(files)
+    pd.testing.assert_frame_equal(df, expected)
+    assert output.read_text() == expected.to_csv(index=False)
+
+
+def test_retries_recover_from_503(files, tmp_path):
+    with MasterFileServer(files, fail_first=2) as server:
+        df = download_and_combine_data([server.url + path for path in files], str(tmp_path / 'combined.csv'),
+                                       max_workers=4, retries=3, backoff=0.01)
+        hits = dict(server.hits)
+    pd.testing.assert_frame_equal(df, expected_frame(files))
+    # Two 503s and the successful third attempt for every exchange
+    assert hits == {path: 3 for path in files}
+
+
+def test_missing_exchange_is_left_out(files, tmp_path):
+    failing = '/NFO_symbols.txt.zip'
+    with MasterFileServer(files) as server:
+        server.files = {path: body for path, body in files.items() if path != failing}
+        df = download_and_combine_data([server.url + path for path in files], str(tmp_path / 'combined.csv'),
+                                       max_workers=4, retries=1, backoff=0.01)
+    expected = expected_frame(files)
+    expected = expected[expected['Exchange'] != 'NFO'].reset_index(drop=True)
+    pd.testing.assert_frame_equal(df.reset_index(drop=True), expected, check_dtype=False)
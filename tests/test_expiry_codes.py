@@ -0,0 +1,104 @@
+# test_expiry_codes.py
+"""
+Both brokers resolve W / NW / M / NM / NNM on the underlying's expiry
+calendar: 'W' is the underlying's nearest expiry, and a strike not listed
+on it does not resolve instead of rolling to its own next expiry.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from common.expiry_calendar import EXPIRY_CODES, NO_EXPIRY, ExpiryCalendar, resolve_codes
+from instrument_index import FnoIndex
+from synthetic import icici_master, tradesmart_master
+
+STRIKE = 22000.0
+
+
+@pytest.fixture(scope='module')
+def tradesmart(load_broker):
+    """TradeSmart over a master whose NIFTY 22000 CE is not listed on the nearest expiry."""
+    TradeSmart = load_broker('Broker').TradeSmart
+    df = tradesmart_master(5_000)
+    expiries = pd.to_datetime(df['Expiry'], format='%d-%b-%Y')
+    nearest = expiries[df['Symbol'] == 'NIFTY'].min()
+    unlisted = (df['Symbol'] == 'NIFTY') & (df['StrikePrice'] == STRIKE) & (df['OptionType'] == 'CE') & \
+        (expiries == nearest)
+    assert unlisted.sum() == 1
+    TradeSmart.exchange_data = df[~unlisted].reset_index(drop=True)
+    TradeSmart.option_chains = None
+    yield TradeSmart
+    TradeSmart.exchange_data = TradeSmart.fno_index = TradeSmart.option_chains = None
+
+
+@pytest.fixture(scope='module')
+def icici(load_broker):
+    """ICICI_Broker over the same gap; skipped where breeze_connect cannot be imported."""
+    try:
+        ICICI_Broker = load_broker('ICICI').ICICI_Broker
+    except Exception as e:
+        pytest.skip(f"ICICI/script.py does not import here: {e!r}")
+    df = icici_master(5_000)
+    nearest = df.loc[df['ShortName'] == 'NIFTY', 'ExpiryDate'].min()
+    unlisted = (df['ShortName'] == 'NIFTY') & (df['StrikePrice'] == STRIKE) & (df['OptionType'] == 'CE') & \
+        (df['ExpiryDate'] == nearest)
+    ICICI_Broker.instrument_df = df[~unlisted].reset_index(drop=True)
+    ICICI_Broker.build_indexes()
+    yield ICICI_Broker
+    ICICI_Broker.instrument_df = None
+
+
+def test_resolve_codes_matches_expiry_calendar():
+    weekly = pd.date_range('2025-04-03', periods=12, freq='7D').to_numpy('datetime64[ns]')
+    lines = [weekly, weekly[[3, 7, 11]], weekly[:1], weekly[[0, 4]]]
+    resolved = resolve_codes(np.repeat(np.arange(len(lines)), [len(dates) for dates in lines]),
+                             np.concatenate(lines).astype(np.int64))
+    for line, dates in enumerate(lines):
+        calendar = ExpiryCalendar(dates)
+        expected = [calendar.resolve(code) for code in EXPIRY_CODES]
+        assert [None if date == NO_EXPIRY else np.datetime64(int(date), 'ns') for date in resolved[line]] == expected
+
+
+def nifty_calendar(df):
+    options = df[(df['Symbol'] == 'NIFTY') & df['Instrument'].str.startswith('OPT')]
+    return ExpiryCalendar(pd.to_datetime(options['Expiry'], format='%d-%b-%Y').to_numpy())
+
+
+def trading_symbol_expiry(trading_symbol):
+    return np.datetime64(pd.to_datetime(trading_symbol[5:12], format='%d%b%y'), 'ns')
+
+
+@pytest.mark.parametrize('indexed', [True, False], ids=['fno_index', 'masking'])
+def test_tradesmart_codes_name_the_underlyings_expiries(tradesmart, indexed):
+    tradesmart.fno_index = FnoIndex(tradesmart.exchange_data) if indexed else None
+    calendar = nifty_calendar(tradesmart.exchange_data)
+    assert tradesmart.get_token_details('NFO', 'NIFTY', STRIKE, '0', 'W') in (None, (None, None, None))
+    for code in ('NW', 'M', 'NM'):
+        token, trading_symbol, _ = tradesmart.get_token_details('NFO', 'NIFTY', STRIKE, '0', code)
+        assert trading_symbol_expiry(trading_symbol) == calendar.resolve(code)
+    # The put at the same strike is listed on the nearest expiry
+    _, trading_symbol, _ = tradesmart.get_token_details('NFO', 'NIFTY', STRIKE, '1', 'W')
+    assert trading_symbol_expiry(trading_symbol) == calendar.resolve('W')
+
+
+def test_tradesmart_option_chain_agrees_with_get_token_details(tradesmart):
+    tradesmart.fno_index = FnoIndex(tradesmart.exchange_data)
+    for code in ('W', 'NW', 'M'):
+        chain = tradesmart.option_chain('NFO', 'NIFTY', code)
+        assert chain.expiry == nifty_calendar(tradesmart.exchange_data).resolve(code)
+        for strike in [*chain.strikes[::7], STRIKE]:
+            for put in (False, True):
+                expected = tradesmart.get_token_details('NFO', 'NIFTY', strike, '1' if put else '0', code)
+                assert chain.leg(strike, put) == tuple(expected)
+
+
+def test_icici_codes_name_the_underlyings_expiries(icici):
+    calendar = icici.expiry_calendars[('NFO', 'NIFTY', 'OPTION')]
+    assert icici.get_icici_token_details('NFO', 'NIFTY', STRIKE, False, 'W') == (None, None, None)
+    df = icici.instrument_df.set_index('Token')
+    for code in ('NW', 'M', 'NM'):
+        token, _, _ = icici.get_icici_token_details('NFO', 'NIFTY', STRIKE, False, code)
+        assert df.loc[token, 'ExpiryDate'] == calendar.resolve(code)
+        chain = icici.option_chain('NFO', 'NIFTY', code)
+        assert chain.leg(STRIKE)[0] == token
+    assert icici.option_chain('NFO', 'NIFTY', 'W').leg(STRIKE) == (None, None, None)
@@ -0,0 +1,41 @@
+# test_icici_tokens.py
+import pytest
+
+from standins import BreezeOrders, OrderSim
+from synthetic import icici_master
+
+
+@pytest.fixture(scope='module')
+def broker(load_broker):
+    """An ICICI_Broker on the Breeze stand-in; skipped where breeze_connect cannot be imported."""
+    try:
+        ICICI_Broker = load_broker('ICICI').ICICI_Broker
+    except Exception as e:
+        pytest.skip(f"ICICI/script.py does not import here: {e!r}")
+    ICICI_Broker.instrument_df = icici_master(2_000)
+    ICICI_Broker.build_indexes()
+    # Skip __init__: it opens a Breeze session
+    broker = ICICI_Broker.__new__(ICICI_Broker)
+    broker.rate_limits = None
+    broker.obj = BreezeOrders(OrderSim())
+    yield broker
+    ICICI_Broker.instrument_df = ICICI_Broker.token_index = None
+
+
+@pytest.mark.parametrize('indexed', [True, False], ids=['token_index', 'scan'])
+def test_unknown_token_is_a_miss_not_an_error(broker, monkeypatch, indexed):
+    if not indexed:
+        monkeypatch.setattr(broker, 'token_index', None)
+    assert broker.filter_csv_by_token('999999999') == ('others', None)
+    assert broker.get_ltp('NFO', '999999999') == 0
+    assert 'get_quotes' not in broker.obj.sim.calls
+    order_id, error = broker.submit_order('999999999', 'NIFTY', 75, 'NFO', 'BUY', 'MARKET', 0)
+    assert order_id is None and error == "No instrument found for token 999999999"
+    assert 'place_order' not in broker.obj.sim.calls
+
+
+def test_known_token_is_quoted(broker):
+    token = broker.instrument_df['Token'].iat[0]
+    right, row = broker.filter_csv_by_token(token)
+    assert row['ShortName'] == broker.instrument_df['ShortName'].iat[0]
+    assert broker.get_ltp('NFO', token) == broker.obj.sim.fill_price
@@ -0,0 +1,75 @@
+# test_instrumentation.py
+import atexit
+import importlib
+import io
+import logging
+
+import pytest
+
+from common import instrumentation
+from common.instrumentation import Registry, configure_logging, env_level
+
+
+@pytest.mark.parametrize('value, level', [('debug', logging.DEBUG), ('Warning', logging.WARNING),
+                                          (' ERROR ', logging.ERROR), ('15', 15), ('', logging.INFO),
+                                          ('verbose', logging.INFO)])
+def test_env_level(monkeypatch, value, level):
+    monkeypatch.setenv('BROKER_LOG_LEVEL', value)
+    assert env_level(logging.INFO) == level
+
+
+def bare_root(monkeypatch):
+    """The root logger without pytest's capture handlers; monkeypatch puts them and its level back."""
+    root = logging.getLogger()
+    monkeypatch.setattr(root, 'handlers', [])
+    monkeypatch.setattr(root, 'level', root.level)
+    return root
+
+
+def test_configure_logging_with_a_lowercase_level(monkeypatch):
+    monkeypatch.setenv('BROKER_LOG_LEVEL', 'debug')
+    root = bare_root(monkeypatch)
+    stream = io.StringIO()
+    listener = configure_logging(logging.INFO, fmt="%(levelname)s %(message)s", stream=stream)
+    try:
+        logging.debug("order %s", 'A1')
+    finally:
+        listener.stop()
+        atexit.unregister(listener.stop)
+    assert root.level == logging.DEBUG
+    assert stream.getvalue() == "DEBUG order A1\n"
+
+
+def test_unknown_level_falls_back(monkeypatch):
+    monkeypatch.setenv('BROKER_LOG_LEVEL', 'verbose')
+    root = bare_root(monkeypatch)
+    stream = io.StringIO()
+    listener = configure_logging(logging.WARNING, fmt="%(levelname)s %(message)s", stream=stream)
+    listener.stop()
+    atexit.unregister(listener.stop)
+    assert root.level == logging.WARNING
+    assert "Ignoring BROKER_LOG_LEVEL='verbose'" in stream.getvalue()
+
+
+def test_importing_the_data_processor_starts_no_listener(monkeypatch):
+    monkeypatch.setenv('BROKER_LOG_LEVEL', 'not-a-level')
+    monkeypatch.setattr(instrumentation, '_listener', None)
+    importlib.reload(importlib.import_module('icici_data_processor'))
+    assert instrumentation._listener is None
+
+
+def test_timed_records_calls_and_errors(monkeypatch):
+    registry = Registry()
+    monkeypatch.setattr(instrumentation, 'REGISTRY', registry)
+
+    @instrumentation.timed('test.call')
+    def call(fail=False):
+        if fail:
+            raise ValueError(fail)
+        return 1
+
+    assert call() == 1
+    with pytest.raises(ValueError):
+        call(fail=True)
+    snapshot = registry.histogram('test.call').snapshot()
+    assert snapshot['count'] == 2 and snapshot['errors'] == 1
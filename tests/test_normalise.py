@@ -0,0 +1,53 @@
+# test_normalise.py
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from normalise import generate_normalized_symbol, normalize_symbols
+from synthetic import tradesmart_master
+
+# Rows that exercise the NaN, non-numeric and exception branches of the row-wise reference
+EDGE_CASES = pd.DataFrame({
+    'Exchange': ['NSE', 'NFO', 'NFO', 'MCX', 'CDS', 'NSE'],
+    'Token': [1, 2, 3, 4, 5, 6],
+    'LotSize': 1,
+    'Symbol': [np.nan, 'ODD', 'ODD', 'GOLD', 'USDINR', 'IDX'],
+    'TradingSymbol': ['NANSYM', 'ODDBAD', 'ODDINF', 'GOLD05JUN25FUT', 'USDINR25APR25C85.25', 'IDX'],
+    'Expiry': [np.nan, '24-APR-2025', 'not a date', '05-JUN-2025', '25-APR-2025', np.nan],
+    'Instrument': ['EQ', 'OPTSTK', 'OPTSTK', 'FUTCOM', 'OPTCUR', 'INDEX'],
+    'OptionType': ['XX', np.nan, 'CE', 'XX', 'CE', 'XX'],
+    'StrikePrice': [np.nan, 'abc', 'inf', np.nan, '85.25', np.nan],
+    'TickSize': 0.05,
+    'Strike': np.nan,
+})
+
+
+@pytest.fixture(scope='module')
+def master():
+    """A synthetic combined master plus the edge cases, read back from CSV as create_normalized_symbols does."""
+    buffer = io.StringIO()
+    pd.concat([tradesmart_master(20_000), EDGE_CASES], ignore_index=True).to_csv(buffer, index=False)
+    buffer.seek(0)
+    df = pd.read_csv(buffer, low_memory=False)
+    df['expiry_date'] = pd.to_datetime(df['Expiry'], format='%d-%b-%Y', errors='coerce')
+    return df
+
+
+def csv_bytes(df, column):
+    out = df.copy()
+    out['NormalizedSymbol'] = column
+    buffer = io.StringIO()
+    out.to_csv(buffer, index=False)
+    return buffer.getvalue().encode()
+
+
+def test_columnar_matches_row_wise(master, capsys):
+    row_wise = master.apply(generate_normalized_symbol, axis=1)
+    columnar = normalize_symbols(master)
+    capsys.readouterr()  # the row-wise reference prints its "Error processing row" lines
+    mismatched = row_wise.ne(columnar)
+    assert not mismatched.any(), pd.DataFrame({'row_wise': row_wise[mismatched], 'columnar': columnar[mismatched]})
+    assert csv_bytes(master, row_wise) == csv_bytes(master, columnar)
+
@@ -0,0 +1,78 @@
+# test_option_chain.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from common.option_chain import NO_TOKEN, OptionChain, OptionChains
+
+WEEKLY, MONTHLY = np.datetime64('2025-04-03', 'ns'), np.datetime64('2025-04-24', 'ns')
+
+
+def option_rows():
+    """NIFTY CE and PE at 21800..22200 step 100 on two expiries; 22200 has no PE on the weekly."""
+    rows = []
+    for expiry in (WEEKLY, MONTHLY):
+        for strike in range(21800, 22300, 100):
+            for put in (False, True):
+                if put and strike == 22200 and expiry == WEEKLY:
+                    continue
+                rows.append({'exchange': 'NFO', 'underlying': 'NIFTY', 'expiry': expiry, 'strike': float(strike),
+                             'put': put, 'token': len(rows) + 1,
+                             'trading_symbol': f"NIFTY{'P' if put else 'C'}{strike}", 'lot_size': 75})
+    # Listed out of strike order, as in a master
+    return pd.DataFrame(rows).sample(frac=1, random_state=0).reset_index(drop=True)
+
+
+@pytest.fixture
+def chains():
+    return OptionChains(option_rows())
+
+
+@pytest.mark.parametrize('spot, atm', [(22000, 22000), (22049.9, 22000), (22050, 22000), (22050.1, 22100),
+                                       (21000, 21800), (25000, 22200)])
+def test_atm_is_the_nearest_strike_lower_on_a_tie(chains, spot, atm):
+    assert chains.chain('NFO', 'NIFTY', 'W').atm_strike(spot) == atm
+
+
+def test_atm_index_matches_a_linear_scan(chains):
+    chain = chains.chain('NFO', 'NIFTY', 'W')
+    strikes = chain.strikes
+    for spot in np.random.default_rng(0).uniform(21500, 22500, 500):
+        distance = np.abs(strikes - spot)
+        assert chain.atm_index(spot) == int(np.flatnonzero(distance == distance.min())[0])
+
+
+def test_empty_chain_has_no_atm():
+    empty = np.empty(0)
+    chain = OptionChain('NFO', 'NIFTY', WEEKLY, empty, empty, empty, empty, empty, None)
+    assert chain.atm_index(22000) is None and chain.atm_strike(22000) is None
+    assert chain.window(22000, 2) is chain
+
+
+def test_window_cuts_views_around_the_atm(chains):
+    chain = chains.chain('NFO', 'NIFTY', 'W')
+    window = chain.window(22010, 1)
+    assert window.strikes.tolist() == [21900.0, 22000.0, 22100.0]
+    assert np.shares_memory(window.ce_tokens, chain.ce_tokens)
+    # Clipped at the ends of the ladder
+    assert chain.window(21790, 2).strikes.tolist() == [21800.0, 21900.0, 22000.0]
+    assert chain.window(22300, 1).strikes.tolist() == [22100.0, 22200.0]
+
+
+def test_strikes_are_sorted_and_sides_aligned(chains):
+    chain = chains.chain('NFO', 'NIFTY', 'W')
+    assert chain.strikes.tolist() == [21800.0, 21900.0, 22000.0, 22100.0, 22200.0]
+    assert chain.ce_symbols.tolist() == [f"NIFTYC{strike}" for strike in range(21800, 22300, 100)]
+    assert chain.pe_tokens[-1] == NO_TOKEN and chain.pe_symbols[-1] is None
+    assert chain.leg(22000, put=True)[1:] == ('NIFTYP22000', 75)
+    assert chain.leg(22200, put=True) == (None, None, None)
+    assert chain.leg(22050) == (None, None, None)
+
+
+def test_codes_resolve_on_the_underlyings_calendar(chains):
+    assert chains.chain('NFO', 'NIFTY', 'W').expiry == WEEKLY
+    assert chains.chain('NFO', 'nifty', 'NW').expiry == MONTHLY
+    # M and NW name the same date and share one chain
+    assert chains.chain('NFO', 'NIFTY', 'M') is chains.chain('NFO', 'NIFTY', 'NW')
+    assert chains.chain('NFO', 'NIFTY', 'NM') is None
+    assert chains.chain('NFO', 'BANKNIFTY', 'W') is None
@@ -0,0 +1,67 @@
+# test_order_book_poller.py
+import time
+
+from order_book_poller import OrderBookPoller
+
+
+class Session:
+    """A Breeze client stand-in whose order book reports every order with one status."""
+
+    def __init__(self, status, alive=True):
+        self.status = status
+        self.alive = alive
+        self.calls = 0
+
+    def get_order_list(self):
+        self.calls += 1
+        if not self.alive:
+            return {'Success': None, 'Status': 401, 'Error': 'Session key is expired'}
+        return {'Success': [{'order_id': 'A1', 'order_status': self.status}], 'Status': 200, 'Error': None}
+
+
+def test_poller_follows_a_replaced_session():
+    broker = type('Broker', (), {})()
+    broker.obj = Session('Ordered', alive=False)
+    poller = OrderBookPoller(lambda: broker.obj.get_order_list(), interval=0.01)
+    assert poller.wait('A1', timeout=0.1) is None
+    dead = broker.obj
+    # A re-login replaces the client; the next refresh must use it
+    broker.obj = Session('Completed')
+    assert poller.wait('A1', timeout=2)['order_status'] == 'Completed'
+    assert broker.obj.calls >= 1
+    calls = dead.calls
+    poller.refresh()
+    assert dead.calls == calls
+
+
+
+def test_reads_not_seconds_bound_the_wait():
+    session = Session('Ordered')
+    # Each read is held back far longer than the interval, as a saturated rate limiter would
+    poller = OrderBookPoller(session.get_order_list, interval=0.01, throttle=lambda: time.sleep(0.2))
+    start = time.monotonic()
+    assert poller.wait('A1', reads=3) is None
+    assert time.monotonic() - start >= 0.6
+    assert session.calls >= 3
+
+
+def test_order_final_within_the_reads():
+    session = Session('Ordered')
+    reads = []
+
+    def fetch():
+        reads.append(1)
+        if len(reads) == 2:
+            session.status = 'Completed'
+        return session.get_order_list()
+
+    poller = OrderBookPoller(fetch, interval=0.01)
+    assert poller.wait('A1', reads=3)['order_status'] == 'Completed'
+
+
+def test_malformed_books_do_not_stop_the_poller():
+    responses = iter([['not', 'a', 'dict'], {'Success': 'Session Expired'}, {'Success': [None]},
+                      {'Success': [{'order_id': 'A1', 'order_status': 'Completed'}]}])
+    poller = OrderBookPoller(lambda: next(responses), interval=0.01)
+    assert poller.wait('A1', timeout=5)['order_status'] == 'Completed'
+    assert poller.stats['errors'] == 2
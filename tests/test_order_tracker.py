@@ -0,0 +1,109 @@
+# test_order_tracker.py
+import threading
+import time
+
+from order_tracker import OrderTracker
+
+
+class History:
+    """single_order_history stand-in: an order is open until complete() is called for it."""
+
+    def __init__(self):
+        self.done = set()
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def single_order_history(self, orderno):
+        with self.lock:
+            self.calls += 1
+        return [{'norenordno': orderno, 'status': 'COMPLETE' if orderno in self.done else 'OPEN'}]
+
+    def complete(self, orderno):
+        self.done.add(orderno)
+
+
+def fill(orderno):
+    return {'t': 'om', 'norenordno': orderno, 'status': 'COMPLETE'}
+
+
+def test_early_update_settles_track():
+    tracker = OrderTracker(History())
+    tracker.on_order_update(fill('1'))
+    assert tracker.track('1').result(timeout=1)['status'] == 'COMPLETE'
+    assert not tracker._updates
+
+
+def test_stream_copy_after_rest_settled_is_dropped():
+    api = History()
+    tracker = OrderTracker(api, min_delay=0.01)
+    future = tracker.track('2')
+    api.complete('2')
+    assert future.result(timeout=2)['status'] == 'COMPLETE'
+    assert tracker.stats['rest'] == 1
+    tracker.on_order_update(fill('2'))
+    assert not tracker._updates
+    assert tracker.stats['late'] == 1
+
+
+def test_update_after_forget_is_dropped():
+    tracker = OrderTracker(History(), min_delay=10)
+    tracker.track('3')
+    tracker.forget('3')
+    tracker.on_order_update({'norenordno': '3', 'status': 'CANCELED'})
+    assert not tracker._updates
+
+
+def test_untracked_fills_are_bounded():
+    tracker = OrderTracker(History(), max_early=100, early_ttl=0.05)
+    for orderno in range(500):
+        tracker.on_order_update(fill(str(orderno)))
+    assert len(tracker._updates) == 100
+    assert list(tracker._updates)[0] == '400'
+    time.sleep(0.06)
+    tracker.on_order_update(fill('late'))
+    assert list(tracker._updates) == ['late']
+
+
+def test_settled_set_is_bounded():
+    tracker = OrderTracker(History(), settled_size=10)
+    for orderno in range(50):
+        tracker.on_order_update(fill(str(orderno)))
+        tracker.track(str(orderno))
+    assert len(tracker._settled) == 10
+
+
+class Failing(History):
+    """Answers the first polls with an error dict, then raises, then serves the order book."""
+
+    def __init__(self, errors):
+        super().__init__()
+        self.errors = list(errors)
+
+    def single_order_history(self, orderno):
+        if self.errors:
+            error = self.errors.pop(0)
+            if isinstance(error, Exception):
+                raise error
+            return error
+        return super().single_order_history(orderno)
+
+
+def test_error_answers_do_not_stop_polling():
+    api = Failing([{'stat': 'Not_Ok', 'emsg': 'Session Expired'}, ConnectionError('reset'), [None, 'x']])
+    api.complete('5')
+    tracker = OrderTracker(api, min_delay=0.01, max_delay=0.01)
+    assert tracker.track('5').result(timeout=2)['status'] == 'COMPLETE'
+    assert tracker.stats['errors'] == 2
+    # The same thread serves later orders
+    api.complete('6')
+    assert tracker.track('6').result(timeout=2)['status'] == 'COMPLETE'
+
+
+def test_dead_poller_is_restarted():
+    api = History()
+    tracker = OrderTracker(api, min_delay=0.01)
+    tracker._poller = threading.Thread(target=lambda: None)
+    tracker._poller.start()
+    tracker._poller.join()
+    api.complete('7')
+    assert tracker.track('7').result(timeout=2)['status'] == 'COMPLETE'
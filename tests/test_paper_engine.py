@@ -0,0 +1,111 @@
+# test_paper_engine.py
+import numpy as np
+import pytest
+
+from common.paper_engine import CANCELLED, COMPLETE, OPEN, REJECTED, PaperEngine
+
+
+def engine(**kwargs):
+    paper = PaperEngine(**kwargs)
+    paper.on_price('NFO', 101, 100.0)
+    return paper
+
+
+def test_market_orders_fill_at_the_last_price_plus_slippage():
+    fills = []
+    paper = engine(slippage=0.01, on_fill=lambda order_id, price: fills.append((order_id, price)))
+    buy, status, price, error = paper.place('NFO', 101, 'BUY', 50)
+    assert (status, error) == (COMPLETE, None) and price == pytest.approx(101.0)
+    sell = paper.place('NFO', 101, 'S', 50, 'MKT')
+    assert sell[2] == pytest.approx(99.0)
+    assert fills == [(buy, pytest.approx(101.0)), (sell[0], pytest.approx(99.0))]
+
+
+def test_market_order_without_a_price_is_rejected():
+    paper = PaperEngine()
+    assert paper.place('NFO', 999, 'BUY', 50) == (None, REJECTED, None, "No local price for NFO:999")
+    stale = engine(max_age=5, clock=iter([0.0, 10.0]).__next__)
+    assert stale.place('NFO', 101, 'BUY', 50)[1] == REJECTED
+
+
+def test_price_source_is_asked_first():
+    paper = engine(price_source=lambda exchange, token: 105.0)
+    assert paper.place('NFO', 101, 'BUY', 50)[2] == 105.0
+    assert paper.last_price[paper.slot('NFO', 101)] == 105.0
+
+
+@pytest.mark.parametrize('side, limit', [('BUY', 102.0), ('SELL', 98.0)])
+def test_marketable_limit_fills_at_the_last_price(side, limit):
+    paper = engine()
+    assert paper.place('NFO', 101, side, 50, 'LIMIT', limit)[1:3] == (COMPLETE, 100.0)
+
+
+def test_resting_limits_fill_at_their_limit_when_crossed():
+    paper = engine()
+    buy_low = paper.place('NFO', 101, 'BUY', 50, 'LIMIT', 95.0)[0]
+    buy_high = paper.place('NFO', 101, 'BUY', 50, 'LIMIT', 98.0)[0]
+    sell = paper.place('NFO', 101, 'SELL', 25, 'LMT', 104.0)[0]
+    assert {paper.order(order_id)['status'] for order_id in (buy_low, buy_high, sell)} == {OPEN}
+    # 97 reaches the higher buy only
+    paper.on_price('NFO', 101, 97.0)
+    assert paper.order(buy_high)['status'] == COMPLETE and paper.order(buy_high)['fill_price'] == 98.0
+    assert paper.order(buy_low)['status'] == OPEN
+    paper.replay(['NFO', 'NFO'], [101, 101], [94.0, 105.0])
+    assert paper.order(buy_low)['fill_price'] == 95.0
+    assert paper.order(sell)['fill_price'] == 104.0
+    assert paper._resting == {}
+
+
+def test_cancel_stops_a_resting_limit():
+    paper = engine()
+    order_id = paper.place('NFO', 101, 'BUY', 50, 'LIMIT', 95.0)[0]
+    assert paper.cancel(order_id) is True
+    assert paper.cancel(order_id) is False
+    paper.on_price('NFO', 101, 90.0)
+    assert paper.order(order_id)['status'] == CANCELLED
+    assert paper.net_qty[paper.slot('NFO', 101)] == 0
+    filled = paper.place('NFO', 101, 'BUY', 50)[0]
+    assert paper.cancel(filled) is False and paper.cancel('unknown') is False
+
+
+def test_cancelled_limits_are_dropped_from_the_heaps():
+    paper = engine()
+    slot = paper.slot('NFO', 101)
+    orders = [paper.place('NFO', 101, 'BUY', 1, 'LIMIT', 90.0 - i / 2)[0] for i in range(100)]
+    # The lowest buys never reach the top of the heap, so popping alone would never drop them
+    for order_id in orders[50:]:
+        paper.cancel(order_id)
+    buys, sells = paper._resting[slot]
+    assert len(buys) == 50 and paper._cancelled == {}
+    for order_id in orders[:50]:
+        paper.cancel(order_id)
+    assert slot not in paper._resting and paper._cancelled == {}
+
+
+def test_positions_and_pnl():
+    paper = engine()
+    paper.on_price('NSE', 'RELIANCE', 2500.0)
+    paper.place('NFO', 101, 'BUY', 50)
+    paper.place('NFO', 101, 'SELL', 20, 'LIMIT', 99.0)
+    paper.place('NSE', 'RELIANCE', 'SELL', 10)
+    slot = paper.slot('NFO', 101)
+    assert (paper.net_qty[slot], paper.buy_qty[slot], paper.sell_qty[slot]) == (30, 50, 20)
+    assert (paper.buy_value[slot], paper.sell_value[slot]) == (5000.0, 2000.0)
+
+    paper.on_price('NFO', 101, 110.0)
+    paper.on_price('NSE', 'RELIANCE', 2400.0)
+    # NFO: 2000 - 5000 + 30 * 110; RELIANCE: 25000 - 10 * 2400
+    assert paper.pnl() == pytest.approx(300.0 + 1000.0)
+    positions = paper.positions().set_index('token')
+    assert positions.loc['101', 'avg_buy'] == 100.0 and positions.loc['101', 'pnl'] == pytest.approx(300.0)
+    assert np.isnan(positions.loc['RELIANCE', 'avg_buy']) and positions.loc['RELIANCE', 'net_qty'] == -10
+
+
+def test_slots_grow_past_capacity():
+    paper = PaperEngine(capacity=2)
+    for token in range(5):
+        paper.on_price('NFO', token, 10.0 + token)
+        paper.place('NFO', token, 'BUY', 1)
+    assert len(paper.net_qty) >= 5
+    assert paper.pnl() == 0.0
+    assert paper.positions()['net_qty'].tolist() == [1] * 5
@@ -0,0 +1,172 @@
+# test_rate_limiter.py
+import itertools
+import threading
+import time
+
+import pytest
+
+from common.instrumentation import REGISTRY
+from common.rate_limiter import ORDER, QUOTE, STATUS, RateLimiter
+
+_names = itertools.count()
+
+
+def limiter(limits, **kwargs):
+    """A RateLimiter whose wait histograms no other test shares."""
+    return RateLimiter(limits, name=f"test{next(_names)}", **kwargs)
+
+
+def wait_queued(limiter, counts, timeout=5):
+    """Block until endpoint -> waiters queued in limiter reaches counts."""
+    deadline = time.monotonic() + timeout
+    while any(limiter.endpoints.get(endpoint, {}).get('queued', 0) < n for endpoint, n in counts.items()):
+        assert time.monotonic() < deadline, f"waiters never queued: {limiter.endpoints}"
+        time.sleep(0.001)
+
+
+def start(limiter, calls, granted):
+    """One thread per (endpoint, priority, label) call, started in order, each queued before the next."""
+    threads = []
+    for endpoint, priority, label in calls:
+        queued = limiter.endpoints.get(endpoint, {}).get('queued', 0)
+
+        def call(endpoint=endpoint, priority=priority, label=label):
+            limiter.acquire(endpoint, priority)
+            granted.append(label)
+
+        thread = threading.Thread(target=call)
+        thread.start()
+        wait_queued(limiter, {endpoint: queued + 1})
+        threads.append(thread)
+    return threads
+
+
+def test_burst_then_refill_rate():
+    rl = limiter({'*': (20, 2)})
+    assert rl.acquire('get_quotes') < 0.01
+    assert rl.acquire('get_quotes') < 0.01
+    # The bucket is empty; the next token is 1/20 s away
+    assert rl.acquire('get_quotes') == pytest.approx(0.05, abs=0.03)
+
+
+def test_priority_order_then_first_come_first_served():
+    rl = limiter({'*': (10, 1)})
+    rl.acquire('drain', QUOTE)
+    granted = []
+    threads = start(rl, [('get_quotes', QUOTE, 'quote'), ('get_order_list', STATUS, 'status 1'),
+                         ('get_order_list', STATUS, 'status 2'), ('place_order', ORDER, 'order')], granted)
+    for thread in threads:
+        thread.join(5)
+    assert granted == ['order', 'status 1', 'status 2', 'quote']
+
+
+def test_overall_bucket_is_shared_by_every_endpoint():
+    rl = limiter({'*': (5, 1), 'get_quotes': (100, 100)})
+    rl.acquire('place_order', ORDER)
+    # get_quotes has tokens of its own, but the overall bucket is empty
+    assert rl.acquire('get_quotes', QUOTE) == pytest.approx(0.2, abs=0.05)
+
+
+def test_endpoint_buckets_without_an_overall_one():
+    rl = limiter({'get_quotes': (5, 1)})
+    rl.acquire('get_quotes')
+    assert rl.acquire('place_order', ORDER) == 0.0
+    assert rl.acquire('get_quotes') == pytest.approx(0.2, abs=0.05)
+    stats = rl.stats()
+    assert stats['place_order']['calls'] == 1 and stats['place_order']['throttled'] == 0
+    assert stats['get_quotes']['throttled'] == 1
+
+
+def test_blocked_order_does_not_stall_other_buckets():
+    rl = limiter({'place_order': (2, 1), 'get_quotes': (100, 100)})
+    rl.acquire('place_order', ORDER)
+    granted = []
+    threads = start(rl, [('place_order', ORDER, 'order')], granted)
+    # The order waits for its own bucket; quotes draw from another one and go straight through
+    start_quotes = time.monotonic()
+    for _ in range(20):
+        rl.acquire('get_quotes', QUOTE)
+    assert time.monotonic() - start_quotes < 0.2
+    assert granted == []
+    threads[0].join(5)
+    assert granted == ['order']
+
+
+def test_blocked_order_holds_the_shared_bucket_back():
+    rl = limiter({'*': (10, 1)})
+    rl.acquire('drain', QUOTE)
+    granted = []
+    threads = start(rl, [('place_order', ORDER, 'order'), ('get_quotes', QUOTE, 'quote')], granted)
+    for thread in threads:
+        thread.join(5)
+    # The quote queued after the order never overtakes it on the bucket they share
+    assert granted == ['order', 'quote']
+
+
+def test_quote_flood_does_not_starve_orders_or_polls():
+    rl = limiter({'*': (50, 2)})
+    stop = threading.Event()
+
+    def flood():
+        while not stop.is_set():
+            rl.acquire('get_quotes', QUOTE)
+
+    flooders = [threading.Thread(target=flood) for _ in range(6)]
+    for thread in flooders:
+        thread.start()
+    try:
+        wait_queued(rl, {'get_quotes': 5})
+        # With six quote callers always waiting, each higher priority call waits about one refill
+        waits = [rl.acquire('place_order', ORDER) for _ in range(5)]
+        waits += [rl.acquire('get_order_list', STATUS) for _ in range(5)]
+    finally:
+        stop.set()
+        for thread in flooders:
+            thread.join(5)
+    assert max(waits) < 0.1
+    assert rl.stats()['get_quotes']['calls'] > 0
+
+
+def test_reserve_keeps_tokens_for_higher_priorities():
+    rl = limiter({'*': (5, 3)}, reserve={STATUS: 1, QUOTE: 2})
+    assert rl.acquire('get_quotes', QUOTE) < 0.01
+    # Two tokens left: a status poll may take one, a quote may not
+    assert rl.acquire('get_order_list', STATUS) < 0.01
+    granted = []
+    threads = start(rl, [('get_quotes', QUOTE, 'quote')], granted)
+    # The one token left is an order's
+    assert rl.acquire('place_order', ORDER) < 0.01
+    threads[0].join(5)
+    assert granted == ['quote']
+
+
+def test_reserve_must_leave_a_token():
+    with pytest.raises(ValueError):
+        RateLimiter({'*': (5, 3)}, reserve={QUOTE: 3})
+
+
+def test_queue_depth_and_wait_metrics():
+    rl = limiter({'*': (20, 1)})
+    rl.acquire('get_quotes')
+    granted = []
+    threads = start(rl, [('get_quotes', QUOTE, i) for i in range(3)], granted)
+    for thread in threads:
+        thread.join(5)
+    stats = rl.stats()['get_quotes']
+    assert stats['calls'] == 4
+    assert stats['throttled'] == 3
+    assert stats['queued'] == 0
+    assert stats['max_queued'] == 3
+    assert stats['wait_max'] >= 0.1
+    assert 0 < stats['wait_p50'] <= stats['wait_p95'] <= stats['wait_max']
+    assert REGISTRY.histogram(f"{rl.name}.wait.get_quotes").count == 4
+
+
+def test_unlimited_limiter_only_counts():
+    rl = limiter(None)
+    assert rl.acquire('place_order', ORDER) == 0.0
+    with rl.slot('get_quotes'):
+        pass
+    stats = rl.stats()
+    assert stats['place_order']['calls'] == 1 and stats['get_quotes']['calls'] == 1
+    assert stats['get_quotes']['throttled'] == 0
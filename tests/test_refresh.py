@@ -0,0 +1,92 @@
+# test_refresh.py
+import io
+import json
+import os
+import zipfile
+
+import pandas as pd
+import pytest
+
+from bench_download import fixture_files
+from download import download_and_combine_data
+from icici_data_processor import ICICIDataProcessor
+from standins import MasterFileServer
+from synthetic import icici_master
+
+
+def test_failed_write_is_retried(tmp_path):
+    files = fixture_files(2_000)
+    cache_dir = tmp_path / 'cache'
+    with MasterFileServer(files) as server:
+        urls = [server.url + path for path in files]
+        with pytest.raises(OSError):
+            download_and_combine_data(urls, str(tmp_path / 'missing' / 'combined.csv'), cache_dir=str(cache_dir))
+        # Nothing was written, so no validators were kept
+        assert not (cache_dir / 'state.json').exists()
+        output = tmp_path / 'combined.csv'
+        df = download_and_combine_data(urls, str(output), cache_dir=str(cache_dir))
+        assert output.read_text() == df.to_csv(index=False)
+        assert set(json.loads((cache_dir / 'state.json').read_text())) == set(urls)
+
+
+def security_master(rows):
+    """SecurityMaster.zip: one quoted-header TXT member per exchange of a synthetic ICICI master."""
+    df = icici_master(rows)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as z:
+        for exchange, part in df.groupby('ExAllowed', observed=True):
+            z.writestr(f"{exchange}ScripMaster.txt", part.to_csv(index=False))
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def processor(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    server = MasterFileServer({'/SecurityMaster.zip': security_master(5_000)})
+    with server:
+        processor = ICICIDataProcessor()
+        processor.zip_url = server.url + '/SecurityMaster.zip'
+        processor.max_workers = 1
+        yield processor
+
+
+def test_failed_parse_is_retried(processor, monkeypatch):
+    def fail(names):
+        raise ValueError("parse failed")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(processor, 'parse_members', fail)
+        assert processor.run() is None
+    assert not os.path.exists(processor.state_file)
+
+    # A fresh processor must not take the archive as unchanged
+    retry = ICICIDataProcessor()
+    retry.zip_url, retry.max_workers = processor.zip_url, 1
+    df = retry.run()
+    assert df is not None and len(df) == 5_000
+    assert retry.changed_files == retry.txt_files
+    assert os.path.exists(retry.state_file)
+
+    again = ICICIDataProcessor()
+    again.zip_url = processor.zip_url
+    pd.testing.assert_frame_equal(again.run(), df)
+    assert again.changed_files == []
+
+
+def test_download_and_extract_zip_still_works(processor):
+    with pytest.deprecated_call():
+        assert processor.download_and_extract_zip()
+    assert processor.txt_files and processor.changed_files == processor.txt_files
+    assert processor.process_txt_files() is not None
+
+
+def test_pooled_parse_matches_in_process(processor):
+    assert processor.download_zip()
+    names = processor.txt_files
+    assert len(names) > 1
+    in_process = processor.parse_members(names)
+    processor.max_workers = 2
+    pooled = processor.parse_members(names)
+    assert set(pooled) == set(in_process) == set(names)
+    for name in names:
+        pd.testing.assert_frame_equal(pooled[name], in_process[name])
@@ -0,0 +1,78 @@
+# test_session_pool.py
+import json
+import threading
+import time
+
+from common.session_pool import AuthError, SessionPool
+
+FAR = 4102444800.0  # 2100-01-01
+
+
+class Logins:
+    """A login() that counts the handshakes and how many ran at once."""
+
+    def __init__(self):
+        self.calls = 0
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(0.02)
+        with self._lock:
+            self.running -= 1
+        return f"client{self.calls}", {'session_key': f"key{self.calls}"}, FAR
+
+
+def test_restore_reuses_the_saved_token(tmp_path):
+    store = str(tmp_path / 'sessions.json')
+    SessionPool(store).session('u1', 'ICICI', Logins())
+    login = Logins()
+    pool = SessionPool(store)
+    assert pool.session('u1', 'ICICI', login, restore=lambda token: ('restored', token)) == \
+        ('restored', {'session_key': 'key1'})
+    assert login.calls == 0 and pool.stats['restores'] == 1
+
+
+def test_failed_restore_logs_in_and_saves_the_new_token(tmp_path):
+    store = str(tmp_path / 'sessions.json')
+    SessionPool(store).session('u1', 'ICICI', Logins())
+    login = Logins()
+    pool = SessionPool(store, max_logins=1)
+
+    def restore(token):
+        raise AuthError("SDK release cannot restore")
+
+    assert pool.session('u1', 'ICICI', login, restore) == 'client1'
+    assert pool.stats['failed_restores'] == 1 and pool.stats['logins'] == 1
+    assert login.calls == 1
+    with open(store) as f:
+        assert json.load(f)['ICICI:u1'] == {'token': {'session_key': 'key1'}, 'expires_at': FAR}
+    # The live session is reused: no second restore or login
+    assert pool.session('u1', 'ICICI', login, restore) == 'client1'
+    assert login.calls == 1
+
+
+def test_failed_restores_still_log_in_max_logins_at_a_time(tmp_path):
+    store = str(tmp_path / 'sessions.json')
+    seed = SessionPool(store)
+    for user in range(6):
+        seed.session(f"u{user}", 'ICICI', Logins())
+    login = Logins()
+    pool = SessionPool(store, max_logins=2)
+
+    def restore(token):
+        raise AuthError("rejected")
+
+    threads = [threading.Thread(target=pool.session, args=(f"u{user}", 'ICICI', login, restore))
+               for user in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert login.calls == 6 and login.peak <= 2
+    assert pool.stats['failed_restores'] == 6
@@ -0,0 +1,90 @@
+# test_symbol_index.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from common.symbol_index import SymbolIndex
+
+
+def index(symbols, groups=None):
+    return SymbolIndex(pd.Series(symbols, dtype=object), pd.Series(groups or ['NSE'] * len(symbols)))
+
+
+def ranked(symbols, text):
+    """The documented order by brute force: exact, prefix, then contains; shorter, then earlier rows."""
+    text, seen, hits = text.upper(), set(), []
+    for position, symbol in enumerate(symbols):
+        upper = symbol.upper()
+        if upper in seen:
+            continue
+        seen.add(upper)
+        at = upper.find(text)
+        if at >= 0:
+            hits.append((upper != text, at > 0, len(upper), position, upper))
+    return [(upper, position) for *_, position, upper in sorted(hits)]
+
+
+def test_exact_match_comes_first():
+    idx = index(['RELIANCEPP-EQ', 'XRELIANCE', 'RELIANCE', 'RELIANCE-EQ'])
+    assert idx.search('NSE', 'reliance', limit=1) == [('RELIANCE', 2)]
+    assert [symbol for symbol, _ in idx.search('NSE', 'RELIANCE')] == \
+        ['RELIANCE', 'RELIANCE-EQ', 'RELIANCEPP-EQ', 'XRELIANCE']
+
+
+def test_prefix_before_contains_then_shorter_then_master_order():
+    idx = index(['ABINFY', 'INFYBEES-EQ', 'INFY-BE', 'INFY-EQ', 'XINFY'])
+    # XINFY is shorter than any prefix match but only contains the text
+    assert idx.search('NSE', 'INFY') == [('INFY-BE', 2), ('INFY-EQ', 3), ('INFYBEES-EQ', 1), ('XINFY', 4),
+                                         ('ABINFY', 0)]
+
+
+def test_search_is_literal_and_per_group():
+    idx = index(['M&M-EQ', 'M.M', 'MXM', 'M&M'], ['NSE', 'NSE', 'NSE', 'BSE'])
+    assert idx.search('NSE', 'M.M') == [('M.M', 1)]
+    assert idx.search('NSE', '&M') == [('M&M-EQ', 0)]
+    assert idx.search('BSE', 'M&M') == [('M&M', 3)]
+    assert idx.search('MCX', 'M') == [] and idx.search('NSE', '') == []
+
+
+def test_duplicates_keep_their_first_row():
+    idx = index(['SBIN-EQ', 'sbin-eq', 'SBIN-EQ'])
+    assert idx.search('NSE', 'SBIN') == [('SBIN-EQ', 0)]
+
+
+@pytest.mark.parametrize('text', ['A', 'AB', 'ABC', 'BCA', 'ZZZ', 'Q1', '-EQ', 'É'])
+@pytest.mark.parametrize('limit', [None, 1, 3, 50])
+def test_matches_a_brute_force_ranking(text, limit):
+    rng = np.random.default_rng(0)
+    letters = np.array(list('ABCQ1-E'))
+    symbols = [''.join(rng.choice(letters, rng.integers(1, 9))) for _ in range(3_000)] + ['ABÉ']
+    expected = ranked(symbols, text)
+    assert index(symbols).search('NSE', text, limit) == expected[:limit]
+
+
+def test_trigram_search_stops_at_the_limit():
+    symbols = [f"X{i:05d}ABC" for i in range(20_000)]
+    idx = index(symbols)
+    assert idx.search('NSE', 'ABC', limit=3) == [(symbols[i], i) for i in range(3)]
+    assert len(idx.search('NSE', 'ABC', limit=None)) == 20_000
+
+
+@pytest.fixture(scope='module')
+def tradesmart(load_broker):
+    TradeSmart = load_broker('Broker').TradeSmart
+    TradeSmart.exchange_data = pd.DataFrame({
+        'Exchange': ['NSE'] * 5 + ['BSE'],
+        'Token': [11, 12, 13, 14, 15, 16],
+        'LotSize': 1,
+        'TradingSymbol': ['RELIANCEPP-EQ', 'TATAMOTORS-EQ', 'RELIANCE-EQ', 'TATAMTRDVR-EQ', 'RELIANCE', 'RELIANCE'],
+    })
+    TradeSmart.symbol_index = SymbolIndex(TradeSmart.exchange_data['TradingSymbol'],
+                                          TradeSmart.exchange_data['Exchange'])
+    yield TradeSmart
+    TradeSmart.exchange_data = TradeSmart.symbol_index = None
+
+
+@pytest.mark.parametrize('symbol, token', [('reliance', 15), ('RELIANCE-EQ', 13), ('RELIANCE-', 13),
+                                           ('TATAM', 12), ('MOTORS', 12), ('DVR', 14), ('INFY', None)])
+def test_equity_lookup_takes_the_best_ranked_symbol(tradesmart, symbol, token):
+    # A row scan would return the first row containing the text: RELIANCEPP-EQ for 'reliance'
+    assert tradesmart.get_token_details('NSE', symbol)[0] == token
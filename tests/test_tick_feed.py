@@ -0,0 +1,85 @@
+# test_tick_feed.py
+import contextlib
+import io
+import time
+
+import pytest
+from NorenRestApiPy.NorenApi import NorenApi
+
+from standins import NorenFeedServer
+from synthetic import record_ticks, tradesmart_master
+from tick_feed import TickFeed
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+@pytest.fixture(scope='module')
+def master():
+    return tradesmart_master(5_000)
+
+
+def start(feed, url):
+    """Connect a NorenApi session to the stand-in with feed's callbacks, as TradeSmart.start_streams does."""
+    api = NorenApi(host='http://127.0.0.1:1/', websocket=url)
+    api.set_session('TEST', 'x', 'token')
+    feed.api = api
+    with contextlib.redirect_stdout(io.StringIO()):
+        api.start_websocket(subscribe_callback=feed.on_tick, socket_open_callback=feed.on_open,
+                            socket_close_callback=feed.on_close)
+    return api
+
+
+def test_replayed_ticks_set_the_last_price(master):
+    rows = master.sample(10, random_state=0)
+    ticks = record_ticks(rows, 500)
+    expected = {(t['e'], t['tk']): float(t['lp']) for t in ticks}
+    feed = TickFeed(None, master)
+    feed.subscribed.update(expected)
+    with NorenFeedServer(ticks) as server:
+        api = start(feed, server.url)
+        try:
+            assert feed.wait_connected(10)
+            assert server.replayed.wait(10)
+            # The 'tk' acks carry the last recorded price, then every 'tf' tick follows
+            assert wait_for(lambda: feed.ticks >= server.sent)
+            assert {key: feed.ltp(*key) for key in expected} == expected
+        finally:
+            api.close_websocket()
+
+
+def test_subscription_ack_prices_before_any_tick(master):
+    row = master.iloc[0]
+    key = (row['Exchange'], str(row['Token']))
+    feed = TickFeed(None, master)
+    with NorenFeedServer([{'e': key[0], 'tk': key[1], 'lp': '123.45'}], interval=60) as server:
+        api = start(feed, server.url)
+        try:
+            assert feed.wait_connected(10)
+            assert feed.ltp(*key) is None
+            feed.subscribe([key])
+            assert wait_for(lambda: feed.ltp(*key) is not None)
+            assert feed.ltp(*key) == 123.45
+        finally:
+            api.close_websocket()
+
+
+def test_no_price_while_disconnected(master):
+    row = master.iloc[0]
+    key = (row['Exchange'], str(row['Token']))
+    feed = TickFeed(None, master)
+    feed.on_tick({'t': 'tf', 'e': key[0], 'tk': key[1], 'lp': '10.5'})
+    # Prices from before a disconnect are not served
+    assert feed.ltp(*key) is None
+    feed.connected.set()
+    assert feed.ltp(*key) == 10.5
+    assert feed.ltp(*key, max_age=0) is None
+    feed.on_close()
+    assert feed.ltp(*key) is None
+    assert feed.ltp('NSE', 'not-a-token') is None